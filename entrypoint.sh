@@ -28,7 +28,23 @@ echo "==> [DEBUG] About to run python run_migrations.py..."
 python run_migrations.py
 echo "==> [DEBUG] Finished running python run_migrations.py."
 
+# Start the import job worker (the admin import routes only enqueue ImportJob rows).
+# Set JOBS_WORKER_ENABLED=0 when the worker runs as a separate service
+# ("flask --app run jobs worker"). The loop restarts it if it exits.
+if [ "${JOBS_WORKER_ENABLED:-1}" = "1" ]; then
+    echo "==> [DEBUG] Starting import job worker..."
+    (
+        while true; do
+            flask --app run jobs worker || true
+            echo "==> [DEBUG] Job worker exited, restarting in 5s..."
+            sleep 5
+        done
+    ) &
+fi
+
 # Start the application
 echo "==> [DEBUG] About to start Gunicorn server..."
-gunicorn --bind 0.0.0.0:${PORT} --log-level debug run:app
+# Threaded workers: an open SSE progress stream (/admin/wtrl_import/events) holds
+# a thread, not the whole worker process.
+gunicorn --bind 0.0.0.0:${PORT} --worker-class gthread --threads ${GUNICORN_THREADS:-8} --log-level debug run:app
 echo "==> [DEBUG] Gunicorn process finished. (This line should not be reached if the server runs correctly)."
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""Add natural key unique constraints on race results and standings
+
+Revision ID: 9c1d2e7f4a10
+Revises: 570e992c1f3c
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d2e7f4a10'
+down_revision = '570e992c1f3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rimuove eventuali duplicati (tiene la riga con id più alto) prima di creare i vincoli.
+    # Le subquery sono incapsulate in una tabella derivata per compatibilità con MySQL.
+    op.execute(
+        "DELETE FROM race_results_riders WHERE race_team_result_id IN ("
+        " SELECT id FROM (SELECT t.id FROM race_results_teams t WHERE t.id NOT IN ("
+        "  SELECT max_id FROM (SELECT MAX(id) AS max_id FROM race_results_teams"
+        "   GROUP BY season, class_id, race, team_id) AS keep_t)) AS dup_t)"
+    )
+    op.execute(
+        "DELETE FROM race_results_teams WHERE id NOT IN ("
+        " SELECT max_id FROM (SELECT MAX(id) AS max_id FROM race_results_teams"
+        "  GROUP BY season, class_id, race, team_id) AS keep_t)"
+    )
+    op.execute(
+        "DELETE FROM race_results_riders WHERE id NOT IN ("
+        " SELECT max_id FROM (SELECT MAX(id) AS max_id FROM race_results_riders"
+        "  GROUP BY race_team_result_id, rider_id) AS keep_r)"
+    )
+    op.execute(
+        "DELETE FROM round_standings WHERE id NOT IN ("
+        " SELECT max_id FROM (SELECT MAX(id) AS max_id FROM round_standings"
+        "  GROUP BY season, class_id, team_id) AS keep_s)"
+    )
+
+    with op.batch_alter_table('race_results_teams', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_race_results_teams_segment_team', ['season', 'class_id', 'race', 'team_id'])
+
+    with op.batch_alter_table('race_results_riders', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_race_results_riders_result_rider', ['race_team_result_id', 'rider_id'])
+
+    with op.batch_alter_table('round_standings', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_round_standings_season_class_team', ['season', 'class_id', 'team_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('round_standings', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_round_standings_season_class_team', type_='unique')
+
+    with op.batch_alter_table('race_results_riders', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_race_results_riders_result_rider', type_='unique')
+
+    with op.batch_alter_table('race_results_teams', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_race_results_teams_segment_team', type_='unique')
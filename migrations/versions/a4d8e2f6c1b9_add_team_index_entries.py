@@ -0,0 +1,42 @@
+"""Add team_index_entries table
+
+Revision ID: a4d8e2f6c1b9
+Revises: f1c7a3e9b5d2
+Create Date: 2026-10-18 19:05:51.774210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8e2f6c1b9'
+down_revision = 'f1c7a3e9b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_index_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('season', sa.Integer(), nullable=False),
+    sa.Column('trc', sa.Integer(), nullable=False),
+    sa.Column('class_id', sa.String(length=50), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('division', sa.String(length=100), nullable=True),
+    sa.Column('entry_hash', sa.String(length=64), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('removed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('season', 'trc', name='uq_team_index_entries_season_trc')
+    )
+    with op.batch_alter_table('team_index_entries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_team_index_entries_season'), ['season'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('team_index_entries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_team_index_entries_season'))
+
+    op.drop_table('team_index_entries')
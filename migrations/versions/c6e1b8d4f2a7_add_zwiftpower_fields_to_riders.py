@@ -0,0 +1,42 @@
+"""Add ZwiftPower club fields to riders
+
+Revision ID: c6e1b8d4f2a7
+Revises: a4d8e2f6c1b9
+Create Date: 2026-10-18 19:05:41.203118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1b8d4f2a7'
+down_revision = 'a4d8e2f6c1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('riders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('zp_team_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.add_column(sa.Column('country', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('weight', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('ftp', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('races', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('zp_rank', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('zp_synced_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_riders_zp_team_id'), ['zp_team_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('riders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_riders_zp_team_id'))
+        batch_op.drop_column('zp_synced_at')
+        batch_op.drop_column('zp_rank')
+        batch_op.drop_column('races')
+        batch_op.drop_column('ftp')
+        batch_op.drop_column('weight')
+        batch_op.drop_column('country')
+        batch_op.drop_column('is_active')
+        batch_op.drop_column('zp_team_id')
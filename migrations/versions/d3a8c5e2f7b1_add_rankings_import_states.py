@@ -0,0 +1,42 @@
+"""Add rankings_import_states table
+
+Revision ID: d3a8c5e2f7b1
+Revises: b7e4f1a9c2d3
+Create Date: 2026-10-18 14:26:51.302117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8c5e2f7b1'
+down_revision = 'b7e4f1a9c2d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rankings_import_states',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('season', sa.Integer(), nullable=False),
+    sa.Column('class_id', sa.String(length=50), nullable=False),
+    sa.Column('race', sa.Integer(), nullable=False),
+    sa.Column('payload_hash', sa.String(length=64), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=True),
+    sa.Column('imported_at', sa.DateTime(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=True),
+    sa.Column('unchanged_fetches', sa.Integer(), nullable=True),
+    sa.Column('is_final', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('season', 'class_id', 'race', name='uq_rankings_import_states_segment')
+    )
+    with op.batch_alter_table('rankings_import_states', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rankings_import_states_season'), ['season'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('rankings_import_states', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rankings_import_states_season'))
+
+    op.drop_table('rankings_import_states')
@@ -0,0 +1,32 @@
+"""Add payload_hash to teams and wtrl_riders
+
+Revision ID: e5b2d9c4a8f3
+Revises: d3a8c5e2f7b1
+Create Date: 2026-10-18 16:40:12.871305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2d9c4a8f3'
+down_revision = 'd3a8c5e2f7b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('teams', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payload_hash', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('wtrl_riders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payload_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('wtrl_riders', schema=None) as batch_op:
+        batch_op.drop_column('payload_hash')
+
+    with op.batch_alter_table('teams', schema=None) as batch_op:
+        batch_op.drop_column('payload_hash')
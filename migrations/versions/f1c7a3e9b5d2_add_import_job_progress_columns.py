@@ -0,0 +1,38 @@
+"""Add detailed progress columns to import_jobs
+
+Revision ID: f1c7a3e9b5d2
+Revises: e5b2d9c4a8f3
+Create Date: 2026-10-18 18:12:45.309127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a3e9b5d2'
+down_revision = 'e5b2d9c4a8f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('items_done', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('items_total', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('error_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('items_per_second', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('eta_seconds', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('phase', sa.String(length=30), nullable=True))
+        batch_op.add_column(sa.Column('phase_timings', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_column('phase_timings')
+        batch_op.drop_column('phase')
+        batch_op.drop_column('eta_seconds')
+        batch_op.drop_column('items_per_second')
+        batch_op.drop_column('error_count')
+        batch_op.drop_column('items_total')
+        batch_op.drop_column('items_done')
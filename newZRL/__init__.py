@@ -1,5 +1,6 @@
 # newZRL/__init__.py
 import logging
+import os
 import sys # Added import
 from flask import Flask, jsonify, render_template, request # Added jsonify, render_template, request
 # ... (other imports)
@@ -34,12 +35,27 @@ from newZRL.models.race import Race
 from newZRL.models.race_lineup import RaceLineup # Assuming RaceLineup is the class name
 from newZRL.models.race_results import RaceResultsTeam, RaceResultsRider, RoundStanding
 from newZRL.models.wtrl import WTRLLeague, WTRLDivision, WTRLCompetition, WTRLRace # Assuming these are class names
+from newZRL.models.import_job import ImportJob
+from newZRL.models.rankings_import_state import RankingsImportState
+from newZRL.models.team_index_entry import TeamIndexEntry
 # Add other models as needed
 @login_manager.user_loader
 def load_user(user_id):
     """Callback per Flask-Login per caricare un utente dall'ID utente."""
     return User.query.get(int(user_id))
 
+def _add_wtrl_error_log():
+    """Log su file degli errori API WTRL (logs/wtrl_api_errors.log), aggiunto una sola volta."""
+    wtrl_logger = logging.getLogger("newZRL.services.teams_import")
+    log_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), "logs")
+    log_file = os.path.join(log_dir, "wtrl_api_errors.log")
+    if any(getattr(h, "baseFilename", None) == log_file for h in wtrl_logger.handlers):
+        return
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    wtrl_logger.addHandler(file_handler)
+
 def create_app(config_name="development"):
     app = Flask(__name__, static_folder="static", template_folder="templates")
     
@@ -84,6 +100,8 @@ def create_app(config_name="development"):
         for h in root_logger.handlers:
             root_logger.removeHandler(h)
     root_logger.addHandler(handler)
+    if not app.testing:
+        _add_wtrl_error_log()
 
     # Inizializza estensioni con l'app
     db.init_app(app)
@@ -145,4 +163,12 @@ def create_app(config_name="development"):
     app.register_blueprint(captain_bp) # Register captain_bp
     app.register_blueprint(rider_bp) # Register rider_bp
 
+    # -----------------------------
+    # CLI (flask jobs worker / enqueue / list, strumenti offline in flask data)
+    # -----------------------------
+    from newZRL.scripts.data_cli import data_cli
+    from newZRL.services.jobs import jobs_cli
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(data_cli)
+
     return app
\ No newline at end of file
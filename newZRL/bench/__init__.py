@@ -0,0 +1,2 @@
+# Harness di replay e benchmark degli importer WTRL (python -m newZRL.bench)
+# e dei parser ZwiftPower su pagine salvate (python -m newZRL.bench.parsers)
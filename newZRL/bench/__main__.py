@@ -0,0 +1,5 @@
+import sys
+
+from newZRL.bench.benchmark import main
+
+sys.exit(main())
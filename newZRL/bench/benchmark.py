@@ -0,0 +1,222 @@
+# newZRL/bench/benchmark.py
+"""
+Benchmark end-to-end degli importer contro il replay server, su SQLite.
+
+    python -m newZRL.bench                       # registrazione costruita dai seed in data/
+    python -m newZRL.bench --pending 2           # ogni results/league risponde 202, 202, 200
+    python -m newZRL.bench --fixtures DIR        # usa una registrazione salvata
+    python -m newZRL.bench --save-fixtures DIR   # salva la registrazione costruita dai seed
+    python -m newZRL.bench --only rankings --json out.json
+
+Per ogni importer riporta tempo, righe scritte e righe/s, statement SQL eseguiti,
+richieste HTTP e picco di memoria Python (tracemalloc).
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from sqlalchemy import event, func, select
+
+from newZRL.bench.fixtures import Recording, build_recording
+from newZRL.bench.replay_server import ReplayServer
+
+IMPORTERS = ("schedule", "teams", "rankings", "rankings-rerun")
+
+
+class Metrics:
+    """Risultato di un singolo importer."""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.rows = 0
+        self.statements = 0
+        self.requests = 0
+        self.peak_memory = 0
+        self.error = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.wall if self.wall else 0.0
+
+    def to_dict(self):
+        return {
+            "importer": self.name,
+            "wall_s": round(self.wall, 3),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows_per_second, 1),
+            "sql_statements": self.statements,
+            "http_requests": self.requests,
+            "peak_memory_kb": self.peak_memory // 1024,
+            "error": self.error,
+        }
+
+
+def _table_rows(db):
+    """Numero di righe per tabella (per calcolare le righe scritte da un importer)."""
+    return {
+        table.name: db.session.execute(select(func.count()).select_from(table)).scalar()
+        for table in db.metadata.sorted_tables
+    }
+
+
+@contextmanager
+def measure(db, server, metrics, trace_memory=True):
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    before = _table_rows(db)
+    db.session.remove()
+    server.reset()
+    event.listen(db.engine, "before_cursor_execute", count_statement)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.error = str(e)
+    finally:
+        metrics.wall = time.perf_counter() - start
+        if trace_memory:
+            metrics.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        event.remove(db.engine, "before_cursor_execute", count_statement)
+        metrics.statements = statements[0]
+        metrics.requests = sum(server.requests.values())
+        db.session.remove()
+        after = _table_rows(db)
+        metrics.rows = sum(max(0, after[name] - before.get(name, 0)) for name in after)
+
+
+# --------------------------
+# IMPORTER
+# --------------------------
+def run_schedule(app, recording, server):
+    from newZRL.services.payload_archive import get_payload_archive
+    from newZRL.services.schedule_import import fetch_wtrl_schedule_data, import_wtrl_schedule_data_to_db
+
+    season = str(recording.schedule_season)
+    categories = sorted({e["query"]["category"] for e in recording.of_kind("schedule")})
+    with get_payload_archive(app) as archive:
+        payloads = fetch_wtrl_schedule_data(season, categories, api_base_url=server.base_url, archive=archive)
+    import_wtrl_schedule_data_to_db(season, payloads)
+
+
+def run_teams(app, recording, server):
+    from newZRL.services.teams_import import import_teams
+
+    # Con la lista team registrata i TRC arrivano dalla scoperta, come in produzione
+    trc_list = None
+    if not recording.of_kind("teams_list"):
+        trc_list = [e["path"].rsplit("/", 1)[-1] for e in recording.of_kind("team")]
+    import_teams(recording.season, trc_list=trc_list)
+
+
+def _rankings_segments(recording):
+    race_numbers, classes = set(), set()
+    for endpoint in recording.of_kind("results"):
+        class_id, race_number = endpoint["path"].rsplit("/", 2)[-2:]
+        classes.add(class_id)
+        race_numbers.add(int(race_number))
+    return sorted(race_numbers), sorted(classes)
+
+
+def run_rankings(app, recording, server):
+    from newZRL.services.rankings_import import import_rankings
+
+    race_numbers, classes = _rankings_segments(recording)
+    summary = import_rankings(recording.season, race_numbers, classes)
+    if summary["errors"]:
+        raise RuntimeError(f"{len(summary['errors'])} errori: {summary['errors'][0]}")
+
+
+RUNNERS = {
+    "schedule": run_schedule,
+    "teams": run_teams,
+    "rankings": run_rankings,
+    # Secondo passaggio: payload invariati, misura il percorso "niente da fare"
+    "rankings-rerun": run_rankings,
+}
+
+
+def run_benchmark(recording, importers=IMPORTERS, rate=50.0, workers=8, trace_memory=True):
+    """Esegue gli importer in sequenza sullo stesso DB SQLite e ritorna la lista di Metrics."""
+    from newZRL import create_app, db
+
+    app = create_app("benchmark")
+    # Alcuni logger degli importer forzano INFO: il report resta leggibile solo filtrando l'handler
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(app.config["LOGGING_LEVEL"])
+    results = []
+    with tempfile.TemporaryDirectory() as archive_dir, ReplayServer(recording) as server:
+        app.config.update(
+            WTRL_API_BASE_URL=server.base_url,
+            WTRL_ARCHIVE_ENABLED=True,
+            WTRL_ARCHIVE_DIR=archive_dir,
+            WTRL_REQUESTS_PER_SECOND=rate,
+            WTRL_FETCH_WORKERS=workers,
+            WTRL_HTTP_CACHE_ENABLED=False,
+            # I team registrati non sono quelli del club: si importa tutta la stagione scoperta
+            WTRL_TEAMS_ALL_SEASON=True,
+        )
+        with app.app_context():
+            db.create_all()
+            for name in importers:
+                metrics = Metrics(name)
+                with measure(db, server, metrics, trace_memory=trace_memory):
+                    RUNNERS[name](app, recording, server)
+                results.append(metrics)
+            db.drop_all()
+    return results
+
+
+def print_report(results):
+    header = f"{'importer':<16}{'wall s':>9}{'rows':>8}{'rows/s':>10}{'SQL':>8}{'HTTP':>7}{'peak KB':>10}"
+    print(header)
+    print("-" * len(header))
+    for m in results:
+        print(f"{m.name:<16}{m.wall:>9.2f}{m.rows:>8}{m.rows_per_second:>10.1f}"
+              f"{m.statements:>8}{m.requests:>7}{m.peak_memory // 1024:>10}")
+        if m.error:
+            print(f"    ❌ {m.error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m newZRL.bench", description="Benchmark degli importer WTRL.")
+    parser.add_argument("--fixtures", help="Cartella di una registrazione salvata (manifest.json).")
+    parser.add_argument("--save-fixtures", help="Salva la registrazione costruita dai seed in questa cartella ed esce.")
+    parser.add_argument("--races", type=int, default=4, help="Race per classe nei payload sintetizzati.")
+    parser.add_argument("--pending", type=int, default=0, help="Risposte 202 prima del 200 per results/league.")
+    parser.add_argument("--only", action="append", choices=IMPORTERS, help="Importer da eseguire (ripetibile).")
+    parser.add_argument("--rate", type=float, default=50.0, help="Richieste/s verso il replay server.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--no-memory", action="store_true", help="Disattiva tracemalloc (che rallenta l'esecuzione).")
+    parser.add_argument("--json", help="Scrive i risultati in questo file JSON.")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        recording = Recording.load(args.fixtures)
+    else:
+        recording = build_recording(races=args.races, pending=args.pending)
+
+    if args.save_fixtures:
+        recording.save(args.save_fixtures)
+        print(f"Registrazione salvata in {os.path.abspath(args.save_fixtures)} ({len(recording.endpoints)} endpoint)")
+        return 0
+
+    results = run_benchmark(recording, importers=args.only or IMPORTERS, rate=args.rate,
+                            workers=args.workers, trace_memory=not args.no_memory)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([m.to_dict() for m in results], f, indent=2)
+    return 1 if any(m.error for m in results) else 0
@@ -0,0 +1,192 @@
+# newZRL/bench/fixtures.py
+"""
+Formato delle registrazioni WTRL usate dal replay server.
+
+Una registrazione è una cartella con un `manifest.json`:
+
+    {
+        "version": 1,
+        "season": 18,
+        "schedule_season": 17,
+        "endpoints": [
+            {
+                "kind": "team",                    # team / teams_list / schedule / results / league
+                "path": "/zrl/18/teams/74016",     # relativo a WTRL_API_BASE_URL
+                "query": {},                       # parametri richiesti (sottoinsieme)
+                "responses": [                     # risposte in sequenza, l'ultima si ripete
+                    {"status": 202},
+                    {"status": 200, "body": "bodies/<sha256>.json"}
+                ]
+            }
+        ]
+    }
+
+I corpi sono salvati una sola volta per contenuto in `bodies/`. I seed sono i
+file `data/wtrl_json/team_*.json` e `data/races_json/schedule_*.json`; i
+payload results/league vengono sintetizzati dai team registrati.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+
+DATA_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "data")
+MANIFEST = "manifest.json"
+SCHEDULE_QUERY = {"wtrlid": "zrl", "action": "schedule"}
+
+
+class Recording:
+    """Endpoint registrati e relativi corpi, caricati da (o scritti in) una cartella."""
+
+    def __init__(self, season, schedule_season=None, endpoints=None, bodies=None):
+        self.season = season
+        self.schedule_season = schedule_season
+        self.endpoints = endpoints or []
+        self.bodies = bodies or {}   # nome file in bodies/ -> bytes
+
+    def add(self, kind, path, payload, query=None, pending=0):
+        """Registra `payload` su `path`, preceduto da `pending` risposte 202."""
+        body = json.dumps(payload).encode("utf-8")
+        name = f"bodies/{hashlib.sha256(body).hexdigest()}.json"
+        self.bodies[name] = body
+        responses = [{"status": 202} for _ in range(pending)]
+        responses.append({"status": 200, "body": name})
+        self.endpoints.append({"kind": kind, "path": path, "query": query or {}, "responses": responses})
+
+    def body(self, name):
+        return self.bodies[name]
+
+    def of_kind(self, kind):
+        return [e for e in self.endpoints if e["kind"] == kind]
+
+    def save(self, directory):
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+        for name, body in self.bodies.items():
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(body)
+        manifest = {"version": 1, "season": self.season, "schedule_season": self.schedule_season,
+                    "endpoints": self.endpoints}
+        with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        bodies = {}
+        for endpoint in manifest["endpoints"]:
+            for response in endpoint["responses"]:
+                name = response.get("body")
+                if name and name not in bodies:
+                    with open(os.path.join(directory, name), "rb") as f:
+                        bodies[name] = f.read()
+        return cls(manifest["season"], manifest.get("schedule_season"), manifest["endpoints"], bodies)
+
+
+# --------------------------
+# SEED DAI FILE IN data/
+# --------------------------
+def load_team_seeds(data_dir=DATA_DIR):
+    """Payload team registrati: dict trc -> JSON di data/wtrl_json/team_<trc>.json."""
+    teams = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "wtrl_json", "team_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        teams[int(data["meta"]["trc"])] = data
+    return teams
+
+
+def load_schedule_seeds(data_dir=DATA_DIR):
+    """Calendari registrati: lista di (season, category, JSON) da data/races_json/."""
+    schedules = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "races_json", "schedule_season*_cat*.json"))):
+        match = re.search(r"schedule_season(\d+)_cat(\w+)\.json$", path)
+        if not match:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            schedules.append((int(match.group(1)), match.group(2), json.load(f)))
+    return schedules
+
+
+def synth_teams_list(teams):
+    """Lista team della stagione (usata dalla scoperta dei TRC) costruita dai team registrati."""
+    return {"payload": [
+        {
+            "trc": data["meta"]["trc"],
+            "name": data["meta"]["team"]["name"],
+            "class": data["meta"]["competition"]["class"],
+            "division": data["meta"].get("division"),
+        }
+        for data in teams
+    ]}
+
+
+def synth_results(teams, race_number):
+    """Payload results di un segmento costruito dai team registrati della stessa classe."""
+    payload = []
+    for rank, data in enumerate(teams, start=1):
+        meta = data["meta"]
+        riders = []
+        for position, rider in enumerate(data.get("riders", []), start=1):
+            riders.append({
+                "zid": rider.get("profileId"),
+                "name": rider.get("name"),
+                "category": rider.get("category"),
+                "finrp": max(0, 20 - position), "pbprp": position % 3, "totrp": max(0, 20 - position),
+                "wkg": rider.get("zftp") or 0, "watts": rider.get("zftpw") or 0,
+                "gap": str(position * 7),
+            })
+        payload.append({
+            "id5": meta["trc"],
+            "teamname": meta["team"]["name"],
+            "division": meta.get("division"),
+            "finp": 40 - rank, "pbp": race_number % 5, "lpoints": 40 - rank + race_number % 5,
+            "falp": 0, "ftsp": 0, "p1": rank,
+            "timeResult": f"1:{rank:02d}:{race_number:02d}",
+            "a": riders,
+        })
+    return {"payload": payload}
+
+
+def synth_league(teams, race_number):
+    """Payload league (punti cumulati) coerente con synth_results."""
+    return {"payload": [
+        {"d": data["meta"]["team"]["name"], "n": (40 - rank) * race_number}
+        for rank, data in enumerate(teams, start=1)
+    ]}
+
+
+def build_recording(data_dir=DATA_DIR, races=4, pending=0):
+    """
+    Costruisce una registrazione dai seed: un endpoint team per TRC, la lista team, uno schedule
+    per categoria e results + league per ogni (classe, race) dei team registrati.
+    `pending` antepone N risposte 202 a results e league, come fa WTRL mentre
+    genera i JSON.
+    """
+    teams = load_team_seeds(data_dir)
+    if not teams:
+        raise ValueError(f"Nessun file team_*.json in {data_dir}/wtrl_json")
+    season = next(iter(teams.values()))["meta"]["competition"]["season"]
+    schedules = load_schedule_seeds(data_dir)
+    recording = Recording(season, schedules[0][0] if schedules else None)
+
+    for trc, data in teams.items():
+        recording.add("team", f"/zrl/{season}/teams/{trc}", data)
+    recording.add("teams_list", f"/zrl/{season}/teams/", synth_teams_list(teams.values()))
+
+    for schedule_season, category, data in schedules:
+        recording.add("schedule", "/wtrlruby/", data,
+                      query={**SCHEDULE_QUERY, "season": str(schedule_season), "category": category})
+
+    by_class = {}
+    for data in teams.values():
+        by_class.setdefault(data["meta"]["competition"]["class"], []).append(data)
+    for class_id, class_teams in sorted(by_class.items()):
+        for race_number in range(1, races + 1):
+            recording.add("results", f"/zrl/results/{season}/{class_id}/{race_number}",
+                          synth_results(class_teams, race_number), pending=pending)
+            recording.add("league", f"/zrl/league/{season}/{class_id}/{race_number}",
+                          synth_league(class_teams, race_number), pending=pending)
+    return recording
@@ -0,0 +1,190 @@
+# newZRL/bench/parsers.py
+"""
+Benchmark offline dei parser ZwiftPower sulle pagine salvate in data/zwiftpower.
+
+    python -m newZRL.bench.parsers                      # team.html e profile.html salvate
+    python -m newZRL.bench.parsers --pages DIR          # pagine riscaricate (stessi nomi file)
+    python -m newZRL.bench.parsers --iterations 1000 --json out.json
+
+Per ogni pagina e parser riporta pagine/s, memoria Python allocata per pagina
+(picco tracemalloc di un parse, in KB) e blocchi ancora allocati per pagina
+(il risultato), più i campi valorizzati: dopo un cambio di layout del sito i
+campi a zero indicano cosa non viene più letto. Il parser "bs4" è quello del
+vecchio scraper Selenium (BeautifulSoup + html.parser), tenuto come riferimento.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import tracemalloc
+
+from newZRL.bench.fixtures import DATA_DIR
+from newZRL.services.zwiftpower_parser import parse_number, parse_profile_page, parse_team_page
+
+PAGES_DIR = os.path.join(DATA_DIR, "zwiftpower")
+PAGES = {"team": "team.html", "profile": "profile.html"}
+
+
+# --------------------------
+# RIFERIMENTO: PARSER DEL VECCHIO SCRAPER SELENIUM
+# --------------------------
+TEAM_NUMBER_COLUMNS = ((1, "ranking"), (3, "wkg_20min"), (4, "watt_20min"), (5, "wkg_15sec"), (6, "watt_15sec"))
+
+
+def bs4_team_page(page):
+    from bs4 import BeautifulSoup
+
+    riders = []
+    for row in BeautifulSoup(page, "html.parser").select("table#team_riders tbody tr"):
+        cols = row.find_all("td")
+        if len(cols) < 7:
+            continue
+        link = cols[2].find("a")
+        match = re.search(r"[?&](z|user|m)=(\d+)", link["href"] if link else "")
+        if not match:
+            continue
+        riders.append({
+            "zwift_power_id": int(match.group(2)),
+            "name": cols[2].get_text(strip=True),
+            "category": cols[0].get_text(strip=True),
+            **{key: parse_number(cols[i].get_text(strip=True)) for i, key in TEAM_NUMBER_COLUMNS},
+        })
+    return riders
+
+
+def bs4_profile_page(page):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, "html.parser")
+
+    def extract_text(label):
+        cell = soup.find("td", string=re.compile(label, re.IGNORECASE))
+        return cell.find_next_sibling("td").get_text(strip=True) if cell else None
+
+    profile = {field: extract_text(label) for field, label in (
+        ("race_ranking", "Race Ranking"), ("category", "Category"), ("zwift_racing_score", "Zwift Racing Score"),
+        ("zpoints", "ZPoints"), ("country", "Country"), ("team", "Team"), ("zftp", "zFTP"),
+        ("weight", "Weight"), ("age", "Age"),
+    )}
+    for field in ("race_ranking", "zwift_racing_score", "zpoints", "zftp", "weight"):
+        profile[field] = parse_number(profile[field])
+    for i, block in enumerate(soup.find_all("div", class_="profile_power_block")):
+        text = block.get_text(strip=True)
+        wkg, watt = re.search(r"([\d.]+)\s*wkg", text), re.search(r"([\d.]+)\s*watt", text)
+        profile[f"wkg_{i}"] = float(wkg.group(1)) if wkg else None
+        profile[f"watt_{i}"] = int(float(watt.group(1))) if watt else None
+    return profile
+
+
+PARSERS = {
+    "lxml": {"team": parse_team_page, "profile": parse_profile_page},
+    "bs4": {"team": bs4_team_page, "profile": bs4_profile_page},
+}
+
+
+# --------------------------
+# MISURE
+# --------------------------
+def _fields(result):
+    """Campi valorizzati del risultato (per il team: somma sui rider)."""
+    rows = result if isinstance(result, list) else [result]
+    return sum(1 for row in rows for value in row.values() if value not in (None, ""))
+
+
+def allocations(parse, page):
+    """(KB di picco, blocchi trattenuti) di un singolo parse, misurati con tracemalloc."""
+    parse(page)  # riscaldamento: cache di regex e XPath fuori dalla misura
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = parse(page)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del result
+    return peak / 1024, blocks
+
+
+def bench_page(parse, page, iterations=200, trace_memory=True):
+    """Pagine/s su `iterations` parse consecutivi della stessa pagina, più allocazioni e campi letti."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = parse(page)
+    wall = time.perf_counter() - start
+    peak_kb, blocks = allocations(parse, page) if trace_memory else (None, None)
+    return {
+        "pages_per_s": round(iterations / wall, 1) if wall else None,
+        "ms_per_page": round(wall * 1000 / iterations, 3),
+        "alloc_kb_per_page": round(peak_kb, 1) if peak_kb is not None else None,
+        "blocks_per_page": blocks,
+        "fields": _fields(result),
+    }
+
+
+def load_pages(pages_dir=PAGES_DIR):
+    """Pagine salvate presenti in `pages_dir`: nome -> bytes."""
+    pages = {}
+    for name, filename in PAGES.items():
+        path = os.path.join(pages_dir, filename)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def run_benchmark(pages, parsers=tuple(PARSERS), iterations=200, trace_memory=True):
+    results = []
+    for parser in parsers:
+        for name, page in pages.items():
+            try:
+                row = bench_page(PARSERS[parser][name], page, iterations, trace_memory)
+                error = None
+            except ImportError as e:  # bs4 è solo un riferimento, può mancare
+                row, error = {}, str(e)
+            results.append({"parser": parser, "page": name, "bytes": len(page), **row, "error": error})
+    return results
+
+
+def print_report(results):
+    header = f"{'parser':<8}{'page':<10}{'KB':>7}{'pages/s':>10}{'ms/page':>10}{'alloc KB':>10}{'blocks':>8}{'fields':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if r["error"]:
+            print(f"{r['parser']:<8}{r['page']:<10}    ❌ {r['error']}")
+            continue
+        alloc = f"{r['alloc_kb_per_page']:>10.1f}" if r["alloc_kb_per_page"] is not None else f"{'-':>10}"
+        blocks = f"{r['blocks_per_page']:>8}" if r["blocks_per_page"] is not None else f"{'-':>8}"
+        print(f"{r['parser']:<8}{r['page']:<10}{r['bytes'] / 1024:>7.1f}{r['pages_per_s']:>10.1f}"
+              f"{r['ms_per_page']:>10.3f}{alloc}{blocks}{r['fields']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m newZRL.bench.parsers",
+                                     description="Benchmark dei parser ZwiftPower su pagine salvate.")
+    parser.add_argument("--pages", default=PAGES_DIR, help="Cartella con team.html e/o profile.html.")
+    parser.add_argument("--iterations", type=int, default=200, help="Parse per pagina.")
+    parser.add_argument("--only", action="append", choices=tuple(PARSERS), help="Parser da misurare (ripetibile).")
+    parser.add_argument("--no-memory", action="store_true", help="Salta la misura delle allocazioni (tracemalloc).")
+    parser.add_argument("--json", help="Scrive i risultati in questo file JSON.")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages)
+    if not pages:
+        parser.error(f"Nessuna pagina ({', '.join(PAGES.values())}) in {args.pages}")
+    results = run_benchmark(pages, args.only or tuple(PARSERS), args.iterations, not args.no_memory)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+# newZRL/bench/replay_server.py
+
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class ReplayServer:
+    """
+    Server HTTP locale che sostituisce wtrl.racing riproducendo una Recording.
+    Ogni endpoint restituisce le sue risposte in sequenza (es. 202, 202, 200);
+    raggiunta l'ultima, questa viene ripetuta. Gli URL non registrati ricevono 404.
+    `base_url` va usato come WTRL_API_BASE_URL.
+    """
+
+    def __init__(self, recording, host="127.0.0.1", port=0):
+        self.recording = recording
+        self.requests = Counter()      # (path, status) -> numero di richieste
+        self._served = Counter()       # indice endpoint -> risposte già servite
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="wtrl-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        """Riparte dall'inizio di ogni sequenza (es. tra due run del benchmark)."""
+        with self._lock:
+            self._served.clear()
+            self.requests.clear()
+
+    def _match(self, path, query):
+        for index, endpoint in enumerate(self.recording.endpoints):
+            if endpoint["path"].rstrip("/") != path.rstrip("/"):
+                continue
+            if all(query.get(k) == str(v) for k, v in endpoint["query"].items()):
+                return index, endpoint
+        return None, None
+
+    def respond(self, raw_path):
+        """Ritorna (status, body) per la richiesta `raw_path`."""
+        parts = urlsplit(raw_path)
+        index, endpoint = self._match(parts.path, dict(parse_qsl(parts.query)))
+        if endpoint is None:
+            status, body = 404, b'{"error": "not recorded"}'
+        else:
+            with self._lock:
+                served = self._served[index]
+                self._served[index] += 1
+            responses = endpoint["responses"]
+            response = responses[min(served, len(responses) - 1)]
+            status = response["status"]
+            body = self.recording.body(response["body"]) if response.get("body") else b"{}"
+        with self._lock:
+            self.requests[(parts.path, status)] += 1
+        return status, body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body = server.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
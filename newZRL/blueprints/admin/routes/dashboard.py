@@ -8,7 +8,7 @@ from newZRL.models.race import Race
 from newZRL.models.round import Round
 from newZRL.models.race_lineup import RaceLineup
 from newZRL.models.wtrl_rider import WTRL_Rider
-from newZRL.utils.race_utils import get_next_race_date
+from newZRL.services.race_calendar import get_race_calendar
 from utils.auth_decorators import require_roles
 from sqlalchemy.orm import joinedload
 from newZRL.models.user import User # Import User model
@@ -44,12 +44,13 @@ def dashboard():
         teams = Team.query.order_by(Team.name).all()
 
     # Pre-calculation: lineup present and next race for each team
+    calendar = get_race_calendar()
     for t in teams:
         # Has at least one registered lineup?
         t.has_lineup = RaceLineup.query.join(WTRL_Rider).filter(WTRL_Rider.team_trc == t.trc).first() is not None
 
-        # Next scheduled race for the team
-        t.next_race_date = get_next_race_date(t.trc)
+        # Next scheduled race for the team (categoria del team, dal calendario in memoria)
+        t.next_race_date = calendar.next_race_date_for_team(t)
 
     return render_template(
         "admin/admin_dashboard.html",
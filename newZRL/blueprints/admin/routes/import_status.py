@@ -1,24 +1,109 @@
 # newZRL/blueprints/admin/routes/import_status.py
 
-from flask import jsonify, render_template
+import json
+import time
+
+from flask import Response, current_app, jsonify, render_template, request, url_for
+from flask_login import login_required
+from newZRL import db
+from newZRL.models.import_job import ImportJob
+from newZRL.services.job_events import get_event_hub
 from ..bp import admin_bp
 
-# This dictionary will hold the progress of long-running tasks.
-# In a production environment, this should be replaced with a more robust solution
-# like Redis or a database-backed task queue (e.g., Celery).
-import_status_data = {
+# Pagina a cui tornare al termine di ogni tipo di job
+RETURN_ENDPOINTS = {
+    "rankings": "admin_bp.wtrl_rankings_page",
+    "teams": "admin_bp.wtrl_teams_page",
+    "schedule": "admin_bp.import_page",
+    "zwiftpower": "admin_bp.import_zwift_team",
+    "load-teams": "admin_bp.imports_main_page",
+}
+
+IDLE_STATUS = {
     'progress': 0,
     'message': 'Nessuna importazione in corso.',
     'is_running': False
 }
 
+
+def _requested_job():
+    """Job indicato da ?job_id=, altrimenti l'ultimo job creato."""
+    job_id = request.args.get("job_id", type=int)
+    if job_id:
+        return db.session.get(ImportJob, job_id)
+    return ImportJob.query.order_by(ImportJob.id.desc()).first()
+
+
 @admin_bp.route("/wtrl_import/status")
+@login_required
 def get_import_status():
-    """Returns the current status of the import task."""
-    return jsonify(import_status_data)
+    """Returns the current status of the import job (letto dal DB, valido per tutti i worker)."""
+    job = _requested_job()
+    if job is None:
+        return jsonify(IDLE_STATUS)
+    return jsonify(job.to_dict())
+
+def _sse(data, event=None):
+    """Un evento text/event-stream."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@admin_bp.route("/wtrl_import/events")
+@login_required
+def import_events():
+    """
+    Stream SSE dell'avanzamento di un job: un evento `snapshot` con lo stato completo,
+    poi solo i campi cambiati (al massimo uno ogni JOB_EVENTS_INTERVAL secondi) e un
+    evento `end` quando il job termina. Le letture dal DB sono condivise tra tutti
+    gli stream aperti nel processo (services/job_events.py).
+    Lo stream dura al massimo JOB_EVENTS_MAX_SECONDS: poi un evento `poll` dice al
+    client di proseguire con il polling di /wtrl_import/status, così una tab aperta
+    non tiene occupato un worker web per tutta la durata del job.
+    """
+    job = _requested_job()
+    if job is None:
+        return jsonify(IDLE_STATUS), 404
+    job_id = job.id
+    snapshot = job.to_dict()
+    app = current_app._get_current_object()
+    keepalive = app.config.get("JOB_EVENTS_KEEPALIVE", 15)
+    max_seconds = app.config.get("JOB_EVENTS_MAX_SECONDS", 120)
+
+    def stream():
+        yield "retry: 3000\n\n"
+        yield _sse(snapshot, "snapshot")
+        if not snapshot["is_running"]:
+            yield _sse({}, "end")
+            return
+        hub = get_event_hub(app)
+        sub = hub.subscribe(job_id, snapshot)
+        deadline = time.monotonic() + max_seconds
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _sse({}, "poll")
+                    return
+                delta = sub.next_delta(timeout=min(keepalive, remaining))
+                if not delta:
+                    yield ": keepalive\n\n"   # tiene aperta la connessione dietro ai proxy
+                    continue
+                yield _sse(delta)
+                if delta.get("is_running") is False:
+                    yield _sse({}, "end")
+                    return
+        finally:
+            hub.unsubscribe(sub)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 @admin_bp.route("/wtrl_import/progress")
+@login_required
 def import_progress():
     """Displays the import progress page."""
-    return render_template("admin/import_progress.html")
-
+    job = _requested_job()
+    return_url = url_for(RETURN_ENDPOINTS.get(job.job_type if job else "teams", "admin_bp.wtrl_teams_page"))
+    return render_template("admin/import_progress.html", job=job, return_url=return_url)
@@ -1,37 +1,25 @@
 # newZRL/blueprints/admin/import_zwiftpower.py
-from flask import render_template, flash, redirect, url_for, request
+from flask import current_app, render_template, flash, redirect, url_for, request
 from flask_login import login_required
-from newZRL.scripts.zwiftpower_importer import scrape_team, import_members_to_db
+from newZRL.services.jobs import enqueue, active_job
 
 from ..bp import admin_bp
 
 @admin_bp.route("/import_zwiftpower/", methods=["GET", "POST"])
 @login_required
 def import_zwift_team():
-    """Importa tutti i rider del team INOX da ZwiftPower."""
+    """Importa tutti i rider di un team ZwiftPower (default INOX)."""
     if request.method == "POST":
-        try:
-            flash("⏳ Importazione in corso del team INOX...", "info")
+        running = active_job("zwiftpower")
+        if running:
+            flash("Un'altra importazione ZwiftPower è già in corso.", "warning")
+            return redirect(url_for("admin_bp.import_progress", job_id=running.id))
 
-            # scraping
-            members = scrape_team()
-
-            if not members:
-                flash("❌ Nessun corridore trovato o errore durante lo scraping.", "danger")
-                return redirect(url_for("admin_bp.import_zwift_team"))
-
-            # importa nel DB
-            results = import_members_to_db(members)
-            flash(
-                f"✅ Importazione completata: {results['new']} nuovi, "
-                f"{results['updated']} aggiornati, {results.get('deactivated', 0)} disattivati.",
-                "success"
-            )
-
-        except Exception as e:
-            flash(f"❌ Errore durante l'importazione: {e}", "danger")
-
-        return redirect(url_for("admin_bp.import_zwift_team"))
+        # Scraping e import nel DB girano nel worker dei job
+        team_id = request.form.get("team_id", type=int)
+        job = enqueue("zwiftpower", team_id=team_id)
+        flash(f"⏳ Importazione del team {team_id or 'INOX'} messa in coda...", "info")
+        return redirect(url_for("admin_bp.import_progress", job_id=job.id))
 
     # GET: mostra la pagina
-    return render_template("admin/import_zwiftpower.html")
+    return render_template("admin/import_zwiftpower.html", default_team_id=current_app.config.get("ZWIFTPOWER_TEAM_ID"))
@@ -10,7 +10,7 @@ import logging
 from newZRL.models.wtrl_rider import WTRL_Rider
 from newZRL.models.team import Team
 from newZRL.models.race_lineup import RaceLineup
-from newZRL.utils.race_utils import get_next_race_date
+from newZRL.services.race_calendar import get_race_calendar
 from utils.auth_decorators import require_roles
 
 logger = logging.getLogger(__name__)
@@ -58,7 +58,7 @@ def manage_lineup(trc, race_date):
 
     # --- Race Date ---
     if race_date == "next":
-        next_date = get_next_race_date(trc_int)
+        next_date = get_race_calendar().next_race_date_for_team(team)
         if not next_date:
             flash("⛔ Nessuna gara programmata", "warning")
             return render_template("admin/manage_lineup.html", error=True)
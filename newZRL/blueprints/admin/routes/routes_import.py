@@ -1,6 +1,6 @@
 from flask import redirect, url_for, flash, render_template
 from flask_login import login_required
-from newZRL.scripts.wtrl_local_import import run_import
+from newZRL.services.jobs import enqueue, active_job
 
 from ..bp import admin_bp
 
@@ -9,15 +9,16 @@ from ..bp import admin_bp
 @login_required
 def import_wtrl_local():
     """
-    Avvia importazione WTRL da JSON locali
+    Mette in coda l'importazione WTRL da JSON locali (flask jobs worker)
     """
-    try:
-        run_import()
-        flash("Importazione completata con successo!", "success")
-    except Exception as e:
-        flash(f"Errore durante l'importazione: {e}", "danger")
+    running = active_job("load-teams")
+    if running:
+        flash("Un'altra importazione locale è già in corso.", "warning")
+        return redirect(url_for("admin_bp.import_progress", job_id=running.id))
 
-    return redirect(url_for("admin_bp.imports_main_page")) # Changed here
+    job = enqueue("load-teams")
+    flash("⏳ Importazione dei JSON locali messa in coda...", "info")
+    return redirect(url_for("admin_bp.import_progress", job_id=job.id))
 
 
 @admin_bp.route("/imports/", methods=["GET"], endpoint="imports_main_page") # Changed here
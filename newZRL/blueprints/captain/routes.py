@@ -4,6 +4,7 @@ from flask import Blueprint, render_template, current_app, flash, redirect, url_
 from flask_login import login_required, current_user
 from newZRL import db
 from newZRL.models import Race, Round, Season, RiderAvailability, WTRL_Rider, User # Add all necessary models
+from newZRL.services.race_calendar import TUESDAY, get_race_calendar
 import json # For parsing availability_data, though it's already a dict if loaded correctly
 
 captain_bp = Blueprint("dashboard_captain", __name__, url_prefix="/captain")
@@ -17,19 +18,15 @@ def captain_dashboard():
         return redirect(url_for('main.index')) # Redirect to a safe page
 
     today = date.today()
-    
+
     # Find the next Tuesday's date (if today is Tuesday, it should be today)
     # Monday is 0, Tuesday is 1, ..., Sunday is 6
-    days_until_next_tuesday = (1 - today.weekday() + 7) % 7
-    # If today is Tuesday, and days_until_next_tuesday is 0, next_tuesday_date is today.
-    # If today is not Tuesday, days_until_next_tuesday will correctly calculate days until next Tuesday.
-    next_tuesday_date = today + timedelta(days=days_until_next_tuesday)
+    next_tuesday_date = today + timedelta(days=(TUESDAY - today.weekday()) % 7)
 
-    # Find the next ZRL race on that specific Tuesday
-    # Filter by Season.name containing 'ZRL', Race.race_date matching next_tuesday_date
-    next_zrl_race = Race.query.join(Round).join(Season).\
-        filter(Season.name.ilike('%ZRL%'), Race.race_date == next_tuesday_date).\
-        order_by(Race.race_date).first() # In case there are multiple races on the same Tuesday, pick the first one
+    # Gara ZRL (Season.name contiene 'ZRL') di quel martedì, dal calendario in memoria.
+    # In case there are multiple races on the same Tuesday, pick the first one
+    races = get_race_calendar().races_on(next_tuesday_date, zrl_only=True)
+    next_zrl_race = races[0] if races else None
 
     if not next_zrl_race:
         flash(f"Nessuna gara ZRL trovata per il prossimo martedì ({next_tuesday_date.strftime('%d/%m/%Y')}).", "info")
@@ -7,6 +7,52 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     LOGGING_LEVEL = logging.INFO
     WTRL_API_COOKIE = os.environ.get("WTRL_API_COOKIE")
+    # Base URL delle API WTRL (sovrascrivibile per il replay server dei benchmark)
+    WTRL_API_BASE_URL = os.environ.get("WTRL_API_BASE_URL", "https://www.wtrl.racing/api")
+    # Archivio compresso dei payload WTRL grezzi (teams, results, league, schedule),
+    # deduplicato per contenuto (default newZRL/data/archive)
+    WTRL_ARCHIVE_ENABLED = os.environ.get("WTRL_ARCHIVE_ENABLED", "1") == "1"
+    WTRL_ARCHIVE_DIR = os.environ.get("WTRL_ARCHIVE_DIR")
+    # Copia in chiaro dei payload team in team_<trc>.json (default newZRL/data/wtrl_json),
+    # letta da "flask data load-teams" e dal benchmark
+    WTRL_TEAMS_JSON_ENABLED = os.environ.get("WTRL_TEAMS_JSON_ENABLED", "1") == "1"
+    WTRL_TEAMS_JSON_DIR = os.environ.get("WTRL_TEAMS_JSON_DIR")
+    # Fetch concorrente verso WTRL: numero di worker e richieste/secondo condivise
+    WTRL_FETCH_WORKERS = int(os.environ.get("WTRL_FETCH_WORKERS", 4))
+    WTRL_REQUESTS_PER_SECOND = float(os.environ.get("WTRL_REQUESTS_PER_SECOND", 2.0))
+    # Cache su disco delle risposte WTRL (richieste condizionali ETag / Last-Modified)
+    WTRL_HTTP_CACHE_ENABLED = os.environ.get("WTRL_HTTP_CACHE_ENABLED", "1") == "1"
+    WTRL_HTTP_CACHE_DIR = os.environ.get("WTRL_HTTP_CACHE_DIR")
+    # Refresh incrementale classifiche: un segmento è definitivo dopo N giorni dalla
+    # fine del round (o N fetch consecutivi invariati se il round non ha date);
+    # quelli cambiati negli ultimi giorni vengono comunque ricontrollati
+    WTRL_RESULTS_FINAL_AFTER_DAYS = int(os.environ.get("WTRL_RESULTS_FINAL_AFTER_DAYS", 7))
+    WTRL_RESULTS_FINAL_AFTER_UNCHANGED = int(os.environ.get("WTRL_RESULTS_FINAL_AFTER_UNCHANGED", 3))
+    WTRL_REFRESH_RECENT_DAYS = int(os.environ.get("WTRL_REFRESH_RECENT_DAYS", 3))
+    # Import team: TRC del club (default data/team_trc_list.txt); WTRL_TEAMS_ALL_SEASON=1
+    # importa invece tutti i team scoperti nella stagione
+    WTRL_CLUB_TRC_FILE = os.environ.get("WTRL_CLUB_TRC_FILE")
+    WTRL_TEAMS_ALL_SEASON = os.environ.get("WTRL_TEAMS_ALL_SEASON", "0") == "1"
+    # Import a blocchi: segmenti classifiche e team scritti per ogni commit
+    # (ogni team ha comunque il proprio SAVEPOINT se la scrittura del blocco fallisce)
+    WTRL_RANKINGS_COMMIT_BATCH = int(os.environ.get("WTRL_RANKINGS_COMMIT_BATCH", 10))
+    WTRL_TEAMS_COMMIT_BATCH = int(os.environ.get("WTRL_TEAMS_COMMIT_BATCH", 25))
+    # Club ZwiftPower importato dal job "zwiftpower" (default INOX)
+    ZWIFTPOWER_TEAM_ID = int(os.environ.get("ZWIFTPOWER_TEAM_ID", 16461))
+    # Scraping headless dei profili ZwiftPower: thread e richieste/secondo condivise
+    ZWIFTPOWER_FETCH_WORKERS = int(os.environ.get("ZWIFTPOWER_FETCH_WORKERS", 8))
+    ZWIFTPOWER_REQUESTS_PER_SECOND = float(os.environ.get("ZWIFTPOWER_REQUESTS_PER_SECOND", 8.0))
+    # Calendario gare in memoria: ogni quanti secondi controllare se il worker ha reimportato il calendario
+    RACE_CALENDAR_CHECK_INTERVAL = int(os.environ.get("RACE_CALENDAR_CHECK_INTERVAL", 30))
+    # Intervallo minimo (secondi) tra due scritture dell'avanzamento di un job
+    JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", 1.0))
+    # Heartbeat dei job in esecuzione (secondi), indipendente dall'avanzamento
+    JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 60))
+    # Stream SSE dell'avanzamento: intervallo minimo tra due eventi e keepalive (secondi)
+    JOB_EVENTS_INTERVAL = float(os.environ.get("JOB_EVENTS_INTERVAL", 1.0))
+    JOB_EVENTS_KEEPALIVE = int(os.environ.get("JOB_EVENTS_KEEPALIVE", 15))
+    # Durata massima di uno stream SSE: poi il client passa al polling
+    JOB_EVENTS_MAX_SECONDS = int(os.environ.get("JOB_EVENTS_MAX_SECONDS", 120))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -21,6 +67,14 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite:///:memory:")
     WTF_CSRF_ENABLED = False
     SECRET_KEY = "a-secret-key-for-testing"
+    WTRL_HTTP_CACHE_ENABLED = False
+    WTRL_ARCHIVE_ENABLED = False
+    WTRL_TEAMS_JSON_ENABLED = False
+
+class BenchmarkConfig(TestingConfig):
+    # Benchmark degli importer contro il replay server (python -m newZRL.bench)
+    SQLALCHEMY_DATABASE_URI = os.environ.get("BENCH_DATABASE_URL", "sqlite:///:memory:")
+    LOGGING_LEVEL = logging.WARNING
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -50,5 +104,6 @@ class ProductionConfig(Config):
 config_by_name = {
     "development": DevelopmentConfig,
     "testing": TestingConfig,
+    "benchmark": BenchmarkConfig,
     "production": ProductionConfig,
 }
\ No newline at end of file
@@ -9,3 +9,6 @@ from .race_lineup import RaceLineup
 from .user import User
 from .rider_availability import RiderAvailability
 from .wtrl import WTRLCompetition, WTRLLeague, WTRLDivision, WTRLRace
+from .import_job import ImportJob
+from .rankings_import_state import RankingsImportState
+from .team_index_entry import TeamIndexEntry
@@ -0,0 +1,58 @@
+from datetime import datetime
+from newZRL import db
+
+class ImportJob(db.Model):
+    """Job di import in coda, eseguito dal worker `flask jobs worker`."""
+    __tablename__ = "import_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)  # rankings, teams, schedule, zwiftpower
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    progress = db.Column(db.Integer, default=0)
+    message = db.Column(db.String(500))
+    # Avanzamento dettagliato scritto dal ProgressTracker (services/job_progress.py)
+    items_done = db.Column(db.Integer, default=0)
+    items_total = db.Column(db.Integer)
+    error_count = db.Column(db.Integer, default=0)
+    items_per_second = db.Column(db.Float)
+    eta_seconds = db.Column(db.Integer)
+    phase = db.Column(db.String(30))
+    phase_timings = db.Column(db.JSON)  # fase -> secondi cumulati
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    worker_id = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def is_active(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self, include_error=False):
+        """Stato del job per status / SSE; il traceback (`error`) solo se richiesto esplicitamente."""
+        data = {
+            "id": self.id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "progress": self.progress or 0,
+            "message": self.message,
+            "is_running": self.is_active,
+            "items_done": self.items_done or 0,
+            "items_total": self.items_total,
+            "error_count": self.error_count or 0,
+            "items_per_second": self.items_per_second,
+            "eta_seconds": self.eta_seconds if self.is_active else None,
+            "phase": self.phase,
+            "phase_timings": self.phase_timings or {},
+            "result": self.result,
+        }
+        if include_error:
+            data["error"] = self.error
+        return data
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.job_type} {self.status}>"
@@ -1,9 +1,13 @@
 from datetime import datetime
 from newZRL import db
-from sqlalchemy import event
+from sqlalchemy import event, UniqueConstraint
 
 class RaceResultsTeam(db.Model):
     __tablename__ = "race_results_teams"
+    # Chiave naturale usata dall'upsert bulk dell'import classifiche
+    __table_args__ = (
+        UniqueConstraint("season", "class_id", "race", "team_id", name="uq_race_results_teams_segment_team"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     season = db.Column(db.Integer, nullable=False)
@@ -25,6 +29,9 @@ class RaceResultsTeam(db.Model):
 
 class RaceResultsRider(db.Model):
     __tablename__ = "race_results_riders"
+    __table_args__ = (
+        UniqueConstraint("race_team_result_id", "rider_id", name="uq_race_results_riders_result_rider"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     race_team_result_id = db.Column(db.Integer, db.ForeignKey("race_results_teams.id"), nullable=False, index=True)
@@ -44,6 +51,9 @@ class RaceResultsRider(db.Model):
 
 class RoundStanding(db.Model):
     __tablename__ = "round_standings"
+    __table_args__ = (
+        UniqueConstraint("season", "class_id", "team_id", name="uq_round_standings_season_class_team"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     season = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from newZRL import db
+from sqlalchemy import UniqueConstraint
+
+class RankingsImportState(db.Model):
+    """Watermark dell'import classifiche per segmento (season, class, race)."""
+    __tablename__ = "rankings_import_states"
+    __table_args__ = (
+        UniqueConstraint("season", "class_id", "race", name="uq_rankings_import_states_segment"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    season = db.Column(db.Integer, nullable=False, index=True)
+    class_id = db.Column(db.String(50), nullable=False)
+    race = db.Column(db.Integer, nullable=False)
+    payload_hash = db.Column(db.String(64))        # sha256 di results + league
+    fetched_at = db.Column(db.DateTime)            # ultimo fetch riuscito
+    imported_at = db.Column(db.DateTime)           # ultima scrittura sul DB
+    changed_at = db.Column(db.DateTime)            # ultima volta che il payload è cambiato
+    unchanged_fetches = db.Column(db.Integer, default=0)  # fetch consecutivi con payload invariato
+    is_final = db.Column(db.Boolean, default=False, nullable=False)
+
+    def __repr__(self):
+        return f"<RankingsImportState S{self.season} {self.class_id} R{self.race} final={self.is_final}>"
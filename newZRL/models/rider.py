@@ -11,6 +11,16 @@ class Rider(db.Model):
     category = db.Column(db.String(10))
     member_status = db.Column(db.String(50))
 
+    # Dati del club ZwiftPower (services/zwiftpower_sync.py)
+    zp_team_id = db.Column(db.Integer, index=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())  # False se uscito dal club
+    country = db.Column(db.String(10))
+    weight = db.Column(db.Float)
+    ftp = db.Column(db.Integer)
+    races = db.Column(db.Integer)
+    zp_rank = db.Column(db.Float)
+    zp_synced_at = db.Column(db.DateTime)
+
     # Relazione verso WTRL_Rider (uno-a-uno)
     wtrl_data = db.relationship(
         "newZRL.models.wtrl_rider.WTRL_Rider",
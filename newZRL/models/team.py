@@ -23,6 +23,7 @@ class Team(db.Model):
     members_remaining = db.Column(db.Integer)
     captain_name = db.Column(db.String(255))
     captain_profile_id = db.Column(db.Integer)
+    payload_hash = db.Column(db.String(64))  # sha256 dell'ultimo payload WTRL importato
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
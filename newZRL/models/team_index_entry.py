@@ -0,0 +1,24 @@
+from datetime import datetime
+from newZRL import db
+from sqlalchemy import UniqueConstraint
+
+class TeamIndexEntry(db.Model):
+    """Indice dei TRC scoperti per stagione (services/team_discovery.py)."""
+    __tablename__ = "team_index_entries"
+    __table_args__ = (
+        UniqueConstraint("season", "trc", name="uq_team_index_entries_season_trc"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    season = db.Column(db.Integer, nullable=False, index=True)
+    trc = db.Column(db.Integer, nullable=False)
+    class_id = db.Column(db.String(50))
+    name = db.Column(db.String(255))
+    division = db.Column(db.String(100))
+    entry_hash = db.Column(db.String(64), nullable=False)   # sha256 dei campi scoperti
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    removed_at = db.Column(db.DateTime)                     # non più presente nell'indice
+
+    def __repr__(self):
+        return f"<TeamIndexEntry S{self.season} TRC {self.trc} {self.class_id}>"
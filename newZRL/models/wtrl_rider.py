@@ -23,6 +23,7 @@ class WTRL_Rider(db.Model):
     appearances_round = db.Column(db.Integer)
     appearances_season = db.Column(db.Integer)
     user_id = db.Column(db.String(100))
+    payload_hash = db.Column(db.String(64))  # fingerprint dei campi importati da WTRL
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
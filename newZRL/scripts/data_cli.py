@@ -0,0 +1,73 @@
+# newZRL/scripts/data_cli.py
+"""
+Strumenti offline da riga di comando (flask data ...), eseguiti subito nel
+processo corrente e non tramite la coda dei job (flask jobs ...).
+"""
+
+import click
+from flask.cli import AppGroup
+
+data_cli = AppGroup("data", help="Strumenti offline: indice team, JSON locali, struttura WTRL, ZwiftPower.")
+
+
+@data_cli.command("discover-teams")
+@click.option("--season", "seasons", multiple=True, required=True, type=int, help="Stagione (ripetibile).")
+@click.option("--race", "races", multiple=True, type=int, help="Race dei results da leggere (default: l'ultima iniziata).")
+def discover_teams_command(seasons, races):
+    """Aggiorna l'indice dei TRC delle stagioni indicate, senza importare i team."""
+    from newZRL.services.team_discovery import refresh_team_index
+
+    for season, diff in refresh_team_index(seasons, races or None).items():
+        if diff is None:
+            click.echo(f"Stagione {season}: nessun TRC trovato.")
+            continue
+        click.echo(f"Stagione {season}: " + ", ".join(f"{len(trcs)} {key}" for key, trcs in diff.items()))
+
+
+@data_cli.command("load-teams")
+@click.argument("data_dir", required=False, type=click.Path(file_okay=False))
+@click.option("--workers", type=int, help="Processi per il parse dei file (default: numero di CPU).")
+def load_teams_command(data_dir, workers):
+    """Carica offline i JSON team WTRL di una cartella (default data/wtrl_json)."""
+    from newZRL.services.team_bulk_load import DATA_DIR, bulk_load_team_dir
+
+    summary = bulk_load_team_dir(data_dir or DATA_DIR, workers=workers)
+    click.echo(
+        f"{summary['files']} file in {summary['seconds']}s ({summary['files_per_second']} file/s): "
+        f"{summary['teams']} team, {summary['riders']} rider ({summary['rows_per_second']} righe/s), "
+        f"{summary['departed_deleted']} rider usciti eliminati ({summary['departed_kept']} tenuti perché referenziati)."
+    )
+    for error in summary["errors"]:
+        click.echo(f"  errore: {error}")
+
+
+@data_cli.command("sync-structure")
+@click.argument("source", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option("--no-prune", is_flag=True, help="Non eliminare gli elementi assenti dal file (file parziale).")
+def sync_structure_command(source, no_prune):
+    """Allinea competition, league, division e race WTRL a wtrl_full.json (o al file indicato)."""
+    from newZRL.services.wtrl_structure import STRUCTURE_FILE, sync_wtrl_structure
+
+    for table, changes in sync_wtrl_structure(source or STRUCTURE_FILE, prune=not no_prune).items():
+        click.echo(f"{table}: {changes['insert']} nuovi, {changes['update']} aggiornati, {changes['delete']} eliminati")
+
+
+@data_cli.command("scrape-zwiftpower")
+@click.option("--team-id", type=int, help="Team ZwiftPower (default ZWIFTPOWER_TEAM_ID).")
+@click.option("--workers", type=int, help="Thread per il download dei profili (default ZWIFTPOWER_FETCH_WORKERS).")
+@click.option("--rate", type=float, help="Richieste al secondo (default ZWIFTPOWER_REQUESTS_PER_SECOND).")
+@click.option("--export-dir", default="exports", show_default=True, type=click.Path(file_okay=False))
+@click.option("--no-db", is_flag=True, help="Solo CSV, senza aggiornare la tabella riders.")
+def scrape_zwiftpower_command(team_id, workers, rate, export_dir, no_db):
+    """Scraping headless dei profili ZwiftPower del club: riders nel DB e CSV in export-dir."""
+    from newZRL.services.zwiftpower_scraper import scrape_club
+
+    summary = scrape_club(team_id, workers=workers, rate=rate, export_dir=export_dir, write_db=not no_db)
+    click.echo(
+        f"{summary['profiles']}/{summary['members']} profili in {summary['fetch_seconds']}s "
+        f"({summary['profiles_per_second']} profili/s), CSV: {summary['csv']}"
+    )
+    if not no_db:
+        click.echo(f"riders: {summary['new']} nuovi, {summary['updated']} aggiornati, {summary['deactivated']} disattivati")
+    for error in summary["errors"]:
+        click.echo(f"  errore: {error}")
@@ -2,8 +2,7 @@
 import requests
 import json
 from flask import current_app
-from newZRL import db
-from newZRL.models import Rider
+from newZRL.services.zwiftpower_sync import DEFAULT_TEAM_ID, sync_members
 
 COOKIE = (
     "phpbb3_lswlk_k=; "
@@ -21,12 +20,17 @@ HEADERS = {
     "Cookie": COOKIE,
 }
 
-TEAM_URL = "https://zwiftpower.com/api3.php?do=team_riders&id=16461"
+TEAM_URL = "https://zwiftpower.com/api3.php?do=team_riders&id={team_id}"
 
 
-def scrape_team():
-    """Scarica i membri del team INOX da ZwiftPower API."""
-    r = requests.get(TEAM_URL, headers=HEADERS)
+def _team_id(team_id=None):
+    """Team ZwiftPower indicato, altrimenti ZWIFTPOWER_TEAM_ID della config (default INOX)."""
+    return int(team_id or current_app.config.get("ZWIFTPOWER_TEAM_ID", DEFAULT_TEAM_ID))
+
+
+def scrape_team(team_id=None):
+    """Scarica i membri del team (default INOX) da ZwiftPower API."""
+    r = requests.get(TEAM_URL.format(team_id=_team_id(team_id)), headers=HEADERS)
     data = json.loads(r.text)
 
     riders = data.get("data", [])
@@ -63,26 +67,6 @@ def scrape_team():
     return parsed
 
 
-def import_members_to_db(members):
-    """Importa o aggiorna rider nel DB."""
-    new = 0
-    updated = 0
-
-    for m in members:
-        rid = Rider.query.filter_by(zwift_power_id=m["zwift_power_id"]).first()
-
-        if not rid:
-            rid = Rider(zwift_power_id=m["zwift_power_id"])
-            new += 1
-        else:
-            updated += 1
-
-        for key, value in m.items():
-            if hasattr(rid, key):
-                setattr(rid, key, value)
-
-        db.session.add(rid)
-
-    db.session.commit()
-
-    return {"new": new, "updated": updated}
+def import_members_to_db(members, team_id=None):
+    """Importa o aggiorna i rider del team nel DB e disattiva quelli usciti (sync bulk)."""
+    return sync_members(members, _team_id(team_id))
@@ -0,0 +1,146 @@
+# newZRL/services/bulk_upsert.py
+
+import csv
+import io
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from newZRL import db
+
+BATCH_SIZE = 500
+
+
+def chunked(items, size=BATCH_SIZE):
+    """Divide una lista in blocchi da `size` elementi."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_keys(column, keys, chunk_size=BATCH_SIZE):
+    """Ritorna il set dei valori di `keys` già presenti in `column`, con query IN (...) a blocchi."""
+    found = set()
+    for batch in chunked(set(keys), chunk_size):
+        found.update(db.session.scalars(db.select(column).where(column.in_(batch))))
+    return found
+
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def upsert(model, rows, key_columns, update_columns, batch_size=BATCH_SIZE):
+    """
+    Inserisce o aggiorna `rows` (lista di dict) sulla tabella di `model` usando
+    l'upsert nativo del dialetto:
+      - PostgreSQL / SQLite: INSERT ... ON CONFLICT (key_columns) DO UPDATE
+      - MySQL / MariaDB:     INSERT ... ON DUPLICATE KEY UPDATE
+    `key_columns` deve corrispondere a un vincolo UNIQUE della tabella.
+    Le righe vengono scritte a blocchi di `batch_size` nella transazione corrente.
+    Ritorna il numero di righe inviate.
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    dialect = _dialect_name()
+
+    for batch in chunked(rows, batch_size):
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(table).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={c: stmt.excluded[c] for c in update_columns},
+            )
+        elif dialect in ("mysql", "mariadb"):
+            stmt = mysql.insert(table).values(batch)
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+        else:
+            _fallback_upsert(model, batch, key_columns, update_columns)
+            continue
+        db.session.execute(stmt)
+
+    return len(rows)
+
+
+def bulk_load(model, rows, key_columns, update_columns, batch_size=BATCH_SIZE):
+    """
+    Come upsert(), per caricamenti offline di molte righe: su PostgreSQL le righe
+    passano con COPY in una tabella temporanea e da lì con un solo
+    INSERT ... SELECT ... ON CONFLICT; sugli altri dialetti si usa upsert()
+    (INSERT multi-riga a blocchi). Ritorna il numero di righe inviate.
+    """
+    if not rows:
+        return 0
+    if _dialect_name() != "postgresql":
+        return upsert(model, rows, key_columns, update_columns, batch_size)
+    _copy_upsert(model, rows, key_columns, update_columns)
+    return len(rows)
+
+
+def _copy_upsert(model, rows, key_columns, update_columns):
+    """COPY ... FROM STDIN (CSV) in una tabella temporanea + upsert set-based nella tabella finale."""
+    table = model.__table__.name
+    staging = f"_load_{table}"
+    columns = list(rows[0])
+    column_list = ", ".join(f'"{c}"' for c in columns)
+
+    buf = io.StringIO()
+    # QUOTE_NONNUMERIC: None diventa un campo vuoto non quotato, cioè NULL per COPY CSV
+    writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row.get(c) for c in columns])
+    buf.seek(0)
+
+    conn = db.session.connection()
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{staging}"')
+    conn.exec_driver_sql(
+        f'CREATE TEMP TABLE "{staging}" (LIKE "{table}" INCLUDING DEFAULTS) ON COMMIT DROP'
+    )
+    copy_sql = f'COPY "{staging}" ({column_list}) FROM STDIN WITH (FORMAT csv)'
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):   # psycopg2
+            cursor.copy_expert(copy_sql, buf)
+        else:                                # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buf.getvalue())
+    finally:
+        cursor.close()
+
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
+    conn.exec_driver_sql(
+        f'INSERT INTO "{table}" ({column_list}) SELECT {column_list} FROM "{staging}" '
+        f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET {updates}'
+    )
+    conn.exec_driver_sql(f'DROP TABLE "{staging}"')
+
+
+def _fallback_upsert(model, batch, key_columns, update_columns):
+    """Upsert generico per dialetti senza supporto nativo: una SELECT per blocco + executemany."""
+    table = model.__table__
+    key_cols = [table.c[k] for k in key_columns]
+    pk_cols = list(table.primary_key.columns)
+    existing = {}
+    conditions = [db.and_(*(col == row[col.name] for col in key_cols)) for row in batch]
+    for r in db.session.execute(db.select(*pk_cols, *key_cols).where(db.or_(*conditions))):
+        existing[tuple(r._mapping[k] for k in key_columns)] = {c.name: r._mapping[c.name] for c in pk_cols}
+
+    inserts, updates = [], []
+    for row in batch:
+        pk = existing.get(tuple(row[k] for k in key_columns))
+        if pk is None:
+            inserts.append(row)
+        else:
+            updates.append({**pk, **{c: row[c] for c in update_columns}})
+    if inserts:
+        db.session.execute(db.insert(model), inserts)
+    if updates:
+        db.session.execute(db.update(model), updates)
+
+
+def changed(existing, row, columns):
+    """True se `row` è nuova (existing None) o differisce da `existing` su almeno una colonna."""
+    if existing is None:
+        return True
+    return any(existing.get(c) != row.get(c) for c in columns)
@@ -0,0 +1,137 @@
+# newZRL/services/http_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+_caches_lock = threading.Lock()
+
+
+def content_hash(body):
+    """SHA-256 esadecimale del corpo della risposta."""
+    return hashlib.sha256(body).hexdigest()
+
+
+class CachedResponse:
+    """Risposta servita dalla cache (304 Not Modified) con la stessa interfaccia minima di requests.Response."""
+
+    from_cache = True
+
+    def __init__(self, url, body, content_hash, status_code=304):
+        self.url = url
+        self.content = body
+        self.content_hash = content_hash
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """
+    Cache su disco delle risposte WTRL indicizzata per URL.
+    Per ogni URL salva il corpo, ETag / Last-Modified e l'hash del contenuto.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url):
+        """Metadati della voce in cache per `url`, oppure None."""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def body(self, url):
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def conditional_headers(self, url):
+        """Header If-None-Match / If-Modified-Since per una richiesta condizionale."""
+        entry = self.get(url)
+        if not entry or self.body(url) is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response):
+        """Salva una risposta 200 e ritorna l'hash del contenuto."""
+        body = response.content
+        digest = content_hash(body)
+        entry = self.get(url) or {}
+        entry.update({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": digest,
+        })
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            # Il corpo si riscrive se è cambiato o se il file è sparito dal disco
+            if entry.get("stored_hash") != digest or not os.path.exists(body_path):
+                self._atomic_write(body_path, body)
+            entry["stored_hash"] = digest
+            self._atomic_write(meta_path, json.dumps(entry).encode("utf-8"))
+        return digest
+
+    def cached_response(self, url):
+        """Ricostruisce la risposta dalla cache (usato quando il server risponde 304)."""
+        entry = self.get(url)
+        body = self.body(url)
+        if entry is None or body is None:
+            return None
+        return CachedResponse(url, body, entry["content_hash"])
+
+    @staticmethod
+    def _atomic_write(path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def get_response_cache(app):
+    """
+    Cache delle risposte WTRL configurata per l'app (None se disabilitata).
+    Un'unica istanza per app e cartella, tenuta in app.extensions: lo stesso lock
+    protegge le scritture di tutti gli import del processo.
+    """
+    if not app.config.get("WTRL_HTTP_CACHE_ENABLED", True):
+        return None
+    directory = app.config.get("WTRL_HTTP_CACHE_DIR") or os.path.join(app.root_path, "data", "http_cache")
+    with _caches_lock:
+        caches = app.extensions.setdefault("response_cache", {})
+        cache = caches.get(directory)
+        if cache is None:
+            cache = caches[directory] = ResponseCache(directory)
+        return cache
@@ -0,0 +1,127 @@
+# newZRL/services/job_events.py
+"""
+Fan-out dell'avanzamento dei job verso gli stream SSE (/admin/wtrl_import/events).
+
+Per ogni processo web un solo thread legge dal DB, con un'unica query, i job
+che qualcuno sta guardando, al massimo una volta ogni JOB_EVENTS_INTERVAL
+secondi. Ai sottoscrittori arrivano solo i campi cambiati (delta). Se un client
+è lento, i delta in attesa vengono fusi in uno solo: N tab aperte sullo stesso
+job costano una query per intervallo, non N richieste al secondo.
+"""
+
+import threading
+import time
+
+from newZRL import db
+from newZRL.models.import_job import ImportJob
+
+
+class Subscription:
+    """Delta in attesa per un client; publish() fonde quelli non ancora letti."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._pending = {}
+        self._cond = threading.Condition()
+
+    def publish(self, delta):
+        with self._cond:
+            self._pending.update(delta)
+            self._cond.notify_all()
+
+    def next_delta(self, timeout=None):
+        """Delta accumulato dall'ultima lettura, oppure {} allo scadere del timeout."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            delta, self._pending = self._pending, {}
+            return delta
+
+
+def diff(previous, current):
+    """Campi di `current` cambiati rispetto a `previous`."""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class JobEventHub:
+    """Un thread per processo che interroga i job osservati e notifica i sottoscrittori."""
+
+    def __init__(self, app, interval=1.0):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers = {}   # job_id -> set di Subscription
+        self._snapshots = {}     # job_id -> ultimo to_dict() letto
+        self._thread = None
+
+    def subscribe(self, job_id, snapshot=None):
+        """
+        Nuovo sottoscrittore per `job_id`. `snapshot` è lo stato già inviato al client:
+        se l'hub ha letto nel frattempo qualcosa di più recente, il client lo riceve subito.
+        """
+        sub = Subscription(job_id)
+        with self._lock:
+            known = self._snapshots.get(job_id)
+            if known is None:
+                if snapshot is not None:
+                    self._snapshots[job_id] = snapshot
+            elif snapshot is not None:
+                delta = diff(snapshot, known)
+                if delta:
+                    sub.publish(delta)
+            self._subscribers.setdefault(job_id, set()).add(sub)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="job-events", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.job_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.job_id]
+                    self._snapshots.pop(sub.job_id, None)
+
+    def poll(self):
+        """Legge i job osservati e pubblica i delta; ritorna False se non c'è più nessuno in ascolto."""
+        with self._lock:
+            job_ids = list(self._subscribers)
+        if not job_ids:
+            return False
+        jobs = db.session.execute(db.select(ImportJob).where(ImportJob.id.in_(job_ids))).scalars().all()
+        snapshots = {job.id: job.to_dict() for job in jobs}
+        db.session.remove()
+
+        with self._lock:
+            for job_id, snapshot in snapshots.items():
+                delta = diff(self._snapshots.get(job_id, {}), snapshot)
+                self._snapshots[job_id] = snapshot
+                if delta:
+                    for sub in self._subscribers.get(job_id, ()):
+                        sub.publish(delta)
+        return True
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    if not self.poll():
+                        with self._lock:
+                            # Riverifica sotto lock: un subscribe concorrente riavvia il thread
+                            if not self._subscribers:
+                                self._thread = None
+                                return
+                except Exception:
+                    self.app.logger.exception("[job_events] Lettura avanzamento job fallita")
+                    db.session.remove()
+                time.sleep(self.interval)
+
+
+def get_event_hub(app):
+    """Hub dell'app (uno per processo), creato al primo uso."""
+    hub = app.extensions.get("job_events")
+    if hub is None:
+        hub = app.extensions.setdefault("job_events", JobEventHub(app, app.config.get("JOB_EVENTS_INTERVAL", 1.0)))
+    return hub
@@ -0,0 +1,170 @@
+# newZRL/services/job_progress.py
+"""
+Avanzamento dei job di import: elementi fatti / totali, elementi/s, ETA,
+tempo per fase (fetch, parse, write) ed errori.
+
+Il ProgressTracker è chiamabile come il vecchio `report(progress, message)`,
+quindi gli importer lo usano allo stesso modo da qualsiasi thread. I contatori
+restano in memoria e vengono scritti sul job (riga import_jobs) al massimo una
+volta ogni `min_interval` secondi: migliaia di advance() al secondo producono
+comunque un solo UPDATE, leggibile da tutti i processi web.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Peso dell'ultimo intervallo nella media mobile degli elementi/s
+RATE_SMOOTHING = 0.3
+
+
+class ProgressTracker:
+    """Contatori di avanzamento thread-safe con scrittura throttled su `sink(values)`."""
+
+    def __init__(self, sink=None, total=None, min_interval=1.0, clock=time.monotonic):
+        self._sink = sink
+        self._clock = clock
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.progress = 0
+        self.message = None
+        self.current_phase = None
+        self.phases = {}
+        self.rate = None
+        self._started = clock()
+        self._last_write = None
+        self._last_sample = (self._started, 0)
+        self._dirty = False
+
+    # --------------------------
+    # AGGIORNAMENTI
+    # --------------------------
+    def __call__(self, progress=None, message=None):
+        """Compatibile con report(progress, message) degli importer."""
+        with self._lock:
+            if progress is not None:
+                self.progress = int(progress)
+            if message is not None:
+                self.message = message
+            self._dirty = True
+        self.flush(force=False)
+
+    def start(self, total, message=None):
+        """Imposta il numero di elementi previsti (ricalcola la percentuale)."""
+        with self._lock:
+            self.total = total
+            if message is not None:
+                self.message = message
+            self._update_progress()
+            self._dirty = True
+        self.flush(force=False)
+
+    def advance(self, n=1, message=None):
+        with self._lock:
+            self.done += n
+            if message is not None:
+                self.message = message
+            self._update_progress()
+            self._dirty = True
+        self.flush(force=False)
+
+    def error(self, n=1, message=None):
+        with self._lock:
+            self.errors += n
+            if message is not None:
+                self.message = message
+            self._dirty = True
+        self.flush(force=False)
+
+    def add_phase_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            self._dirty = True
+
+    @contextmanager
+    def phase(self, name):
+        """Somma al tempo della fase `name` la durata del blocco (anche da più thread)."""
+        with self._lock:
+            self.current_phase = name
+        start = self._clock()
+        try:
+            yield self
+        finally:
+            self.add_phase_time(name, self._clock() - start)
+
+    def _update_progress(self):
+        if self.total:
+            self.progress = min(100, int(self.done * 100 / self.total))
+
+    # --------------------------
+    # LETTURA / SCRITTURA
+    # --------------------------
+    def _sample_rate(self, now):
+        """Elementi/s come media mobile degli intervalli tra una scrittura e l'altra."""
+        last_time, last_done = self._last_sample
+        if now - last_time <= 0:
+            return
+        current = (self.done - last_done) / (now - last_time)
+        self.rate = current if self.rate is None else RATE_SMOOTHING * current + (1 - RATE_SMOOTHING) * self.rate
+        self._last_sample = (now, self.done)
+
+    @property
+    def eta_seconds(self):
+        if not self.total or not self.rate:
+            return None
+        return max(0, int((self.total - self.done) / self.rate))
+
+    def snapshot(self):
+        """Valori correnti nel formato delle colonne di ImportJob."""
+        with self._lock:
+            return self._values()
+
+    def _values(self):
+        values = {
+            "progress": self.progress,
+            "items_done": self.done,
+            "items_total": self.total,
+            "error_count": self.errors,
+            "items_per_second": round(self.rate, 3) if self.rate is not None else None,
+            "eta_seconds": self.eta_seconds,
+            "phase": self.current_phase,
+            "phase_timings": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+        }
+        if self.message is not None:
+            values["message"] = self.message[:500]
+        return values
+
+    def flush(self, force=True):
+        """Scrive lo stato sul sink se è cambiato e (senza `force`) è passato almeno min_interval."""
+        if self._sink is None:
+            return False
+        with self._lock:
+            now = self._clock()
+            if not self._dirty:
+                return False
+            if not force and self._last_write is not None and now - self._last_write < self.min_interval:
+                return False
+            self._sample_rate(now)
+            values = self._values()
+            self._dirty = False
+            self._last_write = now
+        with self._write_lock:
+            self._sink(values)
+        return True
+
+
+def as_tracker(report):
+    """
+    ProgressTracker per il parametro `report` di un importer: quello passato dal
+    worker dei job, uno che inoltra a una semplice funzione report(progress, message),
+    oppure uno senza sink se report è None.
+    """
+    if isinstance(report, ProgressTracker):
+        return report
+    if report is None:
+        return ProgressTracker()
+    return ProgressTracker(sink=lambda values: report(values["progress"], values.get("message")), min_interval=0)
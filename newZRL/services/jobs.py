@@ -0,0 +1,335 @@
+# newZRL/services/jobs.py
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from newZRL import db
+from newZRL.models.import_job import ImportJob
+from newZRL.services.job_progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+# Job "running" senza heartbeat da più di così vengono rimessi in coda (worker morto)
+STALE_AFTER = timedelta(minutes=15)
+# Secondi tra due heartbeat di un job in esecuzione (molto meno di STALE_AFTER)
+HEARTBEAT_INTERVAL = 60
+MAX_ATTEMPTS = 3
+
+# job_type -> handler(report, **params)
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """Registra una funzione come handler per `job_type`."""
+    def decorator(f):
+        JOB_HANDLERS[job_type] = f
+        return f
+    return decorator
+
+
+# --------------------------
+# CODA
+# --------------------------
+def enqueue(job_type, **params):
+    """Mette in coda un job e ritorna l'ImportJob creato."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Tipo di job sconosciuto: {job_type}")
+    job = ImportJob(job_type=job_type, params=params, status="queued", message="In coda...")
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def active_job(job_type):
+    """Ultimo job in coda o in esecuzione per `job_type`, se esiste."""
+    return ImportJob.query.filter(
+        ImportJob.job_type == job_type,
+        ImportJob.status.in_(("queued", "running"))
+    ).order_by(ImportJob.id.desc()).first()
+
+
+def _requeue_stale():
+    """Job "running" senza heartbeat: di nuovo in coda, oppure falliti se hanno esaurito i tentativi."""
+    now = datetime.utcnow()
+    stale = (ImportJob.status == "running", ImportJob.heartbeat_at < now - STALE_AFTER)
+    requeued = db.session.execute(
+        db.update(ImportJob)
+        .where(*stale, ImportJob.attempts < MAX_ATTEMPTS)
+        .values(status="queued", worker_id=None, message="Rimesso in coda dopo interruzione del worker")
+    ).rowcount
+    failed = db.session.execute(
+        db.update(ImportJob)
+        .where(*stale, ImportJob.attempts >= MAX_ATTEMPTS)
+        .values(status="failed", finished_at=now,
+                message=f"Worker interrotto {MAX_ATTEMPTS} volte: job abbandonato")
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        logger.warning(f"[jobs] {requeued} job bloccati rimessi in coda")
+    if failed:
+        logger.warning(f"[jobs] {failed} job bloccati segnati come falliti (tentativi esauriti)")
+
+
+def claim_next(worker_id):
+    """
+    Prende il prossimo job in coda. La SELECT usa FOR UPDATE SKIP LOCKED
+    (PostgreSQL / MySQL 8) così più worker non si contendono la stessa riga;
+    l'UPDATE condizionato su status garantisce il claim anche dove il lock
+    non è supportato (SQLite).
+    """
+    _requeue_stale()
+    while True:
+        job_id = db.session.scalar(
+            db.select(ImportJob.id)
+            .where(ImportJob.status == "queued")
+            .order_by(ImportJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == "queued")
+            .values(status="running", worker_id=worker_id, started_at=now, heartbeat_at=now,
+                    attempts=ImportJob.attempts + 1, message="Avvio...")
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(ImportJob, job_id)
+
+
+def update_job(job_id, engine=None, **values):
+    """
+    Aggiorna lo stato di un job su una connessione separata, senza toccare la sessione dell'import.
+    Passando `engine` si può chiamare anche dai thread senza app context.
+    """
+    values.setdefault("heartbeat_at", datetime.utcnow())
+    with (engine or db.engine).begin() as conn:
+        conn.execute(db.update(ImportJob.__table__).where(ImportJob.__table__.c.id == job_id).values(**values))
+
+
+class Heartbeat:
+    """
+    Thread che aggiorna heartbeat_at ogni `interval` secondi mentre il job gira,
+    indipendentemente dall'avanzamento: una fase lunga senza report (fetch di un
+    segmento grande, attesa di WTRL) non fa sembrare morto il worker.
+    """
+
+    def __init__(self, job_id, engine, interval):
+        self.job_id = job_id
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                update_job(self.job_id, engine=self.engine)
+            except Exception as e:
+                logger.warning(f"[jobs] Heartbeat del job {self.job_id} non scritto: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(job):
+    """Esegue un job già claimato e ne registra l'esito."""
+    handler = JOB_HANDLERS.get(job.job_type)
+    job_id = job.id
+    params = dict(job.params or {})
+    engine = db.engine
+    config = current_app.config
+    # Gli handler ricevono il tracker come `report`: scritture throttled, sicure dai thread
+    report = ProgressTracker(sink=lambda values: update_job(job_id, engine=engine, **values),
+                             min_interval=config.get("JOB_PROGRESS_INTERVAL", 1.0))
+
+    try:
+        if handler is None:
+            raise ValueError(f"Tipo di job sconosciuto: {job.job_type}")
+        with Heartbeat(job_id, engine, config.get("JOB_HEARTBEAT_INTERVAL", HEARTBEAT_INTERVAL)):
+            result = handler(report, **params)
+    except Exception as e:
+        report.flush()
+        db.session.rollback()
+        logger.error(f"[jobs] Job {job_id} ({job.job_type}) fallito: {e}", exc_info=True)
+        update_job(job_id, status="failed", message=str(e)[:500], error=traceback.format_exc(),
+                   finished_at=datetime.utcnow())
+        return False
+
+    report.flush()
+    message = (result or {}).get("message") if isinstance(result, dict) else None
+    update_job(job_id, status="done", progress=100, result=result, finished_at=datetime.utcnow(),
+               message=(message or "Importazione completata.")[:500])
+    return True
+
+
+def run_worker(worker_id=None, poll_interval=2.0, once=False):
+    """Loop del worker: prende ed esegue job finché non viene interrotto (o uno solo con `once`)."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"[jobs] Worker {worker_id} avviato")
+    while True:
+        job = claim_next(worker_id)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"[jobs] Worker {worker_id} esegue job {job.id} ({job.job_type})")
+        run_job(job)
+        db.session.remove()
+        if once:
+            return
+
+
+# --------------------------
+# HANDLER
+# --------------------------
+@job_handler("rankings")
+def _rankings_job(report, season, race_number=None, force=False, full=False):
+    from newZRL.services.rankings_import import import_rankings, plan_rankings_import
+
+    # Senza race_number il default è un refresh incrementale guidato dai watermark
+    refresh = race_number is None and not full
+    race_numbers, classes = plan_rankings_import(season, race_number, refresh=refresh)
+    report(0, f"Import classifiche stagione {season}: {len(race_numbers) * len(classes)} segmenti")
+    summary = import_rankings(season, race_numbers, classes, force=force, refresh=refresh, report=report)
+    summary["message"] = (
+        f"✅ Importazione completata per Stagione {season}: {summary['team_results']} risultati gara team, "
+        f"{summary['rider_results']} risultati rider importati/aggiornati, {summary['unchanged']} segmenti invariati, "
+        f"{summary['skipped']} segmenti definitivi non richiesti."
+    )
+    summary["errors"] = sorted(set(summary["errors"]))
+    return summary
+
+
+@job_handler("teams")
+def _teams_job(report, season, force=False):
+    from newZRL.services.teams_import import import_teams
+    return import_teams(season, report=report, force=force)
+
+
+@job_handler("schedule")
+def _schedule_job(report, season_name):
+    from newZRL.services.payload_archive import get_payload_archive
+    from newZRL.services.schedule_import import fetch_wtrl_schedule_data, import_wtrl_schedule_data_to_db
+
+    report(10, f"Download calendario stagione {season_name}...")
+    archive = get_payload_archive(current_app)
+    try:
+        with report.phase("fetch"):
+            payloads = fetch_wtrl_schedule_data(season_name, api_base_url=current_app.config["WTRL_API_BASE_URL"],
+                                                archive=archive)
+    finally:
+        if archive is not None:
+            archive.close()
+    report(60, f"Import di {len(payloads)} gare...")
+    with report.phase("write"):
+        counts = import_wtrl_schedule_data_to_db(season_name, payloads)
+    if counts is None:
+        raise ValueError(f"Calendario della stagione {season_name} non importato.")
+    return {"races": len(payloads), **counts, "message": f"✅ Stagione {season_name} importata con successo"}
+
+
+@job_handler("load-teams")
+def _load_teams_job(report, data_dir=None, workers=None):
+    from newZRL.services.team_bulk_load import DATA_DIR, bulk_load_team_dir
+
+    report(10, "Caricamento dei JSON team locali...")
+    # Il pool di processi per il parse parte qui, nel worker, mai nel processo web
+    with report.phase("write"):
+        summary = bulk_load_team_dir(data_dir or DATA_DIR, workers=workers)
+    summary["message"] = (
+        f"✅ Import locale completato: {summary['teams']} team, {summary['riders']} rider "
+        f"da {summary['files']} file ({len(summary['errors'])} file con errori)."
+    )
+    return summary
+
+
+@job_handler("zwiftpower")
+def _zwiftpower_job(report, team_id=None):
+    from newZRL.scripts.zwiftpower_importer import scrape_team, import_members_to_db
+
+    report(10, "Scraping team ZwiftPower...")
+    with report.phase("fetch"):
+        members = scrape_team(team_id)
+    if not members:
+        raise ValueError("Nessun corridore trovato o errore durante lo scraping.")
+    report(60, f"Import di {len(members)} corridori...")
+    with report.phase("write"):
+        results = import_members_to_db(members, team_id)
+    results["message"] = (
+        f"✅ Importazione completata: {results['new']} nuovi, "
+        f"{results['updated']} aggiornati, {results['deactivated']} disattivati."
+    )
+    return results
+
+
+# --------------------------
+# CLI
+# --------------------------
+jobs_cli = AppGroup("jobs", help="Coda dei job di import.")
+
+
+@jobs_cli.command("worker")
+@click.option("--poll-interval", default=2.0, show_default=True, help="Secondi di attesa quando la coda è vuota.")
+@click.option("--once", is_flag=True, help="Esegue al massimo un job e termina.")
+def worker_command(poll_interval, once):
+    """Avvia un worker che esegue i job di import in coda."""
+    run_worker(poll_interval=poll_interval, once=once)
+
+
+@jobs_cli.command("enqueue")
+@click.argument("job_type")
+@click.option("--season", help="Stagione (rankings, teams, schedule).")
+@click.option("--race-number", type=int, help="Solo rankings: singolo race number.")
+@click.option("--force", is_flag=True, help="rankings / teams: reimporta anche i payload invariati.")
+@click.option("--full", is_flag=True, help="Solo rankings: ricontrolla tutti i round, anche quelli definitivi.")
+@click.option("--team-id", type=int, help="Solo zwiftpower: team ZwiftPower (default ZWIFTPOWER_TEAM_ID).")
+def enqueue_command(job_type, season, race_number, force, full, team_id):
+    """Mette in coda un job di import."""
+    if job_type not in JOB_HANDLERS:
+        raise click.BadParameter(f"tipo sconosciuto, disponibili: {', '.join(sorted(JOB_HANDLERS))}.",
+                                 param_hint="JOB_TYPE")
+    if job_type in ("rankings", "teams", "schedule") and not season:
+        raise click.BadParameter(f"obbligatoria per i job {job_type}.", param_hint="--season")
+    params = {}
+    if job_type == "rankings":
+        if not season.isdigit():
+            raise click.BadParameter("deve essere un numero per i job rankings.", param_hint="--season")
+        params = {"season": int(season), "race_number": race_number, "force": force, "full": full}
+    elif job_type == "teams":
+        params = {"season": season, "force": force}
+    elif job_type == "schedule":
+        params = {"season_name": season}
+    elif job_type == "zwiftpower":
+        params = {"team_id": team_id}
+    job = enqueue(job_type, **params)
+    click.echo(f"Job {job.id} ({job_type}) in coda.")
+
+
+@jobs_cli.command("list")
+@click.option("--limit", default=20, show_default=True)
+def list_command(limit):
+    """Mostra gli ultimi job."""
+    for job in ImportJob.query.order_by(ImportJob.id.desc()).limit(limit):
+        click.echo(f"{job.id:>5}  {job.job_type:<11} {job.status:<8} {job.progress or 0:>3}%  {job.message or ''}")
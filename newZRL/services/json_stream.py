@@ -0,0 +1,171 @@
+# newZRL/services/json_stream.py
+"""
+Decodifica JSON incrementale per i payload WTRL.
+
+Invece di `json.load` / `response.json()` sull'intero corpo, il documento viene
+letto a blocchi e gli elementi dell'array che interessa (team, rider,
+competition...) vengono restituiti uno alla volta: la memoria resta limitata
+al singolo elemento e chi consuma può scrivere sul DB mentre il download è
+ancora in corso. Basato su json.JSONDecoder.raw_decode, nessuna dipendenza.
+"""
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(" \t\n\r,:]}")
+
+
+def iter_text_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Blocchi di testo da: requests.Response (anche con stream=True), file aperto
+    in modalità testo o binaria, bytes/str, oppure un iterabile di blocchi.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield source.decode("utf-8")
+        return
+    if isinstance(source, str):
+        yield source
+        return
+
+    if hasattr(source, "iter_content"):
+        chunks = source.iter_content(chunk_size)
+    elif hasattr(source, "content"):
+        chunks = [source.content]
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    else:
+        chunks = source
+
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        yield utf8.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+    tail = utf8.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class _Reader:
+    """Buffer sui blocchi di testo con le primitive per scorrere il documento."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Prossimo carattere non di spaziatura ("" a fine documento)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON non valido: atteso '{char}', trovato '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica il prossimo valore completo, leggendo altri blocchi se serve."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # Un numero troncato dal blocco ("1" di "1.5") si riconosce solo dal delimitatore
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def separator(self, closing):
+        """Consuma ',' oppure il carattere di chiusura; ritorna True se chiuso."""
+        char = self.peek()
+        self.pos += 1
+        if char == closing:
+            return True
+        if char != ",":
+            raise ValueError(f"JSON non valido: atteso ',' o '{closing}', trovato '{char or 'EOF'}'")
+        return False
+
+
+def _array_items(reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.separator("]"):
+            return
+
+
+def _object_members(reader):
+    """Chiavi dei membri dell'oggetto; dopo ogni chiave il chiamante deve consumarne il valore."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        yield key
+        if reader.separator("}"):
+            return
+
+
+def iter_items(source, path=(), chunk_size=CHUNK_SIZE):
+    """
+    Elementi dell'array che si trova a `path` (sequenza di chiavi), uno alla volta.
+    Es. iter_items(resp, ("payload",)) per i results WTRL,
+    iter_items(f, ("payload", "competition")) per wtrl_full.json.
+    Solleva ValueError se la chiave manca o non contiene un array.
+    """
+    reader = _Reader(iter_text_chunks(source, chunk_size))
+    for key in path:
+        if reader.peek() != "{":
+            raise ValueError(f"Chiave '{key}' non trovata: il valore non è un oggetto")
+        for member in _object_members(reader):
+            if member == key:
+                break
+            reader.value()
+        else:
+            raise ValueError(f"Chiave '{key}' non trovata nel JSON")
+    if reader.peek() != "[":
+        raise ValueError(f"Il valore in {'/'.join(path) or 'radice'} non è un array")
+    yield from _array_items(reader)
+
+
+def iter_document(source, stream_key, chunk_size=CHUNK_SIZE):
+    """
+    Membri di primo livello di un oggetto JSON come coppie (key, value), nell'ordine
+    del documento. L'array in `stream_key` non viene caricato: si ottiene una coppia
+    (stream_key, elemento) per ogni suo elemento.
+    Es. per i team WTRL: ("meta", {...}), ("permissions", {...}), ("riders", r1), ("riders", r2)...
+    """
+    reader = _Reader(iter_text_chunks(source, chunk_size))
+    for key in _object_members(reader):
+        if key == stream_key and reader.peek() == "[":
+            for item in _array_items(reader):
+                yield key, item
+        else:
+            yield key, reader.value()
@@ -0,0 +1,185 @@
+# newZRL/services/payload_archive.py
+"""
+Archivio dei payload grezzi WTRL (teams, results, league, schedule).
+
+I corpi sono compressi con gzip e salvati una sola volta per contenuto in
+`objects/<hash[:2]>/<hash>.json.gz`; un indice SQLite nella stessa cartella
+registra per ogni (endpoint, key) le versioni viste, con la data del primo e
+dell'ultimo fetch. Un payload identico al precedente aggiorna solo
+last_fetched_at. L'indice è locale all'archivio (e non nel DB dell'app) così
+i thread di download possono scriverci senza una sessione SQLAlchemy.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ArchiveEntry = namedtuple("ArchiveEntry", "endpoint key hash fetched_at last_fetched_at size")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    id INTEGER PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    last_fetched_at TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_payloads_endpoint_key ON payloads (endpoint, key, id);
+CREATE INDEX IF NOT EXISTS ix_payloads_hash ON payloads (hash);
+"""
+
+
+class PayloadArchive:
+    """Archivio content-addressed e compresso dei payload, sicuro tra thread."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), timeout=30,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --------------------------
+    # SCRITTURA
+    # --------------------------
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.json.gz")
+
+    def put(self, endpoint, key, body, fetched_at=None):
+        """Archivia `body` (bytes) per (endpoint, key); ritorna l'hash del contenuto."""
+        digest = hashlib.sha256(body).hexdigest()
+        if os.path.exists(self._object_path(digest)):
+            # Contenuto già presente (es. risposta 304): basta aggiornare l'indice
+            self._index(endpoint, str(key), digest, len(body), fetched_at or datetime.utcnow())
+            return digest
+        return self.put_stream(endpoint, key, [body], fetched_at)
+
+    def put_stream(self, endpoint, key, chunks, fetched_at=None):
+        """
+        Come `put`, ma consuma un iterabile di blocchi di bytes (es. resp.iter_content)
+        comprimendoli mentre arrivano. Ritorna l'hash del contenuto.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        objects_dir = os.path.join(self.directory, "objects")
+        fd, tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    gz.write(chunk)
+            digest = digest.hexdigest()
+            path = self._object_path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)   # contenuto già archiviato
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._index(endpoint, str(key), digest, size, fetched_at or datetime.utcnow())
+        return digest
+
+    def _index(self, endpoint, key, digest, size, fetched_at):
+        stamp = fetched_at.isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, hash FROM payloads WHERE endpoint = ? AND key = ? ORDER BY id DESC LIMIT 1",
+                (endpoint, key),
+            ).fetchone()
+            if row is not None and row[1] == digest:
+                self._conn.execute("UPDATE payloads SET last_fetched_at = ? WHERE id = ?", (stamp, row[0]))
+            else:
+                self._conn.execute(
+                    "INSERT INTO payloads (endpoint, key, hash, fetched_at, last_fetched_at, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (endpoint, key, digest, stamp, stamp, size),
+                )
+
+    # --------------------------
+    # LETTURA
+    # --------------------------
+    def _entries(self, sql, params):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            ArchiveEntry(endpoint, key, digest, datetime.fromisoformat(first), datetime.fromisoformat(last), size)
+            for endpoint, key, digest, first, last, size in rows
+        ]
+
+    def latest(self, endpoint, key):
+        """Ultima versione archiviata per (endpoint, key), oppure None."""
+        entries = self._entries(
+            "SELECT endpoint, key, hash, fetched_at, last_fetched_at, size FROM payloads "
+            "WHERE endpoint = ? AND key = ? ORDER BY id DESC LIMIT 1",
+            (endpoint, str(key)),
+        )
+        return entries[0] if entries else None
+
+    def versions(self, endpoint, key):
+        """Tutte le versioni per (endpoint, key), dalla più recente."""
+        return self._entries(
+            "SELECT endpoint, key, hash, fetched_at, last_fetched_at, size FROM payloads "
+            "WHERE endpoint = ? AND key = ? ORDER BY id DESC",
+            (endpoint, str(key)),
+        )
+
+    def keys(self, endpoint):
+        """Chiavi archiviate per un endpoint."""
+        with self._lock:
+            return [k for (k,) in self._conn.execute(
+                "SELECT DISTINCT key FROM payloads WHERE endpoint = ? ORDER BY key", (endpoint,)
+            )]
+
+    def open(self, digest):
+        """File-like binario decompresso del payload (da passare a json_stream)."""
+        return gzip.open(self._object_path(digest), "rb")
+
+    def read(self, digest):
+        with self.open(digest) as f:
+            return f.read()
+
+
+def get_payload_archive(app):
+    """Archivio dei payload configurato per l'app (None se disabilitato)."""
+    if not app.config.get("WTRL_ARCHIVE_ENABLED", True):
+        return None
+    directory = app.config.get("WTRL_ARCHIVE_DIR") or os.path.join(app.root_path, "data", "archive")
+    return PayloadArchive(directory)
+
+
+def archive_quietly(archive, endpoint, key, body):
+    """Archivia senza mai far fallire il fetch: un errore su disco viene solo loggato."""
+    if archive is None or not body:
+        return None
+    try:
+        return archive.put(endpoint, key, body)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Archiviazione payload {endpoint} {key} fallita: {e}")
+        return None
@@ -0,0 +1,157 @@
+# newZRL/services/race_calendar.py
+"""
+Calendario gare in memoria per le ricerche "prossima gara".
+
+Le gare future vengono lette con una sola query e tenute ordinate per data,
+anche per categoria (A, B, C, D): prossima gara per categoria, per team e per
+giorno della settimana, o le gare di un giorno preciso, si risolvono con una
+bisect, senza query. Ogni gara porta il nome della stagione, per filtrare le
+sole gare ZRL.
+Il calendario viene ricostruito solo quando cambia il calendario importato:
+subito nel processo che esegue l'import (invalidate_race_calendar) e, negli
+altri processi, quando compare un job "schedule" completato più recente
+(controllato al massimo ogni RACE_CALENDAR_CHECK_INTERVAL secondi).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date
+
+from flask import current_app
+
+from newZRL import db
+from newZRL.models.import_job import ImportJob
+from newZRL.models.race import Race
+from newZRL.models.round import Round
+from newZRL.models.season import Season
+
+TUESDAY = 1  # date.weekday(): lunedì = 0
+
+CalendarRace = namedtuple("CalendarRace", "race_date race_id round_id category name season")
+
+_lock = threading.Lock()
+
+
+def team_category(team):
+    """Categoria di gara del team (A, B, C, D) dalla categoria o divisione WTRL, es. 'A1' -> 'A'."""
+    value = getattr(team, "category", None) or getattr(team, "division", None) or ""
+    return value.strip()[:1].upper() or None
+
+
+def is_zrl(race):
+    """Gara di una stagione ZRL (stesso criterio di Season.name ILIKE '%ZRL%')."""
+    return "zrl" in (race.season or "").lower()
+
+
+class RaceCalendar:
+    """Gare ordinate per data, in totale e per categoria."""
+
+    def __init__(self, races):
+        self.races = sorted(races)
+        self._dates = [race.race_date for race in self.races]
+        self._by_category = {}
+        for race in self.races:
+            self._by_category.setdefault(race.category, []).append(race)
+        self._category_dates = {
+            category: [race.race_date for race in races] for category, races in self._by_category.items()
+        }
+
+    @property
+    def categories(self):
+        return sorted(category for category in self._by_category if category)
+
+    def _races(self, category):
+        if category is None:
+            return self.races, self._dates
+        return self._by_category.get(category, ()), self._category_dates.get(category, ())
+
+    def next_race(self, category=None, weekday=None, on_or_after=None, zrl_only=False):
+        """Prima gara dal giorno indicato (default oggi), eventualmente per categoria, giorno della settimana e solo ZRL."""
+        races, dates = self._races(category)
+        for race in races[bisect_left(dates, on_or_after or date.today()):]:
+            if (weekday is None or race.race_date.weekday() == weekday) and (not zrl_only or is_zrl(race)):
+                return race
+        return None
+
+    def races_on(self, day, category=None, zrl_only=False):
+        """Gare di un giorno preciso, in ordine di id."""
+        races, dates = self._races(category)
+        found = []
+        for race in races[bisect_left(dates, day):]:
+            if race.race_date != day:
+                break
+            if not zrl_only or is_zrl(race):
+                found.append(race)
+        return found
+
+    def next_race_date(self, category=None, weekday=None, on_or_after=None):
+        race = self.next_race(category, weekday, on_or_after)
+        return race.race_date if race else None
+
+    def next_race_for_team(self, team, weekday=None, on_or_after=None):
+        """Prossima gara della categoria del team; se la categoria non è nel calendario, la prossima gara in assoluto."""
+        category = team_category(team)
+        if category not in self._by_category:
+            category = None
+        return self.next_race(category, weekday, on_or_after)
+
+    def next_race_date_for_team(self, team, weekday=None, on_or_after=None):
+        race = self.next_race_for_team(team, weekday, on_or_after)
+        return race.race_date if race else None
+
+
+def load_race_calendar(today=None):
+    """Calendario delle gare da oggi in poi, con il nome della stagione, con un'unica query."""
+    t = Race.__table__
+    rows = db.session.execute(
+        db.select(t.c.race_date, t.c.id, t.c.round_id, t.c.category, t.c.name, Season.name)
+        .select_from(t)
+        .outerjoin(Round, Round.id == t.c.round_id)
+        .outerjoin(Season, Season.id == Round.season_id)
+        .where(t.c.race_date >= (today or date.today()))
+    )
+    return RaceCalendar(CalendarRace(*row) for row in rows)
+
+
+def _schedule_stamp():
+    """Fine dell'ultimo job "schedule" completato: cambia a ogni import del calendario dal worker."""
+    return db.session.scalar(
+        db.select(db.func.max(ImportJob.finished_at))
+        .where(ImportJob.job_type == "schedule", ImportJob.status == "done")
+    )
+
+
+def get_race_calendar(app=None):
+    """
+    Calendario dell'app, ricostruito solo se il calendario importato è cambiato
+    (o se è cambiato il giorno: le gare passate non servono più).
+    """
+    app = app or current_app._get_current_object()
+    interval = app.config.get("RACE_CALENDAR_CHECK_INTERVAL", 30)
+    with _lock:
+        cached = app.extensions.get("race_calendar")
+        now = time.monotonic()
+        if cached is not None and cached["day"] == date.today():
+            if now - cached["checked_at"] < interval:
+                return cached["calendar"]
+            stamp = _schedule_stamp()
+            cached["checked_at"] = now
+            if stamp == cached["stamp"]:
+                return cached["calendar"]
+        else:
+            stamp = _schedule_stamp()
+
+        calendar = load_race_calendar()
+        app.extensions["race_calendar"] = {"calendar": calendar, "stamp": stamp, "checked_at": now,
+                                           "day": date.today()}
+        app.logger.debug(f"[race_calendar] Calendario ricostruito: {len(calendar.races)} gare.")
+        return calendar
+
+
+def invalidate_race_calendar(app=None):
+    """Da chiamare dopo il commit di un import del calendario: la prossima lettura ricostruisce."""
+    app = app or current_app._get_current_object()
+    with _lock:
+        app.extensions.pop("race_calendar", None)
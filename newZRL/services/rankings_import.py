@@ -0,0 +1,585 @@
+# newZRL/services/rankings_import.py
+
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from newZRL import db
+from newZRL.models.team import Team
+from newZRL.models.round import Round
+from newZRL.models.race import Race
+from newZRL.models.rankings_import_state import RankingsImportState
+from newZRL.models.wtrl_rider import WTRL_Rider
+from newZRL.models.race_results import RaceResultsTeam, RaceResultsRider, RoundStanding
+from newZRL.services.bulk_upsert import upsert, changed, chunked, existing_keys
+from newZRL.services.team_resolver import TeamResolver, normalize_name
+from newZRL.services.teams_import import safe_int
+from newZRL.services.http_cache import get_response_cache, content_hash
+from newZRL.services.job_progress import as_tracker
+from newZRL.services.json_stream import iter_items
+from newZRL.services.payload_archive import get_payload_archive
+from newZRL.services.wtrl_fetch import fetch_segments, WTRL_API_BASE_URL
+
+
+def _segment_label(season_name, comp_class, race_num):
+    return f"Season {season_name}, Class {comp_class}, Race {race_num}"
+
+
+def _parse_results(fetch, season_name, errors):
+    """
+    Iteratore sulle entry team del payload results, decodificate una alla volta,
+    oppure None registrando l'errore. Un JSON non valido solleva ValueError
+    durante l'iterazione.
+    """
+    label = _segment_label(season_name, fetch.class_id, fetch.race_number)
+    ok, response = fetch.results
+    if not ok:
+        status = response.status_code if response is not None else "N/A"
+        errors.append(f"Impossibile ottenere JSON WTRL per {label} (HTTP {status})")
+        if response is not None:
+            current_app.logger.debug(f"[import_rankings] RAW for {label}: {response.text[:800]}")
+        return None
+    return iter_items(response, ("payload",))
+
+
+def _parse_league(fetch, season_name, errors):
+    """Mappa nome team normalizzato -> entry della League API per il segmento."""
+    label = _segment_label(season_name, fetch.class_id, fetch.race_number)
+    league_payload_map = {}
+    ok_league, response_league = fetch.league
+    if not ok_league:
+        status_league = response_league.status_code if response_league is not None else "N/A"
+        errors.append(f"Impossibile ottenere JSON League API per {label} (HTTP {status_league})")
+        return league_payload_map
+
+    try:
+        for entry in iter_items(response_league, ("payload",)):
+            team_name_from_league = entry.get("d")  # 'd' is team name in league API
+            if team_name_from_league:
+                league_payload_map[normalize_name(team_name_from_league)] = entry
+    except ValueError as e:
+        errors.append(f"Risposta League API non valida per {label} -> {e}")
+    return league_payload_map
+
+
+# Colonne scritte dall'upsert (oltre alla chiave naturale)
+TEAM_RESULT_KEY = ("season", "class_id", "race", "team_id")
+TEAM_RESULT_COLUMNS = ("finp", "pbp", "totp", "falp", "ftsp", "time_result", "distance_result", "rank")
+RIDER_RESULT_KEY = ("race_team_result_id", "rider_id")
+RIDER_RESULT_COLUMNS = ("finp", "pbp", "totp", "falp", "ftsp", "time_result", "distance_result", "wkg", "watts", "gap")
+STANDING_KEY = ("season", "class_id", "team_id")
+STANDING_COLUMNS = ("total_points", "updated_at")
+
+
+def _team_result_row(season, comp_class, race_num, team_trc, team_payload):
+    return {
+        "season": season,
+        "class_id": comp_class,
+        "race": race_num,
+        "team_id": team_trc,
+        "finp": int(team_payload.get("finp", 0)),
+        "pbp": int(team_payload.get("pbp", 0)),
+        "totp": int(team_payload.get("lpoints", 0)),
+        "falp": int(team_payload.get("falp", 0)),
+        "ftsp": int(team_payload.get("ftsp", 0)),
+        "time_result": team_payload.get("timeResult"),
+        "distance_result": team_payload.get("distanceResult"),
+        "rank": int(team_payload.get("p1", 0)),
+    }
+
+
+def _rider_result_row(rider_id, member):
+    return {
+        "rider_id": rider_id,
+        "finp": int(member.get("finrp", 0)),
+        "pbp": int(member.get("pbprp", 0)),
+        "totp": int(member.get("totrp", 0)),
+        "falp": int(member.get("falrp", 0)),
+        "ftsp": int(member.get("ftsrp", 0)),
+        "time_result": member.get("timeResult"),
+        "distance_result": member.get("distanceResult"),
+        "wkg": float(member.get("wkg") or 0),
+        "watts": float(member.get("watts") or 0),
+        "gap": str(member.get("gap") or "0"),
+    }
+
+
+def preload_segment(season, comp_class, race_num):
+    """
+    Carica con una query per tabella le righe già presenti per il segmento.
+    Ritorna (team_results, rider_results, standings) come dict chiave naturale -> riga.
+    """
+    rrt = RaceResultsTeam.__table__
+    rrr = RaceResultsRider.__table__
+    rs = RoundStanding.__table__
+
+    team_results = {
+        r.team_id: dict(r._mapping)
+        for r in db.session.execute(
+            db.select(rrt).where(rrt.c.season == season, rrt.c.class_id == comp_class, rrt.c.race == race_num)
+        )
+    }
+    rider_results = {
+        (r.race_team_result_id, r.rider_id): dict(r._mapping)
+        for r in db.session.execute(
+            db.select(rrr).join(rrt, rrr.c.race_team_result_id == rrt.c.id)
+            .where(rrt.c.season == season, rrt.c.class_id == comp_class, rrt.c.race == race_num)
+        )
+    }
+    standings = {
+        r.team_id: dict(r._mapping)
+        for r in db.session.execute(
+            db.select(rs).where(rs.c.season == season, rs.c.class_id == comp_class)
+        )
+    }
+    return team_results, rider_results, standings
+
+
+def create_missing_riders(segment_riders, now=None):
+    """
+    Risolve in blocco gli id WTRL_Rider `trc/profile_id` del segmento con query
+    IN (...) a blocchi e crea con un solo insert bulk i rider placeholder mancanti.
+    Ritorna il numero di placeholder creati.
+    """
+    if not segment_riders:
+        return 0
+    now = now or datetime.utcnow()
+
+    found = existing_keys(WTRL_Rider.id, segment_riders.keys())
+    placeholders = []
+    for rider_id, (team_trc, profile_id, member) in segment_riders.items():
+        if rider_id in found:
+            continue
+        placeholders.append({
+            "id": rider_id,
+            "team_trc": team_trc,
+            "profile_id": profile_id,
+            "name": member.get("name", f"Unknown Rider {profile_id}"),
+            "category": str(member.get("category", "")),
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    if placeholders:
+        current_app.logger.info(f"[import_rankings] Creazione di {len(placeholders)} rider placeholder in WTRL_Rider.")
+        for batch in chunked(placeholders):
+            db.session.execute(db.insert(WTRL_Rider), batch)
+    return len(placeholders)
+
+
+def import_segment(season_name, comp_class, race_num, payload, league_payload_map, errors, resolver=None,
+                   commit=True):
+    """
+    Scrive sul DB i risultati di un segmento (race_num, comp_class) con upsert bulk:
+    le righe esistenti vengono precaricate una volta sola e si scrivono solo quelle
+    nuove o cambiate. La scrittura avviene in un SAVEPOINT; se fallisce si riprova
+    team per team, ciascuno nel proprio SAVEPOINT. Con commit=False il commit è
+    lasciato al chiamante (commit a blocchi di segmenti).
+    Ritorna (team_results, rider_results, team_falliti), oppure None se nessun team è stato scritto.
+    """
+    label = _segment_label(season_name, comp_class, race_num)
+    season = int(season_name)
+    if resolver is None:
+        resolver = TeamResolver(season)
+
+    team_rows = {}      # team_trc -> riga RaceResultsTeam
+    rider_rows = {}     # team_trc -> {rider_id: riga RaceResultsRider senza race_team_result_id}
+    standing_rows = {}  # team_trc -> riga RoundStanding
+    segment_riders = {} # id WTRL_Rider -> (team_trc, profile_id, member) per i placeholder
+    now = datetime.utcnow()
+
+    # Iterate through each team entry in the WTRL API payload
+    for team_payload in payload:
+        raw_trc = team_payload.get("id5") or team_payload.get("id1")
+        team_trc_from_payload = safe_int(raw_trc, default=None)
+        team_name_from_payload = team_payload.get("teamname")
+
+        team = resolver.get(trc=team_trc_from_payload, name=team_name_from_payload)
+        if not team and team_trc_from_payload is None:
+            # Senza un TRC valido non si può creare il placeholder: si perde solo questo team
+            errors.append(f"Team {team_name_from_payload} ({label}): TRC non valido ({raw_trc!r}), team saltato")
+            continue
+        if not team:
+            # Create a placeholder team if not found
+            current_app.logger.info(f"[import_rankings] Team non trovato (TRC: {team_trc_from_payload}, Nome: {team_name_from_payload}). Creazione di un placeholder.")
+            team = resolver.add(Team(
+                trc=team_trc_from_payload,
+                name=team_name_from_payload,
+                division=team_payload.get("division"),
+                competition_class=comp_class,
+                competition_season=str(season_name),
+                created_at=now,
+                updated_at=now
+            ))
+
+        try:
+            team_rows[team.trc] = _team_result_row(season, comp_class, race_num, team.trc, team_payload)
+        except (TypeError, ValueError) as e:
+            errors.append(f"Team {team.name} (TRC {team.trc}, {label}): dati RaceResultsTeam non validi -> {e}")
+            continue
+
+        # ----------------------
+        # RaceResultsRider
+        # ----------------------
+        members_rows = rider_rows.setdefault(team.trc, {})
+        for member in team_payload.get("a", []) or []:
+            rider_profile_id = str(member.get("zid") or member.get("p1") or "")
+            if not rider_profile_id or rider_profile_id in ("0", "None"):
+                continue
+
+            # WTRL_Rider ID è trc/profile_id come definito nel modello
+            wtrl_rider_composite_id = f"{team.trc}/{rider_profile_id}"
+            try:
+                members_rows[wtrl_rider_composite_id] = _rider_result_row(wtrl_rider_composite_id, member)
+                segment_riders[wtrl_rider_composite_id] = (team.trc, int(rider_profile_id), member)
+            except (TypeError, ValueError) as e:
+                members_rows.pop(wtrl_rider_composite_id, None)
+                errors.append(f"Rider {wtrl_rider_composite_id} ({label}): dati RaceResultsRider non validi -> {e}")
+
+        # ----------------------
+        # RoundStanding (per team e classe)
+        # ----------------------
+        normalized_team_name = normalize_name(team.name)
+        league_entry = league_payload_map.get(normalized_team_name)
+        if league_entry:
+            standing_rows[team.trc] = {
+                "season": season,
+                "class_id": comp_class,
+                "team_id": team.trc,
+                "total_points": int(league_entry.get("n", 0)),  # 'n' = punti cumulativi
+                "updated_at": now,
+            }
+        else:
+            current_app.logger.warning(f"[import_rankings] Team {team.name} (TRC {team.trc}) (Normalized: '{normalized_team_name}') NOT FOUND in League API payload for {label}. RoundStanding not updated, points may remain 0.")
+
+    # ----------------------
+    # Scrittura bulk del segmento, in un SAVEPOINT
+    # ----------------------
+    placeholders = {team.trc: team for team in db.session.new if isinstance(team, Team)}
+    try:
+        with db.session.begin_nested():
+            _write_segment(season, comp_class, race_num, team_rows, rider_rows, standing_rows, segment_riders, now)
+        written = list(team_rows)
+    except SQLAlchemyError as e:
+        # Un record non valido: si riscrive team per team, ognuno nel proprio SAVEPOINT,
+        # così l'errore costa solo quel team e non il segmento (né i segmenti già scritti)
+        current_app.logger.warning(f"[import_rankings] Scrittura bulk di {label} fallita ({e}), riprovo team per team.")
+        written = []
+        for trc in team_rows:
+            riders = {rid: segment_riders[rid] for rid in rider_rows.get(trc, {}) if rid in segment_riders}
+            try:
+                with db.session.begin_nested():
+                    if trc in placeholders:
+                        # Il placeholder è stato scartato con il SAVEPOINT fallito
+                        db.session.add(placeholders[trc])
+                    _write_segment(
+                        season, comp_class, race_num, {trc: team_rows[trc]}, {trc: rider_rows.get(trc, {})},
+                        {trc: standing_rows[trc]} if trc in standing_rows else {}, riders, now,
+                    )
+                written.append(trc)
+            except SQLAlchemyError as team_error:
+                errors.append(f"Errore DB per team TRC {trc} ({label}) -> {team_error}")
+        resolver.prune()
+        if not written:
+            return None
+
+    if commit:
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            resolver.prune()
+            errors.append(f"Errore commit DB per {label} -> {e}")
+            return None
+
+    return len(written), sum(len(rider_rows.get(trc, {})) for trc in written), len(team_rows) - len(written)
+
+
+def _write_segment(season, comp_class, race_num, team_rows, rider_rows, standing_rows, segment_riders, now):
+    """Upsert delle righe (già costruite) di un segmento o di una parte dei suoi team."""
+    db.session.flush()  # team placeholder prima delle scritture bulk
+    create_missing_riders(segment_riders, now)
+    existing_teams, existing_riders, existing_standings = preload_segment(season, comp_class, race_num)
+
+    upsert(
+        RaceResultsTeam,
+        [row for trc, row in team_rows.items() if changed(existing_teams.get(trc), row, TEAM_RESULT_COLUMNS)],
+        TEAM_RESULT_KEY, TEAM_RESULT_COLUMNS,
+    )
+
+    # Id dei RaceResultsTeam: quelli nuovi servono per le righe rider
+    result_ids = {trc: row["id"] for trc, row in existing_teams.items()}
+    if any(trc not in result_ids for trc in team_rows):
+        rrt = RaceResultsTeam.__table__
+        result_ids = dict(db.session.execute(
+            db.select(rrt.c.team_id, rrt.c.id)
+            .where(rrt.c.season == season, rrt.c.class_id == comp_class, rrt.c.race == race_num)
+        ).all())
+
+    pending_riders = []
+    for trc, members_rows in rider_rows.items():
+        result_id = result_ids.get(trc)
+        if result_id is None:
+            continue
+        for rider_id, row in members_rows.items():
+            row = {"race_team_result_id": result_id, **row}
+            if changed(existing_riders.get((result_id, rider_id)), row, RIDER_RESULT_COLUMNS):
+                pending_riders.append(row)
+    upsert(RaceResultsRider, pending_riders, RIDER_RESULT_KEY, RIDER_RESULT_COLUMNS)
+
+    upsert(
+        RoundStanding,
+        [row for trc, row in standing_rows.items()
+         if changed(existing_standings.get(trc), row, ("total_points",))],
+        STANDING_KEY, STANDING_COLUMNS,
+    )
+
+
+# --------------------------
+# WATERMARK PER SEGMENTO
+# --------------------------
+def _payload_hash(fetch):
+    """Hash combinato di results + league, None se una delle due risposte manca."""
+    digests = []
+    for ok, response in (fetch.results, fetch.league):
+        if not ok or response is None:
+            return None
+        digests.append(getattr(response, "content_hash", None) or content_hash(response.content))
+    return content_hash("|".join(digests).encode("utf-8"))
+
+
+def load_import_states(season):
+    """Watermark della stagione come dict (class_id, race) -> RankingsImportState."""
+    return {
+        (state.class_id, state.race): state
+        for state in RankingsImportState.query.filter_by(season=int(season))
+    }
+
+
+def round_end_dates(season):
+    """
+    Data di fine di ogni round della stagione: Round.end_date oppure, se manca,
+    la data dell'ultima gara del round. Ritorna dict round_number -> date.
+    """
+    rows = db.session.query(
+        Round.round_number, Round.end_date, db.func.max(Race.race_date)
+    ).outerjoin(Race, Race.round_id == Round.id).filter(
+        Round.season_id == int(season)
+    ).group_by(Round.id, Round.round_number, Round.end_date).all()
+    return {round_number: end_date or last_race for round_number, end_date, last_race in rows
+            if end_date or last_race}
+
+
+def select_refresh_segments(segments, states, now=None, recent_days=3):
+    """
+    Segmenti da ricontrollare in un refresh: mai importati, non ancora definitivi
+    oppure cambiati negli ultimi `recent_days` giorni.
+    """
+    now = now or datetime.utcnow()
+    recent = now - timedelta(days=recent_days)
+    selected = []
+    for race_num, comp_class in segments:
+        state = states.get((comp_class, race_num))
+        if (state is None or not state.is_final
+                or (state.changed_at is not None and state.changed_at >= recent)):
+            selected.append((race_num, comp_class))
+    return selected
+
+
+def _update_state(state, digest, imported, round_end, now, config):
+    """Aggiorna il watermark dopo un fetch riuscito del segmento."""
+    if digest is not None and state.payload_hash == digest:
+        state.unchanged_fetches = (state.unchanged_fetches or 0) + 1
+    else:
+        state.payload_hash = digest
+        state.changed_at = now
+        state.unchanged_fetches = 0
+    state.fetched_at = now
+    if imported:
+        state.imported_at = now
+
+    if digest is None:
+        # League mancante: il segmento va ricontrollato
+        state.is_final = False
+    elif round_end is not None:
+        state.is_final = now.date() >= round_end + timedelta(days=config.get("WTRL_RESULTS_FINAL_AFTER_DAYS", 7))
+    else:
+        state.is_final = state.unchanged_fetches >= config.get("WTRL_RESULTS_FINAL_AFTER_UNCHANGED", 3)
+
+
+def plan_rankings_import(season_name, race_number=None, refresh=False):
+    """
+    Determina i segmenti da importare: tutte le competition_class dei team della
+    stagione e il race_number richiesto oppure tutti i round della stagione
+    (con `refresh` solo quelli già iniziati).
+    Ritorna (race_numbers, competition_classes); solleva ValueError se mancano.
+    """
+    unique_classes = db.session.query(Team.competition_class).filter(
+        Team.competition_season == str(season_name),
+        Team.competition_class.isnot(None)
+    ).distinct().all()
+    competition_classes = [c[0] for c in unique_classes]
+    if not competition_classes:
+        raise ValueError(f"Nessuna competition_class trovata per la stagione {season_name} nei team.")
+
+    if race_number:
+        return [int(race_number)], competition_classes
+
+    rounds = Round.query.filter_by(season_id=season_name).order_by(Round.round_number).all()
+    if refresh:
+        today = date.today()
+        rounds = [r for r in rounds if r.start_date is None or r.start_date <= today]
+    race_numbers = [r.round_number for r in rounds]
+    if not race_numbers:
+        raise ValueError(f"Nessun round trovato per la stagione {season_name}")
+    return race_numbers, competition_classes
+
+
+def _import_fetched_segment(fetch, season_name, label, resolver, progress, errors):
+    """
+    Parse e scrittura di un segmento dentro un proprio SAVEPOINT, senza commit:
+    un payload non valido annulla solo questo segmento, non quelli del blocco
+    ancora da committare. Ritorna i contatori di import_segment oppure None.
+    """
+    with progress.phase("parse"):
+        payload = _parse_results(fetch, season_name, errors)
+        league_payload_map = _parse_league(fetch, season_name, errors) if payload is not None else None
+    if payload is None:
+        return None
+
+    savepoint = db.session.begin_nested()
+    try:
+        # La decodifica dei results è incrementale: la fase write include il loro parse
+        with progress.phase("write"):
+            counts = import_segment(
+                season_name, fetch.class_id, fetch.race_number, payload, league_payload_map, errors,
+                resolver=resolver, commit=False,
+            )
+    except ValueError as e:
+        # JSON results non valido, scoperto durante la decodifica incrementale
+        errors.append(f"Payload results non valido per {label} -> {e}")
+        counts = None
+    if counts is None:
+        savepoint.rollback()
+        resolver.prune()
+    else:
+        savepoint.commit()
+    return counts
+
+
+def _commit_segments(keys, states, resolver, errors):
+    """Commit di un blocco di segmenti; se fallisce il blocco viene annullato, watermark compresi."""
+    if not keys:
+        return
+    try:
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        resolver.prune()
+        for key in keys:
+            states.pop(key, None)
+        errors.append(f"Errore commit DB per {len(keys)} segmenti -> {e}")
+
+
+def import_rankings(season_name, race_numbers, competition_classes, fetcher=fetch_segments, force=False,
+                    refresh=False, report=None):
+    """
+    Importa le classifiche WTRL per tutte le coppie (race_number, competition_class).
+    Il fetch gira in parallelo dietro al rate limit WTRL; ogni segmento viene scritto
+    sul DB appena results e league sono entrambi disponibili.
+    Per ogni segmento si tiene un watermark (RankingsImportState): i segmenti il cui
+    payload non è cambiato dall'ultimo import vengono saltati, a meno di `force`.
+    Con `refresh` non vengono nemmeno richiesti i segmenti già definitivi e non
+    cambiati di recente. `report` (ProgressTracker o funzione report(progress, message))
+    riceve l'avanzamento per segmento, con i tempi di fetch, parse e write.
+    Ogni segmento è scritto in un SAVEPOINT (un team non valido costa solo quel team)
+    e il commit avviene ogni WTRL_RANKINGS_COMMIT_BATCH segmenti.
+    Ritorna un dict con i contatori e la lista degli errori.
+    """
+    config = current_app.config
+    season = int(season_name)
+    segments = [(race_num, comp_class) for race_num in race_numbers for comp_class in competition_classes]
+    cache = get_response_cache(current_app)
+    states = load_import_states(season)
+    round_ends = round_end_dates(season)
+
+    summary = {"segments": 0, "unchanged": 0, "skipped": 0, "team_results": 0, "rider_results": 0, "errors": []}
+    errors = summary["errors"]
+    if refresh and not force:
+        selected = select_refresh_segments(segments, states, recent_days=config.get("WTRL_REFRESH_RECENT_DAYS", 3))
+        summary["skipped"] = len(segments) - len(selected)
+        current_app.logger.info(f"[import_rankings] Refresh stagione {season_name}: {len(selected)} segmenti da controllare, {summary['skipped']} definitivi saltati.")
+        segments = selected
+
+    resolver = TeamResolver(season_name)
+    progress = as_tracker(report)
+    progress.start(len(segments))
+    handled = 0
+    # Segmenti (e watermark) scritti ma non ancora committati
+    commit_batch = max(1, config.get("WTRL_RANKINGS_COMMIT_BATCH", 10))
+    batch = []
+
+    archive = get_payload_archive(current_app)
+    fetches = None
+    try:
+        fetches = fetcher(
+            str(season_name), segments,
+            cookie=config.get("WTRL_API_COOKIE"),
+            max_workers=config.get("WTRL_FETCH_WORKERS", 4),
+            rate=config.get("WTRL_REQUESTS_PER_SECOND", 2.0),
+            cache=cache,
+            base_url=f"{config.get('WTRL_API_BASE_URL', WTRL_API_BASE_URL)}/zrl",
+            archive=archive,
+        )
+        while True:
+            # Il tempo di fetch è quello passato ad aspettare il prossimo segmento completo
+            with progress.phase("fetch"):
+                fetch = next(fetches, None)
+            if fetch is None:
+                break
+            label = _segment_label(season_name, fetch.class_id, fetch.race_number)
+            handled += 1
+            progress.advance(message=f"Segmento {handled}/{len(segments)}: {label}")
+
+            now = datetime.utcnow()
+            key = (fetch.class_id, fetch.race_number)
+            state = states.get(key)
+            if state is None:
+                state = RankingsImportState(season=season, class_id=fetch.class_id, race=fetch.race_number,
+                                            unchanged_fetches=0, is_final=False)
+            digest = _payload_hash(fetch)
+            round_end = round_ends.get(fetch.race_number)
+
+            if not force and digest is not None and state.payload_hash == digest:
+                current_app.logger.info(f"[import_rankings] Payload invariato per {label}, segmento saltato.")
+                _update_state(state, digest, False, round_end, now, config)
+                db.session.add(state)
+                batch.append(key)
+                summary["unchanged"] += 1
+            else:
+                counts = _import_fetched_segment(fetch, season_name, label, resolver, progress, errors)
+                if counts is None:
+                    states.pop(key, None)
+                    progress.error()
+                    continue
+                # Un team non scritto lascia il segmento da reimportare: il watermark non registra il payload
+                _update_state(state, digest if not counts[2] else None, True, round_end, now, config)
+                db.session.add(state)
+                batch.append(key)
+                current_app.logger.info(f"[import_rankings] {label}: {counts[0]} team, {counts[1]} rider importati")
+                summary["segments"] += 1
+                summary["team_results"] += counts[0]
+                summary["rider_results"] += counts[1]
+                states[key] = state
+
+            if len(batch) >= commit_batch:
+                _commit_segments(batch, states, resolver, errors)
+                batch = []
+
+        _commit_segments(batch, states, resolver, errors)
+    finally:
+        # Prima si fermano i download (che scrivono nell'archivio), poi si chiude l'indice
+        if fetches is not None and hasattr(fetches, "close"):
+            fetches.close()
+        if archive is not None:
+            archive.close()
+    return summary
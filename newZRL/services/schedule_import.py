@@ -0,0 +1,244 @@
+# newZRL/services/schedule_import.py
+
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dateutil import parser
+from newZRL import db
+from newZRL.models.season import Season
+from newZRL.models.round import Round
+from newZRL.models.race import Race
+from newZRL.services.bulk_upsert import changed, chunked
+from newZRL.services.payload_archive import archive_quietly
+from newZRL.services.race_calendar import invalidate_race_calendar
+from newZRL.services.wtrl_fetch import WTRL_API_BASE_URL, make_session
+
+
+def parse_date(date_str):
+    if not date_str:
+        return None
+    try:
+        dt = parser.isoparse(date_str)
+        return dt.date()  # solo data, senza ora
+    except Exception as e:
+        print(f"[WARN] parse_date fallito per '{date_str}': {e}")
+        return None
+
+
+# Colonne di Race scritte dall'import del calendario
+RACE_COLUMNS = (
+    "name", "race_date", "format", "world", "course", "laps", "distance_km", "elevation_m",
+    "rules", "segments", "leadin_distance", "leadin_ascent", "tags", "pace_type", "category",
+)
+SCHEDULE_CATEGORIES = ("A", "B", "C", "D")
+
+
+# Gara del calendario già convertita (una sola passata sul payload); row ha le colonne RACE_COLUMNS
+ScheduleRace = namedtuple("ScheduleRace", "round_number external_id race_date row")
+
+
+def fetch_wtrl_schedule_data(season_name="17", categories=None, api_base_url=WTRL_API_BASE_URL, archive=None,
+                             max_workers=4):
+    """
+    Fetches race schedule data directly from WTRL API for specified categories.
+    Le categorie vengono scaricate in parallelo su una sessione keep-alive; i payload
+    tornano nell'ordine delle categorie.
+    Con `archive` (PayloadArchive) ogni risposta viene archiviata come "schedule" season/category.
+    """
+    if categories is None:
+        categories = SCHEDULE_CATEGORIES # Default to all categories
+
+    base_url = f"{api_base_url}/wtrlruby/"
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Referer": f"https://www.wtrl.racing/zwift-racing-league/schedule/{season_name}/r1/",
+        "wtrl-api-version": "2.7",
+    }
+
+    def fetch(category):
+        params = {
+            "wtrlid": "zrl",
+            "season": season_name,
+            "category": category,
+            "action": "schedule",
+            "test": "c2NoZWR1bGU=",
+        }
+        try:
+            resp = session.get(base_url, headers=headers, params=params, timeout=12)
+            if resp.status_code != 200:
+                print(f"[WARN] Categoria {category}: Status code {resp.status_code}")
+                return []
+            archive_quietly(archive, "schedule", f"{season_name}/{category}", resp.content)
+            data = resp.json()
+            # If the JSON contains all categories, we only need the payload
+            # Otherwise, if it's filtered by category, append its payload
+            return data.get("payload") or []
+        except Exception as e:
+            print(f"[ERROR] Categoria {category}: {e}")
+            return []
+
+    categories = list(categories)
+    all_payloads = []
+    workers = max(1, min(max_workers, len(categories)))
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers,
+                                                              thread_name_prefix="wtrl-schedule") as executor:
+        for payload in executor.map(fetch, categories):
+            all_payloads.extend(payload)
+    return all_payloads
+
+
+def parse_schedule(all_race_payloads):
+    """
+    Converte le gare del payload in ScheduleRace, con una sola parse_date per gara.
+    Ritorna (races, round_dates): le gare con external_id e, per round, le date valide
+    (anche delle gare senza external_id, che contano per le date di round e stagione).
+    """
+    races, round_dates = [], {}
+    for race_data in all_race_payloads:
+        round_number = race_data.get("roundNumber") or 1
+        race_date = parse_date(race_data.get("eventDate"))
+        if race_date:
+            round_dates.setdefault(round_number, []).append(race_date)
+
+        external_id = str(race_data.get("race") or "")
+        if not external_id:
+            continue
+        races.append(ScheduleRace(round_number, external_id, race_date, {
+            "name": race_data.get("courseName"),
+            "race_date": race_date,
+            "format": race_data.get("raceFormat"),
+            "world": race_data.get("courseWorld"),
+            "course": race_data.get("courseFull"),
+            "laps": race_data.get("duration"),
+            "distance_km": (race_data.get("lapDistanceInMeters") or 0) / 1000,
+            "elevation_m": race_data.get("lapAscentInMeters") or 0,
+            "rules": race_data.get("rules"),
+            "segments": json.dumps(race_data.get("segments", [])),
+            "leadin_distance": race_data.get("leadinDistanceInMeters"),
+            "leadin_ascent": race_data.get("leadinAscentInMeters"),
+            "tags": json.dumps(race_data.get("tags", [])),
+            "pace_type": race_data.get("paceType"),
+            "category": race_data.get("subgroup_label"),
+        }))
+    return races, round_dates
+
+
+def _preload_rounds(season_id):
+    """Round della stagione come dict round_number -> {id, start_date, end_date}."""
+    t = Round.__table__
+    return {
+        r.round_number: {"id": r.id, "start_date": r.start_date, "end_date": r.end_date}
+        for r in db.session.execute(
+            db.select(t.c.id, t.c.round_number, t.c.start_date, t.c.end_date).where(t.c.season_id == season_id)
+        )
+    }
+
+
+def _preload_races(round_ids):
+    """Gare dei round indicati come dict (round_id, category, external_id) -> riga (id + RACE_COLUMNS)."""
+    t = Race.__table__
+    races = {}
+    for batch in chunked(round_ids):
+        for r in db.session.execute(
+            db.select(t.c.id, t.c.round_id, t.c.external_id, *(t.c[c] for c in RACE_COLUMNS))
+            .where(t.c.round_id.in_(batch))
+        ):
+            row = dict(r._mapping)
+            races[(row["round_id"], row["category"], row["external_id"])] = row
+    return races
+
+
+def _write_rounds(season_id, round_dates):
+    """
+    Crea o allarga i round della stagione con un insert e un update bulk.
+    Ritorna round_number -> id dei round scritti.
+    """
+    existing = _preload_rounds(season_id)
+    inserts, updates = [], []
+    for round_number, dates in round_dates.items():
+        start_date, end_date = min(dates), max(dates)
+        known = existing.get(round_number)
+        if known is None:
+            inserts.append({"season_id": season_id, "round_number": round_number, "name": f"Round {round_number}",
+                            "start_date": start_date, "end_date": end_date, "is_active": True})
+            continue
+        row = {
+            "id": known["id"],
+            "start_date": min(known["start_date"] or start_date, start_date),
+            "end_date": max(known["end_date"] or end_date, end_date),
+        }
+        if changed(known, row, ("start_date", "end_date")):
+            updates.append(row)
+    if inserts:
+        db.session.execute(db.insert(Round), inserts)
+        existing = _preload_rounds(season_id)
+    if updates:
+        db.session.execute(db.update(Round), updates)
+    return {number: existing[number]["id"] for number in round_dates}
+
+
+def import_wtrl_schedule_data_to_db(season_name="17", all_race_payloads=None):
+    """
+    Imports WTRL race schedule data directly into the DB creating season, round, and race entries.
+    Round e gare della stagione vengono precaricati una volta sola; le scritture sono
+    insert / update bulk (solo gare nuove o cambiate): pochi statement per stagione.
+    Ritorna un dict con i contatori, oppure None se il payload non contiene gare valide.
+    """
+    if not all_race_payloads:
+        print(f"[WARN] Nessun payload di gara fornito per la stagione {season_name}")
+        return None
+
+    races, round_dates = parse_schedule(all_race_payloads)
+    all_round_dates = [d for dates in round_dates.values() for d in dates]
+    if not all_round_dates:
+        print(f"[WARN] Nessuna data valida trovata per la stagione {season_name} nel payload fornito")
+        return None
+
+    # Season
+    season = Season.query.filter_by(name=season_name).first()
+    if not season:
+        season = Season(
+            name=season_name,
+            start_date=min(all_round_dates),
+            end_date=max(all_round_dates)
+        )
+        db.session.add(season)
+        db.session.flush()
+    else:
+        season.start_date = min(season.start_date or min(all_round_dates), min(all_round_dates))
+        season.end_date = max(season.end_date or max(all_round_dates), max(all_round_dates))
+
+    try:
+        round_ids = _write_rounds(season.id, round_dates)
+        existing = _preload_races(list(round_ids.values()))
+
+        # Una gara ripetuta nel payload viene scritta una volta sola (vince l'ultima)
+        pending = {}
+        for race in races:
+            round_id = round_ids.get(race.round_number)
+            if round_id is None:
+                continue  # round senza date valide
+            pending[(round_id, race.row["category"], race.external_id)] = race.row
+
+        inserts, updates = [], []
+        for (round_id, category, external_id), row in pending.items():
+            known = existing.get((round_id, category, external_id))
+            if known is None:
+                inserts.append({"round_id": round_id, "external_id": external_id, "active": 1, **row})
+            elif changed(known, row, RACE_COLUMNS):
+                updates.append({"id": known["id"], **row})
+        for batch in chunked(inserts):
+            db.session.execute(db.insert(Race), batch)
+        for batch in chunked(updates):
+            db.session.execute(db.update(Race), batch)
+
+        db.session.commit()
+        invalidate_race_calendar()
+        print(f"[OK] Season {season_name} importata correttamente")
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Commit fallito: {e}")
+        return None
+    return {"rounds": len(round_ids), "races_new": len(inserts), "races_updated": len(updates),
+            "races_unchanged": len(pending) - len(inserts) - len(updates)}
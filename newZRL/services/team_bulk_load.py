@@ -0,0 +1,171 @@
+# newZRL/services/team_bulk_load.py
+"""
+Caricamento offline di una cartella di JSON team WTRL (es. data/wtrl_json/team_*.json).
+
+1. parse: i file vengono letti e normalizzati in righe Team / WTRL_Rider su un
+   pool di processi (stesse regole di teams_import);
+2. load: tutte le righe vengono scritte in un solo passaggio con il percorso più
+   veloce del DB (bulk_load: COPY su PostgreSQL, INSERT multi-riga a blocchi
+   su MySQL e SQLite), seguito dalla pulizia set-based dei rider usciti dai team.
+Il riepilogo riporta file/s e righe/s.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from newZRL import db
+from newZRL.models.race_lineup import RaceLineup
+from newZRL.models.race_results import RaceResultsRider
+from newZRL.models.rider_availability import RiderAvailability
+from newZRL.models.team import Team
+from newZRL.models.wtrl_rider import WTRL_Rider
+from newZRL.services.bulk_upsert import bulk_load, chunked
+from newZRL.services.http_cache import content_hash
+from newZRL.services.teams_import import (
+    RIDER_COLUMNS, TEAM_COLUMNS, _rider_row, _team_row, safe_int,
+)
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "wtrl_json"
+FILE_PATTERN = "team_*.json"
+# File per task inviato ai processi: riduce il costo di pickling per file piccoli
+PARSE_CHUNKSIZE = 8
+
+
+def _trc_from_name(path):
+    """TRC dal nome file team_<trc>.json, usato se il payload non ha meta.trc."""
+    return safe_int(Path(path).stem.rsplit("_", 1)[-1], default=None)
+
+
+def parse_team_file(path):
+    """
+    Legge un file team e ritorna (path, team_row, rider_rows, skipped, error).
+    Gira nei processi del pool: niente DB né app context.
+    """
+    skipped = []
+    try:
+        with open(path, "rb") as f:
+            body = f.read()
+        # File interi in memoria: offline e nei processi del pool il parser C di json è il più veloce
+        data = json.loads(body)
+        meta = data.get("meta")
+        if not isinstance(meta, dict):
+            raise ValueError("payload senza 'meta'")
+        trc = safe_int(meta.get("trc"), default=None) or _trc_from_name(path)
+        if trc is None:
+            raise ValueError("TRC mancante")
+        team_row = _team_row(trc, meta)
+        team_row["payload_hash"] = content_hash(body)
+        rider_rows = [row for row in (_rider_row(trc, m, skipped) for m in data.get("riders") or []) if row is not None]
+        return str(path), team_row, rider_rows, skipped, None
+    except Exception as e:
+        return str(path), None, [], skipped, f"{type(e).__name__}: {e}"
+
+
+def parse_team_files(paths, workers=None):
+    """Parse dei file su un pool di processi (in linea con workers=1), nell'ordine dei file."""
+    paths = [str(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        return [parse_team_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(parse_team_file, paths, chunksize=PARSE_CHUNKSIZE))
+
+
+def delete_departed_riders(trcs, rider_ids):
+    """
+    Rimuove i rider dei team caricati che non compaiono più nei file: differenza
+    di insiemi in memoria e DELETE a blocchi. I rider ancora referenziati da
+    risultati, lineup o disponibilità vengono tenuti. Ritorna (eliminati, tenuti).
+    """
+    r = WTRL_Rider.__table__
+    departed = set()
+    for batch in chunked(trcs):
+        departed.update(db.session.scalars(db.select(r.c.id).where(r.c.team_trc.in_(batch))))
+    departed -= set(rider_ids)
+
+    deleted = 0
+    referenced = [
+        db.select(RaceResultsRider.rider_id).where(RaceResultsRider.rider_id == r.c.id),
+        db.select(RaceLineup.wtrl_rider_id).where(RaceLineup.wtrl_rider_id == r.c.id),
+        db.select(RiderAvailability.wtrl_rider_id).where(RiderAvailability.wtrl_rider_id == r.c.id),
+    ]
+    for batch in chunked(departed):
+        result = db.session.execute(
+            db.delete(r).where(r.c.id.in_(batch), *(~query.exists() for query in referenced))
+        )
+        deleted += result.rowcount
+    return deleted, len(departed) - deleted
+
+
+def load_team_records(parsed, now=None):
+    """
+    Scrive in un solo passaggio le righe prodotte da parse_team_files (un TRC
+    ripetuto vale per l'ultimo file) e pulisce i rider usciti. Non fa commit.
+    Ritorna un dict con i contatori.
+    """
+    now = now or datetime.utcnow()
+    teams, riders = {}, {}
+    for _, team_row, rider_rows, _, error in parsed:
+        if error:
+            continue
+        teams[team_row["trc"]] = {**team_row, "created_at": now, "updated_at": now}
+        # I rider di un TRC ripetuto sono quelli dell'ultimo file
+        riders[team_row["trc"]] = {row["id"]: {**row, "created_at": now, "updated_at": now} for row in rider_rows}
+    rider_rows = [row for rows in riders.values() for row in rows.values()]
+
+    bulk_load(Team, list(teams.values()), ("trc",), TEAM_COLUMNS + ("updated_at",))
+    bulk_load(WTRL_Rider, rider_rows, ("id",), RIDER_COLUMNS + ("updated_at",))
+    deleted, kept = delete_departed_riders(list(teams), [row["id"] for row in rider_rows])
+    return {"teams": len(teams), "riders": len(rider_rows), "departed_deleted": deleted, "departed_kept": kept}
+
+
+def bulk_load_team_dir(data_dir=DATA_DIR, workers=None, pattern=FILE_PATTERN):
+    """
+    Carica tutti i file `pattern` di `data_dir`: parse in parallelo, scrittura bulk,
+    un solo commit. Ritorna il riepilogo con errori, tempi, file/s e righe/s.
+    """
+    data_dir = Path(data_dir)
+    if not data_dir.is_dir():
+        raise ValueError(f"Cartella {data_dir} non trovata.")
+    paths = sorted(data_dir.glob(pattern))
+    if not paths:
+        raise ValueError(f"Nessun file {pattern} in {data_dir}.")
+
+    started = time.perf_counter()
+    parsed = parse_team_files(paths, workers)
+    parse_seconds = time.perf_counter() - started
+
+    errors = [f"{Path(path).name}: {error}" for path, _, _, _, error in parsed if error]
+    for error in errors:
+        logger.warning(f"[bulk_load] File scartato {error}")
+    try:
+        summary = load_team_records(parsed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    seconds = time.perf_counter() - started
+
+    rows = summary["teams"] + summary["riders"]
+    summary.update({
+        "files": len(paths),
+        "errors": errors,
+        "skipped_riders": sum(len(skipped) for _, _, _, skipped, _ in parsed),
+        "parse_seconds": round(parse_seconds, 3),
+        "seconds": round(seconds, 3),
+        "files_per_second": round(len(paths) / seconds, 1) if seconds else None,
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+    })
+    logger.info(
+        f"[bulk_load] {summary['files']} file ({summary['files_per_second']}/s), {summary['teams']} team, "
+        f"{summary['riders']} rider ({summary['rows_per_second']} righe/s), "
+        f"{summary['departed_deleted']} rider usciti eliminati, {len(errors)} file con errori."
+    )
+    return summary
@@ -0,0 +1,299 @@
+# newZRL/services/team_discovery.py
+"""
+Scoperta automatica dei TRC di una stagione e indice dei team per stagione.
+
+Le fonti vengono interrogate in parallelo, dietro il rate limit WTRL condiviso:
+  - la lista team della stagione: {api}/zrl/{season}/teams/
+  - i results di ogni classe nota per le race indicate, dove ogni team compare con id5 = TRC.
+
+L'indice risultante (TeamIndexEntry: TRC, classe, nome, divisione) viene confrontato
+con quello salvato e registra i team nuovi, cambiati e usciti dalla stagione.
+
+L'indice non contiene le rose: l'import riscarica quindi sempre tutti i TRC del
+perimetro e salta la scrittura dei payload invariati (payload_hash di teams_import).
+Il perimetro è il club (data/team_trc_list.txt, WTRL_CLUB_TRC_FILE) meno i team
+usciti dalla stagione; tutta la stagione solo con WTRL_TEAMS_ALL_SEASON.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from flask import current_app
+
+from newZRL import db
+from newZRL.models.round import Round
+from newZRL.models.team import Team
+from newZRL.models.team_index_entry import TeamIndexEntry
+from newZRL.services.bulk_upsert import chunked, upsert
+from newZRL.services.http_cache import content_hash
+from newZRL.services.payload_archive import archive_quietly, get_payload_archive
+from newZRL.services.wtrl_fetch import WTRL_API_BASE_URL, TokenBucket, fetch_wtrl_json, make_session, results_url
+
+logger = logging.getLogger(__name__)
+
+CLUB_TRC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "team_trc_list.txt")
+ENTRY_FIELDS = ("class_id", "name", "division")
+INDEX_COLUMNS = ENTRY_FIELDS + ("entry_hash", "last_seen_at", "removed_at")
+
+
+def teams_list_url(season, api_base_url=WTRL_API_BASE_URL):
+    return f"{api_base_url}/zrl/{season}/teams/"
+
+
+# --------------------------
+# ESTRAZIONE DEI TRC
+# --------------------------
+def _entry(trc, class_id=None, name=None, division=None):
+    return {"trc": trc, "class_id": class_id, "name": name, "division": division}
+
+
+def _as_trc(value):
+    try:
+        trc = int(value)
+    except (TypeError, ValueError):
+        return None
+    return trc if trc > 0 else None
+
+
+def extract_team_entries(data, class_id=None):
+    """
+    TRC presenti in un payload WTRL, come dict trc -> entry.
+    Riconosce i team per la chiave `trc` (lista team, blocco meta) o `id5` (results);
+    nome, classe e divisione vengono presi dove presenti.
+    """
+    entries = {}
+
+    def visit(node):
+        if isinstance(node, list):
+            for item in node:
+                visit(item)
+            return
+        if not isinstance(node, dict):
+            return
+        trc = _as_trc(node.get("trc") or node.get("id5"))
+        if trc is not None:
+            team = node.get("team") if isinstance(node.get("team"), dict) else {}
+            competition = node.get("competition") if isinstance(node.get("competition"), dict) else {}
+            entries[trc] = _entry(
+                trc,
+                class_id=node.get("class") or competition.get("class") or class_id,
+                name=node.get("teamname") or node.get("name") or team.get("name"),
+                division=node.get("division"),
+            )
+            return
+        for value in node.values():
+            visit(value)
+
+    visit(data.get("payload", data) if isinstance(data, dict) else data)
+    return entries
+
+
+def _merge(target, entries):
+    """Unisce le entry mantenendo i campi già noti quando la nuova fonte non li ha."""
+    for trc, entry in entries.items():
+        known = target.get(trc)
+        if known is None:
+            target[trc] = entry
+        else:
+            for field in ENTRY_FIELDS:
+                known[field] = known[field] or entry[field]
+
+
+# --------------------------
+# FETCH CONCORRENTE
+# --------------------------
+def discover_teams(sources, cookie=None, api_base_url=WTRL_API_BASE_URL, max_workers=4, rate=2.0,
+                   archive=None, fetch=fetch_wtrl_json):
+    """
+    Interroga in parallelo tutte le fonti. `sources` è una lista di
+    (season, class_id, race_number): con class_id None si usa la lista team della
+    stagione, altrimenti i results del segmento.
+    Ritorna (entries, errors): season -> {trc: entry} e la lista (source, errore) delle fonti fallite.
+    """
+    limiter = TokenBucket(rate)
+    session = make_session(max_workers)
+
+    def run(source):
+        season, class_id, race_number = source
+        if class_id is None:
+            url, endpoint, key = teams_list_url(season, api_base_url), "teams_list", str(season)
+        else:
+            url = results_url(season, class_id, race_number, f"{api_base_url}/zrl")
+            endpoint, key = "results", f"{season}/{class_id}/{race_number}"
+        ok, resp = fetch(url, cookie=cookie, session=session, limiter=limiter)
+        if not ok:
+            status = resp.status_code if resp is not None else "N/A"
+            return source, None, f"{url} (HTTP {status})"
+        archive_quietly(archive, endpoint, key, resp.content)
+        try:
+            return source, extract_team_entries(json.loads(resp.content), class_id), None
+        except ValueError as e:
+            return source, None, f"{url} -> {e}"
+
+    entries, errors = {}, []
+    with session, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wtrl-discovery") as executor:
+        for source, found, error in executor.map(run, sources):
+            if error:
+                logger.warning(f"[team_discovery] Fonte non disponibile: {error}")
+                errors.append((source, error))
+                continue
+            _merge(entries.setdefault(source[0], {}), found)
+    return entries, errors
+
+
+def discovery_sources(season, races=None):
+    """
+    Fonti per una stagione: la lista team più i results di ogni classe già nota
+    (indice e team importati) per le race indicate, di default l'ultima iniziata.
+    """
+    season = int(season)
+    classes = {c for (c,) in db.session.query(TeamIndexEntry.class_id).filter(
+        TeamIndexEntry.season == season, TeamIndexEntry.class_id.isnot(None)).distinct()}
+    classes |= {c for (c,) in db.session.query(Team.competition_class).filter(
+        Team.competition_season == str(season), Team.competition_class.isnot(None)).distinct()}
+
+    if races is None:
+        started = db.session.query(db.func.max(Round.round_number)).filter(
+            Round.season_id == season, Round.start_date <= date.today()).scalar()
+        races = [started or 1]
+    sources = [(season, None, None)]
+    sources += [(season, class_id, race) for class_id in sorted(classes) for race in races]
+    return sources
+
+
+# --------------------------
+# INDICE
+# --------------------------
+def entry_hash(entry):
+    return content_hash(json.dumps([entry.get(f) for f in ENTRY_FIELDS], default=str).encode("utf-8"))
+
+
+def update_index(season, discovered, now=None):
+    """
+    Confronta le entry scoperte con l'indice salvato e lo aggiorna con un upsert bulk.
+    I TRC non più presenti vengono marcati con removed_at (non cancellati).
+    Ritorna un dict con le liste di TRC new / changed / unchanged / removed.
+    """
+    now = now or datetime.utcnow()
+    season = int(season)
+    t = TeamIndexEntry.__table__
+    saved = {
+        trc: (digest, removed_at)
+        for trc, digest, removed_at in db.session.execute(
+            db.select(t.c.trc, t.c.entry_hash, t.c.removed_at).where(t.c.season == season)
+        )
+    }
+
+    diff = {"new": [], "changed": [], "unchanged": [], "removed": []}
+    rows = []
+    for trc, entry in sorted(discovered.items()):
+        digest = entry_hash(entry)
+        if trc not in saved:
+            diff["new"].append(trc)
+        elif saved[trc][0] != digest or saved[trc][1] is not None:
+            diff["changed"].append(trc)
+        else:
+            diff["unchanged"].append(trc)
+        rows.append({"season": season, "trc": trc, **{f: entry.get(f) for f in ENTRY_FIELDS},
+                     "entry_hash": digest, "first_seen_at": now, "last_seen_at": now, "removed_at": None})
+    upsert(TeamIndexEntry, rows, ("season", "trc"), INDEX_COLUMNS)
+
+    diff["removed"] = sorted(trc for trc, (_, removed_at) in saved.items()
+                             if trc not in discovered and removed_at is None)
+    for batch in chunked(diff["removed"]):
+        db.session.execute(
+            db.update(t).where(t.c.season == season, t.c.trc.in_(batch)).values(removed_at=now)
+        )
+    db.session.commit()
+    return diff
+
+
+def club_trcs(path=None):
+    """TRC dei team del club, uno per riga (default WTRL_CLUB_TRC_FILE o data/team_trc_list.txt)."""
+    path = path or current_app.config.get("WTRL_CLUB_TRC_FILE") or CLUB_TRC_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            trcs = {trc for trc in (_as_trc(line.strip()) for line in f) if trc is not None}
+    except FileNotFoundError:
+        raise ValueError(f"File dei TRC del club non trovato: {path}")
+    if not trcs:
+        raise ValueError(f"Nessun TRC nel file {path}")
+    return trcs
+
+
+def active_trcs(season):
+    """TRC dell'indice ancora presenti nella stagione."""
+    t = TeamIndexEntry.__table__
+    return set(db.session.scalars(db.select(t.c.trc).where(t.c.season == int(season), t.c.removed_at.is_(None))))
+
+
+def refresh_team_index(seasons, races=None):
+    """
+    Aggiorna l'indice di una o più stagioni con un'unica scoperta concorrente
+    (tutte le stagioni e classi sullo stesso pool). Ritorna season -> diff
+    (None se per la stagione non è stato trovato alcun TRC: indice lasciato invariato).
+    Le rimozioni dipendono solo dalla lista team: se questa non è disponibile i TRC
+    non riletti restano nell'indice (un results mancante, es. race non ancora
+    pubblicata, non basta a dire che un team è sparito).
+    """
+    config = current_app.config
+    seasons = [int(season) for season in seasons]
+    sources = [source for season in seasons for source in discovery_sources(season, races)]
+    archive = get_payload_archive(current_app)
+    try:
+        found, errors = discover_teams(
+            sources,
+            cookie=config.get("WTRL_API_COOKIE"),
+            api_base_url=config.get("WTRL_API_BASE_URL", WTRL_API_BASE_URL),
+            max_workers=config.get("WTRL_FETCH_WORKERS", 4),
+            rate=config.get("WTRL_REQUESTS_PER_SECOND", 2.0),
+            archive=archive,
+        )
+    finally:
+        if archive is not None:
+            archive.close()
+
+    diffs = {}
+    for season in seasons:
+        discovered = found.get(season, {})
+        failed = [source for source, _ in errors if source[0] == season]
+        if not discovered:
+            current_app.logger.warning(f"[team_discovery] Stagione {season}: nessun TRC trovato ({len(failed)} fonti non disponibili).")
+            diffs[season] = None
+            continue
+        if any(class_id is None for _, class_id, _ in failed):
+            for row in TeamIndexEntry.query.filter_by(season=season, removed_at=None):
+                if row.trc not in discovered:
+                    discovered[row.trc] = _entry(row.trc, row.class_id, row.name, row.division)
+
+        diff = diffs[season] = update_index(season, discovered)
+        current_app.logger.info(
+            f"[team_discovery] Stagione {season}: {len(discovered)} TRC, {len(diff['new'])} nuovi, "
+            f"{len(diff['changed'])} cambiati, {len(diff['removed'])} rimossi."
+        )
+    return diffs
+
+
+def plan_team_import(season, races=None):
+    """
+    Aggiorna l'indice della stagione e ritorna (trcs, diff): i TRC da passare a
+    import_teams e il confronto con l'indice precedente (None se la scoperta non
+    ha trovato nulla). I TRC sono quelli del club meno i team usciti dalla
+    stagione; con WTRL_TEAMS_ALL_SEASON tutti i team attivi dell'indice.
+    Solleva ValueError se non c'è alcun TRC da importare.
+    """
+    season = int(season)
+    diff = refresh_team_index([season], races)[season]
+    if current_app.config.get("WTRL_TEAMS_ALL_SEASON"):
+        if diff is None:
+            raise ValueError(f"Nessun TRC trovato per la stagione {season}.")
+        return sorted(active_trcs(season)), diff
+
+    t = TeamIndexEntry.__table__
+    removed = set(db.session.scalars(
+        db.select(t.c.trc).where(t.c.season == season, t.c.removed_at.isnot(None))
+    ))
+    return sorted(club_trcs() - removed), diff
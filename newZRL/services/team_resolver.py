@@ -0,0 +1,73 @@
+# newZRL/services/team_resolver.py
+
+from sqlalchemy import inspect
+from newZRL import db
+from newZRL.models.team import Team
+from newZRL.services.teams_import import safe_int
+
+
+def normalize_name(s):
+    """Normalizza i nomi per confronto robusto."""
+    if not s:
+        return ""
+    s = s.strip().upper()
+    # rimuovi prefissi comuni e doppio spazio
+    s = s.replace("TEAM ", "").replace("  ", " ")
+    return s
+
+
+class TeamResolver:
+    """
+    Indice in memoria dei Team per un run di import.
+    Carica una sola volta i team (della stagione, se indicata) in due dict
+    trc -> Team e nome normalizzato -> Team; i team creati durante il run
+    vanno registrati con `add` così le ricerche successive li trovano subito.
+    """
+
+    def __init__(self, season=None):
+        self.by_trc = {}
+        self.by_name = {}
+        query = Team.query
+        if season is not None:
+            query = query.filter(Team.competition_season == str(season))
+        for team in query.all():
+            self.register(team)
+
+    def register(self, team):
+        if team.trc is not None:
+            self.by_trc[int(team.trc)] = team
+        key = normalize_name(team.name)
+        if key:
+            self.by_name.setdefault(key, team)
+        return team
+
+    def get(self, trc=None, name=None):
+        """
+        Cerca per TRC e poi per nome normalizzato. Ritorna None se non trovato.
+        Un TRC non numerico viene ignorato e si passa alla ricerca per nome.
+        """
+        trc = safe_int(trc, default=None)
+        if trc:
+            team = self.by_trc.get(trc)
+            if team is None:
+                # Il TRC è la PK: un team di un'altra stagione va comunque riusato
+                team = db.session.get(Team, trc)
+                if team is not None:
+                    self.register(team)
+            if team is not None:
+                return team
+        if name:
+            return self.by_name.get(normalize_name(name))
+        return None
+
+    def add(self, team):
+        """Aggiunge un nuovo team alla sessione e all'indice."""
+        db.session.add(team)
+        return self.register(team)
+
+    def prune(self):
+        """Dopo un rollback rimuove dall'indice i team aggiunti e mai committati."""
+        for index in (self.by_trc, self.by_name):
+            for key, team in list(index.items()):
+                if not inspect(team).persistent:
+                    del index[key]
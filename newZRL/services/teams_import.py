@@ -0,0 +1,441 @@
+# newZRL/services/teams_import.py
+
+import os
+import json
+import shutil
+import time
+import random
+import logging
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from datetime import datetime
+
+import requests
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from newZRL import db
+from newZRL.models.team import Team
+from newZRL.models.wtrl_rider import WTRL_Rider
+from newZRL.services.job_progress import as_tracker
+from newZRL.services.json_stream import CHUNK_SIZE, iter_document
+from newZRL.services.bulk_upsert import chunked, upsert
+from newZRL.services.http_cache import content_hash
+from newZRL.services.payload_archive import PayloadArchive, get_payload_archive
+from newZRL.services.team_discovery import plan_team_import
+from newZRL.services.wtrl_fetch import TokenBucket, make_session
+
+# Configure a logger for this module (il file logs/wtrl_api_errors.log viene aggiunto da create_app)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# ==============================================================================
+# FUNZIONI DI SUPPORTO PER L'INTEGRITÀ LOGICA E DEI TIPI DI DATO
+# ==============================================================================
+
+def safe_float(val, default=0.0):
+    """Tenta di convertire un valore in float, restituendo il default in caso di errore o se è vuoto/None."""
+    if val is None or val == "":
+        return default
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return default
+
+def safe_int(val, default=0):
+    """Tenta di convertire un valore in int, restituendo il default in caso di errore o se è vuoto/None."""
+    if val is None or val == "":
+        return default
+    try:
+        # A volte i JSON contengono numeri come stringhe float (es. "1.0"). 
+        # Convertiamo prima a float per gestirli, poi a int.
+        return int(float(val)) 
+    except (ValueError, TypeError):
+        return default
+
+def safe_bool_to_int(val, default=0):
+    """Converte un valore in 1 (True) o 0 (False) per i campi INT booleani."""
+    if isinstance(val, bool):
+        return 1 if val else 0
+    if isinstance(val, str):
+        if val.lower() in ('true', '1'):
+            return 1
+        if val.lower() in ('false', '0'):
+            return 0
+    return default
+
+
+# ==============================================================================
+# IMPORT TEAM + RIDERS
+# ==============================================================================
+
+# Copia in chiaro dei payload (team_<trc>.json), letta da team_bulk_load e dal benchmark
+TEAM_JSON_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "data", "wtrl_json")
+
+
+def export_team_json(archive, digest, export_dir, trc):
+    """Scrive il payload archiviato in export_dir/team_<trc>.json (scrittura atomica)."""
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"team_{trc}.json")
+    tmp_path = f"{path}.part"
+    with archive.open(digest) as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _download_team(session, limiter, url, headers, archive, key, attempts=3):
+    """
+    Scarica il payload di un team in streaming direttamente nell'archivio dei
+    payload (compresso, deduplicato per contenuto), calcolandone lo sha256.
+    Timeout ed errori di rete/5xx vengono ritentati con backoff; gira nei thread
+    del pool, quindi non tocca il DB. Ritorna l'hash del payload.
+    """
+    for attempt in range(1, attempts + 1):
+        limiter.acquire()
+        try:
+            with session.get(url, headers=headers, timeout=(10, 60), stream=True) as resp:
+                resp.raise_for_status()  # Raise an exception for bad status codes
+                digest = archive.put_stream("teams", key, resp.iter_content(CHUNK_SIZE))
+            logger.info(f"Archived API response {url} ({digest[:12]})")
+            return digest
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+            if attempt == attempts or (status is not None and status < 500):
+                logger.error(f"Final attempt failed for {url}: {e}")
+                raise
+            wait = 2 ** attempt + random.uniform(0, 1)
+            logger.warning(f"Attempt {attempt} for {url} failed ({e}). Retrying in {wait:.1f}s...")
+            time.sleep(wait)
+
+
+# Colonne scritte dall'upsert (oltre a trc / id e ai timestamp)
+TEAM_COLUMNS = (
+    "name", "division", "category", "wtrl_team_id", "jersey_name", "jersey_image", "recruiting",
+    "is_dev", "competition_class", "competition_season", "competition_year", "competition_round",
+    "competition_status", "member_count", "members_remaining", "captain_name", "captain_profile_id",
+    "payload_hash",
+)
+RIDER_COLUMNS = (
+    "team_trc", "profile_id", "tmuid", "name", "avatar", "member_status", "signedup", "category",
+    "zftp", "zftpw", "zmap", "zmapw", "riderpoints", "teams", "appearances_round",
+    "appearances_season", "user_id",
+)
+# Campi del fingerprint di un rider (payload_hash escluso)
+RIDER_FINGERPRINT_COLUMNS = RIDER_COLUMNS
+RIDER_COLUMNS = RIDER_COLUMNS + ("payload_hash",)
+# Team scritti per ogni commit
+TEAM_COMMIT_BATCH = 25
+
+
+def _team_row(trc, meta):
+    """Riga Team dal blocco `meta` del payload WTRL."""
+    team_info = meta.get("team", {})
+    competition = meta.get("competition", {})
+    captain_info = meta.get("administrators", {}).get("captain", {})
+    competition_season = competition.get("season") or None
+    return {
+        "trc": trc,
+        "name": team_info.get("name"),
+        "division": meta.get("division"),
+        "category": competition.get("division"),
+        "wtrl_team_id": team_info.get("teamid") or team_info.get("tttid") or None,
+        "jersey_name": team_info.get("jerseyname") or None,
+        "jersey_image": team_info.get("jerseyimage") or None,
+        "recruiting": bool(safe_bool_to_int(team_info.get("recruiting"), default=0)),
+        "is_dev": bool(safe_bool_to_int(team_info.get("isdev"), default=0)),
+        "competition_class": competition.get("class") or None,
+        # competition_season è una stringa nel DB: normalizzata per il confronto
+        "competition_season": str(competition_season) if competition_season is not None else None,
+        "competition_year": competition.get("sportsYear") or None,
+        "competition_round": competition.get("roundnumber") or None,
+        "competition_status": competition.get("status") or None,
+        "member_count": safe_int(meta.get("memberCount"), default=0),
+        "members_remaining": safe_int(meta.get("membersRemaining"), default=0),
+        "captain_name": f"{captain_info.get('firstName', '')} {captain_info.get('lastName', '')}".strip() or None,
+        "captain_profile_id": captain_info.get("profileId"),
+    }
+
+
+def _rider_row(trc, m, skipped_riders):
+    """Riga WTRL_Rider di un membro del team, oppure None se il rider va saltato."""
+    profile_id_source = m.get("zid") or m.get("zwid") or m.get("profileId")
+    correct_profile_id_int = safe_int(profile_id_source, default=None)
+    if correct_profile_id_int is None:
+        skipped_riders.append(f"Rider senza profileId valido in TRC {trc}")
+        return None
+    row = {
+        "id": f"{trc}/{correct_profile_id_int}",
+        "team_trc": trc,
+        "profile_id": correct_profile_id_int,
+        "tmuid": m.get("tmuid") or None,
+        "name": m.get("name"),
+        "avatar": m.get("avatar") or None,
+        "member_status": m.get("memberStatus"),
+        "signedup": bool(m.get("signedup", False)),
+        "category": m.get("category"),
+        "zftp": safe_float(m.get("zftp")),
+        "zftpw": safe_float(m.get("zftpw")),
+        "zmap": safe_float(m.get("zmap")),
+        "zmapw": safe_float(m.get("zmapw")),
+        "riderpoints": safe_int(m.get("riderpoints"), default=0),
+        "teams": safe_int(m.get("teams"), default=0),
+        "appearances_round": safe_int(m.get("appearancesRound"), default=0),
+        "appearances_season": safe_int(m.get("appearancesSeason"), default=0),
+        "user_id": m.get("userId"),
+    }
+    row["payload_hash"] = rider_fingerprint(row)
+    return row
+
+
+def rider_fingerprint(row):
+    """sha256 dei campi importati di un rider: confronto in un solo valore invece che colonna per colonna."""
+    values = [row.get(c) for c in RIDER_FINGERPRINT_COLUMNS]
+    return content_hash(json.dumps(values, default=str).encode("utf-8"))
+
+
+def preload_fingerprints(trcs):
+    """
+    Fingerprint già salvati per i TRC indicati, con query IN (...) a blocchi.
+    Ritorna (team_hashes, rider_hashes, riders_per_team): trc -> payload_hash,
+    id rider -> payload_hash e trc -> numero di rider nel DB.
+    """
+    t = Team.__table__
+    r = WTRL_Rider.__table__
+    team_hashes, rider_hashes, riders_per_team = {}, {}, Counter()
+    for batch in chunked(trcs):
+        team_hashes.update(db.session.execute(
+            db.select(t.c.trc, t.c.payload_hash).where(t.c.trc.in_(batch))
+        ).all())
+        for rider_id, team_trc, payload_hash in db.session.execute(
+            db.select(r.c.id, r.c.team_trc, r.c.payload_hash).where(r.c.team_trc.in_(batch))
+        ):
+            rider_hashes[rider_id] = payload_hash
+            riders_per_team[team_trc] += 1
+    return team_hashes, rider_hashes, riders_per_team
+
+
+def _write_teams(parsed, team_hashes, rider_hashes):
+    """
+    Scrive con upsert bulk, in un SAVEPOINT e senza commit, i team del blocco `parsed`
+    (lista di (team_row, rider_rows)), tutti con payload nuovo o cambiato, e i soli
+    rider con fingerprint diverso.
+    Ritorna (stats, team_rows, rider_rows): un Counter con team e rider nuovi /
+    modificati / invariati e le righe scritte.
+    """
+    now = datetime.utcnow()
+    stats = Counter()
+    team_rows, rider_rows = [], []
+    for team_row, rows in parsed:
+        stats["teams_changed" if team_row["trc"] in team_hashes else "teams_new"] += 1
+        team_rows.append({**team_row, "created_at": now, "updated_at": now})
+        for row in rows:
+            if row["id"] not in rider_hashes:
+                stats["riders_new"] += 1
+            elif rider_hashes[row["id"]] != row["payload_hash"]:
+                stats["riders_changed"] += 1
+            else:
+                stats["riders_unchanged"] += 1
+                continue
+            rider_rows.append({**row, "created_at": now, "updated_at": now})
+
+    with db.session.begin_nested():
+        upsert(Team, team_rows, ("trc",), TEAM_COLUMNS + ("updated_at",))
+        upsert(WTRL_Rider, rider_rows, ("id",), RIDER_COLUMNS + ("updated_at",))
+    return stats, team_rows, rider_rows
+
+
+def _flush_batch(batch, team_hashes, rider_hashes, failed):
+    """
+    Scrive un blocco di team con un solo commit. Se la scrittura bulk fallisce si
+    riprova team per team, ciascuno nel proprio SAVEPOINT: il team non valido viene
+    scartato (e il suo TRC aggiunto a `failed`) senza perdere gli altri del blocco.
+    """
+    if not batch:
+        return Counter()
+    try:
+        stats, *rows = _write_teams([parsed for _, parsed in batch], team_hashes, rider_hashes)
+        written = [rows]
+    except SQLAlchemyError as e:
+        logger.warning(f"Scrittura del blocco di {len(batch)} team fallita ({e}), riprovo team per team.")
+        stats, written = Counter(), []
+        for trc_id, parsed in batch:
+            try:
+                team_stats, *rows = _write_teams([parsed], team_hashes, rider_hashes)
+            except SQLAlchemyError as e:
+                failed.add(parsed[0]["trc"])
+                logger.error(f"SQLAlchemyError importing TRC {trc_id}: {str(e)}", exc_info=True)
+                continue
+            stats += team_stats
+            written.append(rows)
+
+    try:
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        failed.update(parsed[0]["trc"] for _, parsed in batch)
+        logger.error(f"Commit del blocco di {len(batch)} team fallito: {str(e)}", exc_info=True)
+        return Counter()
+
+    # Fingerprint aggiornati solo dopo il commit
+    for team_rows, rider_rows in written:
+        for row in team_rows:
+            team_hashes[row["trc"]] = row["payload_hash"]
+        for row in rider_rows:
+            rider_hashes[row["id"]] = row["payload_hash"]
+    return stats
+
+
+def import_teams(season_number, report=None, trc_list=None, batch_size=None, force=False):
+    """
+    Importa team e riders WTRL per i TRC passati in `trc_list`; senza lista i TRC
+    sono quelli del club (o di tutta la stagione), dopo aggiornamento dell'indice
+    (services/team_discovery.py). I fingerprint di team e rider
+    vengono precaricati una volta sola: i team con payload identico all'ultimo
+    import vengono saltati (a meno di `force`), degli altri si scrivono con
+    upsert bulk solo i rider cambiati, con un commit ogni `batch_size` team
+    (default WTRL_TEAMS_COMMIT_BATCH); ogni team ha il proprio SAVEPOINT in caso di errore.
+    `report` riceve l'avanzamento: un ProgressTracker (team fatti / totali, tempi di
+    fetch, parse e write, errori) oppure una funzione report(progress, message).
+    Ritorna un dict riepilogativo; solleva ValueError se non ci sono TRC.
+    """
+    progress = as_tracker(report)
+    progress(0, 'Inizio importazione...')
+
+    app = current_app
+    batch_size = batch_size or app.config.get("WTRL_TEAMS_COMMIT_BATCH", TEAM_COMMIT_BATCH)
+    diff = None
+    if trc_list is None:
+        with progress.phase("discover"):
+            trc_list, diff = plan_team_import(season_number)
+
+    if not trc_list:
+        raise ValueError("Errore: Nessun TRC da importare.")
+
+    teams_saved = 0
+    failed = set()
+    skipped_riders = []
+    stats = Counter()
+    total_trcs = len(trc_list)
+
+    wtrl_api_base_url = f"{app.config['WTRL_API_BASE_URL']}/zrl/{season_number}/teams/"
+    headers = {
+        "Referer": "https://www.wtrl.racing/",
+        "wtrl-api-version": "2.7",
+        "Cookie": app.config["WTRL_API_COOKIE"],
+    }
+
+    trcs = []
+    for trc_id in trc_list:
+        trc = safe_int(trc_id, default=None)
+        if trc is None:
+            logger.warning(f"Skipped TRC {trc_id}: invalid TRC ID.")
+            continue
+        trcs.append((trc_id, trc))
+    done = total_trcs - len(trcs)
+    progress.start(total_trcs)
+    if done:
+        progress.advance(done)
+        progress.error(done)
+
+    # Fingerprint già salvati: due query per blocco di TRC invece di una per team e per rider
+    team_hashes, rider_hashes, riders_per_team = preload_fingerprints([trc for _, trc in trcs])
+    batch = []
+
+    # Download in parallelo (pool limitato, sessione keep-alive, rate limit condiviso);
+    # il DB resta nel thread principale e importa i team nell'ordine in cui arrivano
+    workers = app.config.get("WTRL_FETCH_WORKERS", 4)
+    limiter = TokenBucket(app.config.get("WTRL_REQUESTS_PER_SECOND", 2.0))
+    # Anche i payload invariati vengono copiati: la cartella resta allineata all'ultimo fetch
+    export_dir = app.config.get("WTRL_TEAMS_JSON_DIR") or TEAM_JSON_DIR
+    export_json = app.config.get("WTRL_TEAMS_JSON_ENABLED", True)
+    def fetch(url, key, trc):
+        with progress.phase("fetch"):
+            digest = _download_team(session, limiter, url, headers, archive, key)
+            if export_json:
+                export_team_json(archive, digest, export_dir, trc)
+            return digest
+
+    with ExitStack() as stack:
+        # I payload passano dall'archivio; se è disabilitato se ne usa uno temporaneo
+        archive = get_payload_archive(app)
+        if archive is None:
+            archive = PayloadArchive(stack.enter_context(tempfile.TemporaryDirectory(prefix="wtrl-teams-")))
+        stack.callback(archive.close)
+        session = stack.enter_context(make_session(workers))
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wtrl-teams"))
+        futures = {
+            executor.submit(fetch, f"{wtrl_api_base_url}{trc_id}", f"{season_number}/{trc}", trc): (trc_id, trc)
+            for trc_id, trc in trcs
+        }
+        for future in as_completed(futures):
+            trc_id, trc = futures[future]
+            done += 1
+            progress.advance(message=f"Importato TRC {trc_id} ({done}/{total_trcs})...")
+            logger.info(f"--- Processing TRC: {trc_id} ---")
+            try:
+                digest = future.result()
+                if not force and team_hashes.get(trc) == digest:
+                    # Payload identico all'ultimo import: niente da leggere né da scrivere
+                    teams_saved += 1
+                    stats["teams_unchanged"] += 1
+                    stats["riders_unchanged"] += riders_per_team.get(trc, 0)
+                    continue
+
+                # Team e rider vengono letti dal payload archiviato uno alla volta
+                team_row, rider_rows = None, []
+                with progress.phase("parse"), archive.open(digest) as f:
+                    for key, value in iter_document(f, "riders"):
+                        if key == "meta":
+                            team_row = _team_row(trc, value)
+                        elif key == "riders":
+                            if team_row is None:
+                                raise ValueError(f"Payload TRC {trc_id}: 'riders' prima di 'meta'")
+                            row = _rider_row(trc, value, skipped_riders)
+                            if row is not None:
+                                rider_rows.append(row)
+                if team_row is None:
+                    raise ValueError(f"Payload TRC {trc_id} senza 'meta'")
+                team_row["payload_hash"] = digest
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error fetching TRC {trc_id} from API: {str(e)}", exc_info=True)
+                progress.error()
+                continue
+            except Exception as e:
+                logger.error(f"Critical error importing TRC {trc_id}: {str(e)}", exc_info=True)
+                progress.error()
+                continue
+
+            teams_saved += 1
+            batch.append((trc_id, (team_row, rider_rows)))
+            if len(batch) >= batch_size:
+                with progress.phase("write"):
+                    stats += _flush_batch(batch, team_hashes, rider_hashes, failed)
+                batch = []
+
+    with progress.phase("write"):
+        stats += _flush_batch(batch, team_hashes, rider_hashes, failed)
+    if failed:
+        teams_saved -= len(failed)
+        progress.error(len(failed))
+    riders_saved = stats["riders_new"] + stats["riders_changed"] + stats["riders_unchanged"]
+
+    final_message = (
+        f"Import completato: {teams_saved} team ({stats['teams_new']} nuovi, {stats['teams_changed']} modificati, "
+        f"{stats['teams_unchanged']} invariati), {riders_saved} riders ({stats['riders_new']} nuovi, "
+        f"{stats['riders_changed']} modificati, {stats['riders_unchanged']} invariati)."
+    )
+    if skipped_riders:
+        final_message += f" Attenzione: {len(skipped_riders)} ciclisti saltati."
+
+    progress(100, final_message)
+    summary = {"teams": teams_saved, "riders": riders_saved, "skipped_riders": len(skipped_riders),
+               "message": final_message}
+    for key in ("teams_new", "teams_changed", "teams_unchanged", "riders_new", "riders_changed", "riders_unchanged"):
+        summary[key] = stats[key]
+    if diff is not None:
+        summary["index"] = {key: len(trcs) for key, trcs in diff.items()}
+    return summary
@@ -0,0 +1,229 @@
+# newZRL/services/wtrl_fetch.py
+
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from newZRL.services.payload_archive import archive_quietly
+from newZRL.services.wtrl_readiness import ReadinessPoller, READY, PENDING, RETRY, FAILED
+
+logger = logging.getLogger(__name__)
+
+WTRL_API_BASE_URL = "https://www.wtrl.racing/api"
+WTRL_BASE_URL = f"{WTRL_API_BASE_URL}/zrl"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+# Secondi aggiunti alla stima del timeout complessivo di fetch_segments (timeout HTTP, code)
+SEGMENT_TIMEOUT_MARGIN = 120
+
+
+# --------------------------
+# RATE LIMIT
+# --------------------------
+class TokenBucket:
+    """Token bucket thread-safe: `rate` richieste al secondo, burst massimo `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocca finché non è disponibile un token, poi lo consuma."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=4):
+    """Sessione requests con connessioni keep-alive condivisibile tra thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+# --------------------------
+# FETCH SINGOLO ENDPOINT
+# --------------------------
+def attempt_wtrl_json(url, cookie=None, session=None, limiter=None, cache=None):
+    """
+    Esegue un singolo tentativo verso un endpoint WTRL, senza attese.
+    Ritorna (status, response) con status in READY / PENDING / RETRY / FAILED.
+    Con una ResponseCache la richiesta è condizionale: un 304 restituisce la
+    risposta salvata (response.from_cache = True). In entrambi i casi
+    response.content_hash contiene l'hash del payload.
+    """
+    http = session or requests
+    cookies = {"Cookie": cookie} if cookie else None
+    headers = dict(HEADERS)
+    if cache is not None:
+        headers.update(cache.conditional_headers(url))
+
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        resp = http.get(url, headers=headers, cookies=cookies, timeout=30)
+    except Exception as e:
+        logger.error(f"[attempt_wtrl_json] {url} network error: {e}")
+        return RETRY, None
+
+    if resp.status_code == 200:
+        if cache is not None:
+            resp.content_hash = cache.store(url, resp)
+            resp.from_cache = False
+        return READY, resp
+
+    if resp.status_code == 304 and cache is not None:
+        cached = cache.cached_response(url)
+        # Cache incoerente: al prossimo tentativo la richiesta non sarà condizionale
+        return (READY, cached) if cached is not None else (RETRY, resp)
+
+    if resp.status_code == 202:
+        return PENDING, resp
+
+    # Qualsiasi altro codice (403, 404, 500...) -> fallimento
+    logger.error(f"[attempt_wtrl_json] {url} got HTTP {resp.status_code}")
+    logger.debug(resp.text[:800])
+    return FAILED, resp
+
+
+def fetch_wtrl_json(url, cookie=None, session=None, limiter=None, cache=None,
+                    max_retries=14, initial_delay=3.0, max_delay=8.0):
+    """
+    Chiede un endpoint WTRL e attende (bloccando) che ritorni 200.
+    Ritorna (success, response) come gli helper ensure_wtrl_*_json_ready.
+    202 ed errori di rete vengono ritentati con exponential backoff + jitter.
+    Per molti endpoint usare fetch_segments, che non blocca i thread sulle attese.
+    """
+    delay = initial_delay
+    last_response = None
+    for attempt in range(1, max_retries + 1):
+        status, resp = attempt_wtrl_json(url, cookie=cookie, session=session, limiter=limiter, cache=cache)
+        last_response = resp
+        if status == READY:
+            return True, resp
+        if status == FAILED:
+            return False, resp
+        if status == PENDING:
+            logger.info(f"[fetch_wtrl_json] {url} attempt {attempt} got 202 (not ready). Waiting {delay:.1f}s")
+        time.sleep(min(max_delay, delay) + random.uniform(0, 0.5))
+        delay = min(max_delay, delay * 1.8)
+
+    return False, last_response
+
+
+def results_url(season, class_id, race_number, base_url=WTRL_BASE_URL):
+    return f"{base_url}/results/{season}/{class_id}/{race_number}"
+
+
+def league_url(season, class_id, race_number, base_url=WTRL_BASE_URL):
+    return f"{base_url}/league/{season}/{class_id}/{race_number}"
+
+
+# --------------------------
+# PIPELINE DI FETCH PER SEGMENTI
+# --------------------------
+class SegmentFetch:
+    """Risposte results + league di un segmento (race_number, competition_class)."""
+
+    def __init__(self, race_number, class_id):
+        self.race_number = race_number
+        self.class_id = class_id
+        self.results = None   # (ok, response)
+        self.league = None    # (ok, response)
+
+    @property
+    def complete(self):
+        return self.results is not None and self.league is not None
+
+    def responses(self):
+        return [outcome[1] for outcome in (self.results, self.league) if outcome and outcome[0]]
+
+
+def fetch_segments(season, segments, cookie=None, max_workers=4, rate=2.0, cache=None,
+                   max_retries=14, initial_delay=1.2, max_delay=8.0, base_url=WTRL_BASE_URL, archive=None,
+                   timeout=None):
+    """
+    Scarica results e league di tutti i segmenti in parallelo su un pool limitato,
+    dietro un unico token bucket condiviso. Gli endpoint che rispondono 202 passano
+    al ReadinessPoller, che li interroga di nuovo sul proprio timer senza occupare
+    i worker. Restituisce un generatore di SegmentFetch nell'ordine in cui i segmenti
+    diventano completi, così il chiamante può scrivere sul DB mentre le altre
+    richieste sono ancora in volo. Con `archive` (PayloadArchive) ogni corpo
+    ricevuto viene archiviato come "results" / "league" con chiave season/class/race.
+    Dopo `timeout` secondi (default: stima dal numero di richieste, dal rate e dal
+    backoff massimo) gli endpoint ancora senza risposta valgono come falliti.
+    """
+    segments = list(segments)
+    if timeout is None:
+        timeout = 2 * len(segments) / rate + max_retries * (max_delay + 0.5) + SEGMENT_TIMEOUT_MARGIN
+    deadline = time.monotonic() + timeout
+    limiter = TokenBucket(rate)
+    session = make_session(max_workers)
+    fetches = {}
+    done = queue.Queue()
+
+    def _attempt(url):
+        return attempt_wtrl_json(url, cookie=cookie, session=session, limiter=limiter, cache=cache)
+
+    def _on_done(tag, outcome):
+        (race_number, class_id), kind = tag
+        ok, resp = outcome
+        try:
+            if ok:
+                archive_quietly(archive, kind, f"{season}/{class_id}/{race_number}", resp.content)
+        finally:
+            done.put((tag, outcome))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wtrl-fetch")
+    poller = ReadinessPoller(executor, _attempt, _on_done,
+                             max_attempts=max_retries, initial_delay=initial_delay,
+                             max_delay=max_delay).start()
+    try:
+        for race_number, class_id in segments:
+            key = (race_number, class_id)
+            fetches[key] = SegmentFetch(race_number, class_id)
+            poller.add(results_url(season, class_id, race_number, base_url), (key, "results"))
+            poller.add(league_url(season, class_id, race_number, base_url), (key, "league"))
+
+        while fetches:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise queue.Empty
+                (key, kind), outcome = done.get(timeout=remaining)
+            except queue.Empty:
+                logger.error(f"[fetch_segments] Timeout dopo {timeout:.0f}s: {len(fetches)} segmenti senza risposta")
+                for fetch in fetches.values():
+                    fetch.results = fetch.results or (False, None)
+                    fetch.league = fetch.league or (False, None)
+                    yield fetch
+                return
+            fetch = fetches.get(key)
+            if fetch is None:
+                continue   # esito tardivo di un segmento già chiuso
+            setattr(fetch, kind, outcome)
+            if fetch.complete:
+                yield fetches.pop(key)
+    finally:
+        # Se il consumatore interrompe l'iterazione, non lasciamo richieste pendenti
+        poller.stop()
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
@@ -0,0 +1,144 @@
+# newZRL/services/wtrl_readiness.py
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Esiti di un singolo tentativo verso WTRL
+READY = "ready"        # 200 (o 304 servito dalla cache)
+PENDING = "pending"    # 202: WTRL sta ancora generando il JSON
+RETRY = "retry"        # errore di rete / timeout
+FAILED = "failed"      # qualsiasi altro codice HTTP
+
+
+class ReadinessPoller:
+    """
+    Scheduler degli endpoint WTRL in attesa.
+    Tiene l'insieme degli URL pendenti in un heap ordinato per prossima scadenza
+    e, sul proprio timer, sottomette all'executor tutti quelli scaduti insieme.
+    Un 202 o un errore di rete ripianifica l'URL con backoff esponenziale + jitter
+    indipendente per endpoint; l'esito finale viene passato a `on_done(tag, (ok, response))`.
+    Nessun thread resta bloccato in sleep in attesa che WTRL sia pronto.
+    Ogni endpoint riceve sempre un esito: se `on_done` solleva, o se il poller si
+    ferma con endpoint ancora in coda, questi vengono chiusi con (False, None).
+    """
+
+    def __init__(self, executor, attempt, on_done, max_attempts=14,
+                 initial_delay=1.2, max_delay=8.0):
+        self.executor = executor
+        self.attempt = attempt          # attempt(url) -> (status, response)
+        self.on_done = on_done
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="wtrl-readiness", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._fail_pending()
+
+    def _fail_pending(self, entries=()):
+        """Chiude con (False, None) gli endpoint ancora in coda (e `entries` già estratti)."""
+        with self._cond:
+            entries = list(entries) + [item[2] for item in self._heap]
+            self._heap.clear()
+        for entry in entries:
+            self._finish(entry, (False, None))
+
+    def _finish(self, entry, outcome):
+        """Consegna l'esito finale; se on_done solleva, riprova una volta con un esito FAILED."""
+        try:
+            self.on_done(entry["tag"], outcome)
+            return
+        except Exception as e:
+            logger.error(f"[ReadinessPoller] on_done per {entry['url']} fallito: {e}", exc_info=True)
+        if outcome[0]:
+            try:
+                self.on_done(entry["tag"], (False, None))
+            except Exception as e:
+                logger.error(f"[ReadinessPoller] Esito FAILED per {entry['url']} non consegnato: {e}")
+
+    def add(self, url, tag):
+        """Aggiunge un endpoint da interrogare subito."""
+        entry = {"url": url, "tag": tag, "attempts": 0, "delay": self.initial_delay}
+        if not self._schedule(0.0, entry):
+            self._finish(entry, (False, None))
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _schedule(self, wait, entry):
+        """Mette in coda l'endpoint; False se il poller è già fermo."""
+        with self._cond:
+            if self._stopped:
+                return False
+            heapq.heappush(self._heap, (time.monotonic() + wait, next(self._counter), entry))
+            self._cond.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+            for index, entry in enumerate(due):
+                try:
+                    self.executor.submit(self._poll, entry)
+                except RuntimeError:
+                    # Executor già chiuso: nessun endpoint deve restare senza esito
+                    logger.warning("[ReadinessPoller] Executor chiuso, endpoint in attesa segnati come falliti")
+                    self._fail_pending(due[index:])
+                    return
+
+    def _poll(self, entry):
+        entry["attempts"] += 1
+        try:
+            status, response = self.attempt(entry["url"])
+        except Exception as e:
+            logger.error(f"[ReadinessPoller] {entry['url']} attempt {entry['attempts']} failed: {e}")
+            status, response = RETRY, None
+
+        if status == READY:
+            self._finish(entry, (True, response))
+            return
+        if status == FAILED:
+            self._finish(entry, (False, response))
+            return
+
+        if entry["attempts"] >= self.max_attempts:
+            logger.warning(f"[ReadinessPoller] {entry['url']} non pronto dopo {entry['attempts']} tentativi")
+            self._finish(entry, (False, response))
+            return
+
+        wait = min(self.max_delay, entry["delay"]) + random.uniform(0, 0.5)
+        entry["delay"] = min(self.max_delay, entry["delay"] * 1.8)
+        if status == PENDING:
+            logger.info(f"[ReadinessPoller] {entry['url']} attempt {entry['attempts']} got 202 (not ready). Next poll in {wait:.1f}s")
+        if not self._schedule(wait, entry):
+            self._finish(entry, (False, response))
@@ -0,0 +1,158 @@
+# newZRL/services/wtrl_structure.py
+"""
+Sync idempotente della struttura WTRL (competition -> league -> division -> race)
+da wtrl_full.json o da una risposta API con lo stesso formato
+({"payload": {"competition": [...]}}).
+
+L'albero viene confrontato in memoria con le tabelle WTRL*: si scrivono solo
+insert, update e delete, in bulk. Gli id delle nuove division li assegna il
+database (sequence / autoincrement): dopo l'insert in bulk vengono riletti per
+chiave naturale (league_id, code), con una query per blocco di league.
+Rieseguire il sync sullo stesso file non scrive nulla.
+"""
+
+import os
+
+from newZRL import db
+from newZRL.models.wtrl import WTRLCompetition, WTRLDivision, WTRLLeague, WTRLRace
+from newZRL.services.bulk_upsert import chunked
+from newZRL.services.json_stream import iter_items
+
+STRUCTURE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "wtrl_full.json")
+
+
+def iter_competitions(source=STRUCTURE_FILE):
+    """Competition della struttura, da un path (lette una alla volta) o da un payload già decodificato."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter_items(f, ("payload", "competition"))
+        return
+    payload = source.get("payload", source) if isinstance(source, dict) else source
+    yield from (payload.get("competition", []) if isinstance(payload, dict) else payload)
+
+
+def parse_structure(competitions):
+    """
+    Albero WTRL come dict piatti per chiave naturale:
+    competitions id -> row, leagues id -> row, divisions (league_id, code) -> row,
+    races (league_id, code, race_number) -> row.
+    Lo stesso id di league compare sotto più competition (la tabella ha l'id come
+    chiave primaria): league, division e race vengono uniti e la league resta
+    assegnata alla prima competition in cui compare.
+    """
+    tree = {"competitions": {}, "leagues": {}, "divisions": {}, "races": {}}
+    for comp in competitions:
+        comp_id = str(comp["value"])
+        tree["competitions"][comp_id] = {"id": comp_id, "name": comp["text"]}
+        for league in comp.get("leagues", []):
+            league_id = int(league["value"])
+            tree["leagues"].setdefault(league_id, {"id": league_id, "competition_id": comp_id, "name": league["text"]})
+            for division in league.get("divisions", []):
+                code = str(division["value"])
+                tree["divisions"][(league_id, code)] = {"league_id": league_id, "code": code}
+                for race in division.get("races", []):
+                    number = int(race["value"])
+                    tree["races"].setdefault((league_id, code, number), {
+                        "race_number": number, "name": race.get("text"), "format": race.get("format"),
+                    })
+    return tree
+
+
+def _load_existing():
+    """Stato attuale delle tabelle WTRL*, con una query per tabella."""
+    c, l, d, r = (m.__table__ for m in (WTRLCompetition, WTRLLeague, WTRLDivision, WTRLRace))
+    competitions = {row.id: dict(row._mapping) for row in db.session.execute(db.select(c.c.id, c.c.name))}
+    leagues = {row.id: dict(row._mapping) for row in db.session.execute(db.select(l.c.id, l.c.competition_id, l.c.name))}
+    divisions = {(row.league_id, row.code): row.id for row in db.session.execute(db.select(d.c.id, d.c.league_id, d.c.code))}
+    races = {
+        (row.division_id, row.race_number): dict(row._mapping)
+        for row in db.session.execute(db.select(r.c.id, r.c.division_id, r.c.race_number, r.c.name, r.c.format))
+    }
+    return competitions, leagues, divisions, races
+
+
+def _diff(desired, existing, columns):
+    """(insert, update, delete) tra righe desiderate ed esistenti, per chiave."""
+    inserts = [row for key, row in desired.items() if key not in existing]
+    updates = [
+        {**row, "id": existing[key]["id"]} for key, row in desired.items()
+        if key in existing and any(existing[key].get(col) != row.get(col) for col in columns)
+    ]
+    deletes = [existing[key]["id"] for key in existing if key not in desired]
+    return inserts, updates, deletes
+
+
+def _division_ids(league_ids):
+    """(league_id, code) -> id delle division delle league indicate; con doppioni vince l'id più basso."""
+    d = WTRLDivision.__table__
+    ids = {}
+    for batch in chunked(league_ids):
+        rows = db.session.execute(
+            db.select(d.c.id, d.c.league_id, d.c.code).where(d.c.league_id.in_(batch)).order_by(d.c.id.desc())
+        )
+        ids.update({(row.league_id, row.code): row.id for row in rows})
+    return ids
+
+
+def _delete(model, ids):
+    for batch in chunked(ids):
+        db.session.execute(db.delete(model.__table__).where(model.__table__.c.id.in_(batch)))
+
+
+def sync_wtrl_structure(source=STRUCTURE_FILE, prune=True):
+    """
+    Allinea le tabelle WTRL* alla struttura di `source` (path o payload API).
+    Con `prune` gli elementi non più presenti vengono eliminati (figli prima dei padri);
+    senza, il sync si limita a insert e update (utile per un payload parziale).
+    Ritorna un dict tabella -> {insert, update, delete}.
+    """
+    tree = parse_structure(iter_competitions(source))
+    competitions, leagues, divisions, races = _load_existing()
+
+    comp_changes = _diff(tree["competitions"], competitions, ("name",))
+    league_changes = _diff(tree["leagues"], leagues, ("competition_id", "name"))
+
+    division_inserts = [row for key, row in tree["divisions"].items() if key not in divisions]
+    division_deletes = [division_id for key, division_id in divisions.items() if key not in tree["divisions"]]
+
+    # Scritture: padri prima dei figli per insert / update, figli prima dei padri per delete
+    for model, (inserts, updates, _) in ((WTRLCompetition, comp_changes), (WTRLLeague, league_changes)):
+        if inserts:
+            db.session.execute(db.insert(model), inserts)
+        if updates:
+            db.session.execute(db.update(model), updates)
+    division_ids = dict(divisions)
+    if division_inserts:
+        # Id dal database: niente collisioni con altri sync concorrenti
+        db.session.execute(db.insert(WTRLDivision), division_inserts)
+        inserted = _division_ids({row["league_id"] for row in division_inserts})
+        division_ids.update({key: inserted[key] for key in tree["divisions"] if key not in divisions})
+
+    desired_races = {
+        (division_ids[(league_id, code)], number): {"division_id": division_ids[(league_id, code)], **row}
+        for (league_id, code, number), row in tree["races"].items()
+    }
+    race_changes = _diff(desired_races, races, ("name", "format"))
+    inserts, updates, _ = race_changes
+    if inserts:
+        db.session.execute(db.insert(WTRLRace), inserts)
+    if updates:
+        db.session.execute(db.update(WTRLRace), updates)
+
+    if prune:
+        # Le race delle division eliminate sono già fuori da desired_races
+        _delete(WTRLRace, race_changes[2])
+        _delete(WTRLDivision, division_deletes)
+        _delete(WTRLLeague, league_changes[2])
+        _delete(WTRLCompetition, comp_changes[2])
+    db.session.commit()
+
+    def counts(changes):
+        return {"insert": len(changes[0]), "update": len(changes[1]), "delete": len(changes[2]) if prune else 0}
+
+    return {
+        "competitions": counts(comp_changes),
+        "leagues": counts(league_changes),
+        "divisions": counts((division_inserts, [], division_deletes)),
+        "races": counts(race_changes),
+    }
@@ -0,0 +1,130 @@
+# newZRL/services/zwiftpower_parser.py
+"""
+Parser delle pagine HTML ZwiftPower (team e profilo), senza Selenium né BeautifulSoup.
+
+Le pagine vengono lette con lxml (parser C); espressioni XPath e regex sono
+compilate una volta sola a livello di modulo. Il profilo viene scorso in un
+solo passaggio: le coppie etichetta / valore delle tabelle finiscono in un dict
+e i campi si cercano lì, invece di una ricerca sull'albero per ogni campo.
+"""
+
+import re
+
+from lxml import etree, html
+
+ZWIFT_ID_RE = re.compile(r"[?&](?:z|user|m)=(\d+)")
+# Migliaia con la virgola ("1,204") oppure decimale con punto o virgola ("71,5")
+NUMBER_RE = re.compile(r"(\d{1,3}(?:,\d{3})+(?:\.\d+)?)|\d+(?:[.,]\d+)?")
+WKG_RE = re.compile(r"([\d.]+)\s*wkg", re.IGNORECASE)
+WATT_RE = re.compile(r"([\d.]+)\s*watt", re.IGNORECASE)
+
+TEAM_ROWS = etree.XPath("//table[@id='team_riders']/tbody/tr")
+ROW_CELLS = etree.XPath("./td")
+FIRST_LINK = etree.XPath(".//a[@href][1]/@href")
+TABLE_ROWS = etree.XPath("//tr[td]")
+POWER_BLOCKS = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' profile_power_block ')]")
+
+# Campo del profilo -> etichetta della tabella (confronto case-insensitive sull'inizio della cella)
+PROFILE_LABELS = {
+    "race_ranking": "race ranking",
+    "category": "category",
+    "zwift_racing_score": "zwift racing score",
+    "zpoints": "zpoints",
+    "country": "country",
+    "team": "team",
+    "zftp": "zftp",
+    "weight": "weight",
+    "age": "age",
+}
+NUMERIC_FIELDS = ("race_ranking", "zwift_racing_score", "zpoints", "zftp", "weight")
+POWER_DURATIONS = ("15sec", "1min", "5min", "20min")
+
+
+def _text(element):
+    return " ".join(element.text_content().split()) if element is not None else ""
+
+
+def parse_number(value):
+    """
+    Primo numero del testo arrotondato a 1 decimale; None se assente.
+    Virgola come separatore delle migliaia ("1,204") o come decimale ("71,5").
+    """
+    if not value:
+        return None
+    match = NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = match.group().replace(",", "") if match.group(1) else match.group().replace(",", ".")
+    return round(float(number), 1)
+
+
+def zwift_id_from_url(url):
+    match = ZWIFT_ID_RE.search(url or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_team_page(page):
+    """
+    Rider della tabella team_riders di team.php (HTML come str o bytes):
+    lista di dict con zwift_power_id, nome, categoria, ranking e potenze 20min / 15sec.
+    """
+    riders = []
+    for row in TEAM_ROWS(html.fromstring(page)):
+        cols = ROW_CELLS(row)
+        if len(cols) < 7:
+            continue
+        links = FIRST_LINK(cols[2])
+        profile_url = links[0] if links else ""
+        zwift_id = zwift_id_from_url(profile_url)
+        if not zwift_id:
+            continue
+        riders.append({
+            "zwift_power_id": zwift_id,
+            "name": _text(cols[2]),
+            "category": _text(cols[0]),
+            "ranking": parse_number(_text(cols[1])),
+            "wkg_20min": parse_number(_text(cols[3])),
+            "watt_20min": parse_number(_text(cols[4])),
+            "wkg_15sec": parse_number(_text(cols[5])),
+            "watt_15sec": parse_number(_text(cols[6])),
+            "profile_url": profile_url,
+        })
+    return riders
+
+
+def parse_profile_page(page):
+    """Dati di profile.php (HTML come str o bytes): campi della tabella profilo e blocchi di potenza."""
+    tree = html.fromstring(page)
+
+    # Un solo passaggio sulle righe: etichetta (minuscolo) -> valore, vince la prima occorrenza
+    cells = {}
+    for row in TABLE_ROWS(tree):
+        tds = ROW_CELLS(row)
+        if len(tds) >= 2:
+            cells.setdefault(_text(tds[0]).lower(), _text(tds[1]))
+
+    def lookup(label):
+        for key, value in cells.items():
+            if key.startswith(label):
+                return value or None
+        return None
+
+    profile = {field: lookup(label) for field, label in PROFILE_LABELS.items()}
+    profile["race_ranking_pos"] = profile["race_ranking"]
+    profile["zpoints_pos"] = profile["zpoints"]
+    for field in NUMERIC_FIELDS:
+        profile[field] = parse_number(profile[field])
+
+    wkg, watts = [], []
+    for block in POWER_BLOCKS(tree):
+        text = _text(block)
+        wkg_match, watt_match = WKG_RE.search(text), WATT_RE.search(text)
+        if wkg_match:
+            wkg.append(float(wkg_match.group(1)))
+        if watt_match:
+            watts.append(int(float(watt_match.group(1))))
+    if len(wkg) == len(POWER_DURATIONS):
+        profile.update({f"wkg_{d}": value for d, value in zip(POWER_DURATIONS, wkg)})
+    if len(watts) == len(POWER_DURATIONS):
+        profile.update({f"watt_{d}": value for d, value in zip(POWER_DURATIONS, watts)})
+    return profile
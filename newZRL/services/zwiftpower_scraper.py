@@ -0,0 +1,146 @@
+# newZRL/services/zwiftpower_scraper.py
+"""
+Scraping headless dei profili ZwiftPower di un club, senza browser.
+
+I membri arrivano dall'API team_riders (scrape_team); le pagine profile.php
+vengono scaricate in parallelo su una sessione HTTP keep-alive condivisa, con un
+token bucket che limita le richieste al secondo, e lette con zwiftpower_parser
+(lxml). Il risultato va direttamente sulla tabella riders (sync_members) e in un
+CSV in exports/, con le stesse colonne dell'export Selenium.
+"""
+
+import csv
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import requests
+from flask import current_app
+
+from newZRL.services.job_progress import as_tracker
+from newZRL.services.wtrl_fetch import TokenBucket, make_session
+from newZRL.services.zwiftpower_parser import parse_profile_page
+from newZRL.services.zwiftpower_sync import DEFAULT_TEAM_ID, sync_members
+
+logger = logging.getLogger(__name__)
+
+PROFILE_URL = "https://zwiftpower.com/profile.php?z={zwift_id}"
+EXPORT_DIR = "exports"
+FETCH_WORKERS = 8
+REQUESTS_PER_SECOND = 8.0
+REQUEST_TIMEOUT = 20
+
+
+def fetch_profile(session, zwift_id, limiter=None, headers=None):
+    """Scarica e analizza un profilo: (zwift_id, dati, errore)."""
+    if limiter:
+        limiter.acquire()
+    try:
+        response = session.get(PROFILE_URL.format(zwift_id=zwift_id), headers=headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        # lxml lavora direttamente sui byte (niente decodifica in str)
+        return zwift_id, parse_profile_page(response.content), None
+    except (requests.RequestException, ValueError) as e:
+        return zwift_id, None, f"{type(e).__name__}: {e}"
+
+
+def fetch_profiles(zwift_ids, headers=None, workers=FETCH_WORKERS, rate=REQUESTS_PER_SECOND, progress=None):
+    """
+    Profili di `zwift_ids` scaricati da `workers` thread su una sessione condivisa,
+    al massimo `rate` richieste al secondo. Ritorna (zwift_id -> dati, errori).
+    """
+    progress = as_tracker(progress)
+    profiles, errors = {}, []
+    if not zwift_ids:
+        return profiles, errors
+    limiter = TokenBucket(rate)
+    workers = max(1, min(workers, len(zwift_ids)))
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_profile, session, zwift_id, limiter, headers) for zwift_id in zwift_ids]
+        for future in as_completed(futures):
+            zwift_id, profile, error = future.result()
+            if error:
+                logger.warning(f"[zwiftpower] Profilo {zwift_id} non letto: {error}")
+                errors.append(f"{zwift_id}: {error}")
+                progress.error()
+            else:
+                profiles[zwift_id] = profile
+            progress.advance()
+    return profiles, errors
+
+
+def merge_profile(member, profile):
+    """
+    Membro dell'API arricchito con i dati del profilo. zFTP, peso e ranking del
+    profilo (più aggiornati) prevalgono su quelli della lista del team.
+    """
+    rider = {**member, **(profile or {})}
+    if profile:
+        rider["ftp"] = profile.get("zftp") or member.get("ftp")
+        rider["weight"] = profile.get("weight") or member.get("weight")
+        rider["zp_rank"] = member.get("zp_rank") or profile.get("race_ranking")
+        rider["country"] = member.get("country") or profile.get("country")
+    return rider
+
+
+def write_csv(riders, export_dir=EXPORT_DIR, now=None):
+    """Salva i rider in exports/zwift_team_export_<timestamp>.csv; ritorna il path."""
+    os.makedirs(export_dir, exist_ok=True)
+    timestamp = (now or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(export_dir, f"zwift_team_export_{timestamp}.csv")
+    # Colonne: unione delle chiavi nell'ordine di comparsa (non tutti i profili hanno i blocchi potenza)
+    fieldnames = list(dict.fromkeys(key for rider in riders for key in rider))
+    with open(filename, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(riders)
+    return filename
+
+
+def scrape_club(team_id=None, members=None, workers=None, rate=None, export_dir=EXPORT_DIR,
+                write_db=True, report=None):
+    """
+    Scraping completo del club `team_id` (default ZWIFTPOWER_TEAM_ID): lista membri,
+    profili in parallelo, sync sulla tabella riders e CSV (export_dir=None per non
+    scriverlo). Ritorna un dict con conteggi, errori, path del CSV e profili/s.
+    """
+    from newZRL.scripts.zwiftpower_importer import HEADERS, scrape_team
+
+    config = current_app.config
+    team_id = int(team_id or config.get("ZWIFTPOWER_TEAM_ID", DEFAULT_TEAM_ID))
+    workers = workers or config.get("ZWIFTPOWER_FETCH_WORKERS", FETCH_WORKERS)
+    rate = rate or config.get("ZWIFTPOWER_REQUESTS_PER_SECOND", REQUESTS_PER_SECOND)
+    progress = as_tracker(report)
+
+    progress(0, "Lista membri ZwiftPower...")
+    with progress.phase("members"):
+        members = members if members is not None else scrape_team(team_id)
+    if not members:
+        raise ValueError("Nessun corridore trovato o errore durante lo scraping.")
+
+    zwift_ids = list(dict.fromkeys(m["zwift_power_id"] for m in members if m.get("zwift_power_id")))
+    progress.start(len(zwift_ids), f"Scraping di {len(zwift_ids)} profili...")
+    started = time.perf_counter()
+    with progress.phase("fetch"):
+        profiles, errors = fetch_profiles(zwift_ids, HEADERS, workers, rate, progress)
+    seconds = time.perf_counter() - started
+
+    riders = [merge_profile(m, profiles.get(m.get("zwift_power_id"))) for m in members]
+    summary = {
+        "team_id": team_id,
+        "members": len(members),
+        "profiles": len(profiles),
+        "errors": errors,
+        "fetch_seconds": round(seconds, 3),
+        "profiles_per_second": round(len(profiles) / seconds, 1) if seconds else None,
+        "csv": None,
+    }
+    with progress.phase("write"):
+        if write_db:
+            summary.update(sync_members(riders, team_id))
+        if export_dir:
+            summary["csv"] = write_csv(riders, export_dir)
+    progress(100, f"✅ {len(profiles)} profili letti in {summary['fetch_seconds']}s, {len(errors)} errori.")
+    return summary
@@ -0,0 +1,128 @@
+# newZRL/services/zwiftpower_sync.py
+"""
+Sync bulk dei membri di un club ZwiftPower sulla tabella riders.
+
+I rider del club (e quelli già noti con gli stessi profile_id) vengono
+precaricati con una query; ogni membro viene confrontato campo per campo e si
+scrivono a blocchi solo insert e update. I rider del club che non compaiono più
+nel feed vengono marcati is_active = False con un solo UPDATE.
+"""
+
+from datetime import datetime
+
+from newZRL import db
+from newZRL.models.rider import Rider
+from newZRL.services.bulk_upsert import changed, chunked
+
+DEFAULT_TEAM_ID = 16461  # INOX
+# Colonne confrontate e scritte dal sync (oltre a profile_id)
+SYNC_COLUMNS = ("name", "category", "country", "weight", "ftp", "races", "zp_rank", "zp_team_id", "is_active")
+# Categoria ZwiftPower (campo div / divw) -> lettera
+ZP_CATEGORIES = {5: "A+", 10: "A", 20: "B", 30: "C", 40: "D", 50: "E"}
+
+
+def zp_value(value):
+    """I valori ZwiftPower arrivano spesso come [valore, flag]: ritorna il solo valore ("" -> None)."""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return None if value == "" else value
+
+
+def _number(value, cast):
+    value = zp_value(value)
+    try:
+        return cast(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _category_letter(value):
+    """Categoria già in lettere (es. dalla pagina profilo), solo se valida."""
+    value = (zp_value(value) or "").strip().upper()
+    return value if value in ZP_CATEGORIES.values() else None
+
+
+def member_row(member, team_id):
+    """Riga riders da un membro di scrape_team(); None se manca lo zwid."""
+    profile_id = _number(member.get("zwift_power_id"), int)
+    if not profile_id:
+        return None
+    division = _number(member.get("ce_category"), int) or _number(member.get("ce_category_women"), int)
+    return {
+        "profile_id": profile_id,
+        "name": zp_value(member.get("name")) or f"Rider {profile_id}",
+        "category": ZP_CATEGORIES.get(division) or _category_letter(member.get("category")),
+        "country": zp_value(member.get("country")),
+        "weight": _number(member.get("weight"), float),
+        "ftp": _number(member.get("ftp"), int),
+        "races": _number(member.get("races"), int),
+        "zp_rank": _number(member.get("zp_rank"), float),
+        "zp_team_id": team_id,
+        "is_active": True,
+    }
+
+
+def _preload(team_id, profile_ids):
+    """Rider del club più quelli con i profile_id del feed: profile_id -> riga."""
+    t = Rider.__table__
+    columns = (t.c.id, t.c.profile_id) + tuple(t.c[c] for c in SYNC_COLUMNS)
+    existing = {
+        row.profile_id: dict(row._mapping)
+        for row in db.session.execute(db.select(*columns).where(t.c.zp_team_id == team_id))
+    }
+    missing = [pid for pid in profile_ids if pid not in existing]
+    for batch in chunked(missing):
+        existing.update(
+            (row.profile_id, dict(row._mapping))
+            for row in db.session.execute(db.select(*columns).where(t.c.profile_id.in_(batch)))
+        )
+    return existing
+
+
+def sync_members(members, team_id=DEFAULT_TEAM_ID, now=None):
+    """
+    Allinea i rider del club `team_id` ai membri scaricati (lista di dict di scrape_team).
+    Ritorna un dict con new / updated / unchanged / deactivated / skipped.
+    """
+    now = now or datetime.utcnow()
+    rows = {}
+    skipped = 0
+    for member in members:
+        row = member_row(member, team_id)
+        if row is None:
+            skipped += 1
+            continue
+        rows[row["profile_id"]] = row  # un membro ripetuto vale una volta sola
+
+    existing = _preload(team_id, list(rows))
+    inserts, updates = [], []
+    for profile_id, row in rows.items():
+        known = existing.get(profile_id)
+        if known is None:
+            inserts.append({**row, "zp_synced_at": now})
+        elif changed(known, row, SYNC_COLUMNS):
+            updates.append({"id": known["id"], **row, "zp_synced_at": now})
+
+    deactivated = [
+        known["id"] for profile_id, known in existing.items()
+        if profile_id not in rows and known["zp_team_id"] == team_id and known["is_active"]
+    ]
+
+    for batch in chunked(inserts):
+        db.session.execute(db.insert(Rider), batch)
+    for batch in chunked(updates):
+        db.session.execute(db.update(Rider), batch)
+    if deactivated:
+        t = Rider.__table__
+        db.session.execute(
+            db.update(t).where(t.c.id.in_(deactivated)).values(is_active=False, zp_synced_at=now)
+        )
+    db.session.commit()
+
+    return {
+        "new": len(inserts),
+        "updated": len(updates),
+        "unchanged": len(rows) - len(inserts) - len(updates),
+        "deactivated": len(deactivated),
+        "skipped": skipped,
+    }
@@ -1,20 +1,19 @@
 # newZRL/utils/race_utils.py
 
-from datetime import date
 from newZRL import db
-from newZRL.models.race import Race
 from newZRL.models.race_lineup import RaceLineup
+from newZRL.models.team import Team
+from newZRL.services.race_calendar import get_race_calendar
 
 # ================================
-# Restituisce la prossima gara disponibile (>= oggi)
+# Restituisce la prossima gara disponibile (>= oggi), della categoria del team se indicato
 # ================================
 def get_next_race_date(team_id=None):
-    today = date.today()
-    race = db.session.query(Race)\
-        .filter(Race.race_date >= today)\
-        .order_by(Race.race_date.asc())\
-        .first()
-    return race.race_date if race else None
+    calendar = get_race_calendar()
+    team = db.session.get(Team, team_id) if team_id is not None else None
+    if team is None:
+        return calendar.next_race_date()
+    return calendar.next_race_date_for_team(team)
 
 # ================================
 # Controlla se un team ha già selezionato una formazione in una data specifica
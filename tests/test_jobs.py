@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g
+from newZRL import db
+from newZRL.models.import_job import ImportJob
+from newZRL.models.user import User
+from newZRL.services import jobs
+from newZRL.services.job_events import Subscription, diff
+from newZRL.services.job_progress import ProgressTracker
+from newZRL.services.jobs import JOB_HANDLERS, active_job, claim_next, enqueue, run_job
+
+
+@pytest.fixture
+def fake_handler():
+    calls = []
+
+    def handler(report, value, fail=False):
+        calls.append(value)
+        report(50, "A metà")
+        if fail:
+            raise RuntimeError("boom")
+        return {"value": value, "message": "fatto"}
+
+    JOB_HANDLERS["fake"] = handler
+    yield calls
+    JOB_HANDLERS.pop("fake", None)
+
+
+@pytest.fixture
+def admin_client(app, client):
+    db.session.add(User(profile_id=1, email="admin@test.com", password="x", role="admin"))
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = "1"
+        sess["_fresh"] = True
+    return client
+
+
+def test_enqueue_rejects_unknown_type(app):
+    with pytest.raises(ValueError):
+        enqueue("does-not-exist")
+
+
+def test_claim_and_run_job(app, fake_handler):
+    job = enqueue("fake", value=7)
+    assert active_job("fake").id == job.id
+
+    claimed = claim_next("worker-1")
+    assert claimed.id == job.id
+    assert claimed.status == "running"
+    assert claimed.attempts == 1
+    # Nessun altro job in coda
+    assert claim_next("worker-2") is None
+
+    assert run_job(claimed) is True
+    db.session.expire_all()
+    job = db.session.get(ImportJob, job.id)
+    assert fake_handler == [7]
+    assert job.status == "done"
+    assert job.progress == 100
+    assert job.result["value"] == 7
+    assert job.message == "fatto"
+    assert active_job("fake") is None
+
+
+def test_failed_job_records_error(app, fake_handler):
+    job = enqueue("fake", value=1, fail=True)
+    assert run_job(claim_next("worker-1")) is False
+    db.session.expire_all()
+    job = db.session.get(ImportJob, job.id)
+    assert job.status == "failed"
+    assert "boom" in job.error
+
+
+def test_stale_running_job_is_requeued(app, fake_handler):
+    job = enqueue("fake", value=3)
+    claim_next("worker-dead")
+    db.session.execute(
+        db.update(ImportJob).where(ImportJob.id == job.id)
+        .values(heartbeat_at=datetime.utcnow() - jobs.STALE_AFTER - timedelta(minutes=1))
+    )
+    db.session.commit()
+
+    claimed = claim_next("worker-2")
+    assert claimed.id == job.id
+    assert claimed.worker_id == "worker-2"
+    assert claimed.attempts == 2
+
+
+def test_stale_job_with_exhausted_attempts_fails(app, fake_handler):
+    job = enqueue("fake", value=3)
+    claim_next("worker-dead")
+    db.session.execute(
+        db.update(ImportJob).where(ImportJob.id == job.id)
+        .values(attempts=jobs.MAX_ATTEMPTS, heartbeat_at=datetime.utcnow() - jobs.STALE_AFTER - timedelta(minutes=1))
+    )
+    db.session.commit()
+
+    assert claim_next("worker-2") is None
+    db.session.expire_all()
+    assert db.session.get(ImportJob, job.id).status == "failed"
+
+
+def test_heartbeat_runs_without_progress(app, monkeypatch):
+    import time
+
+    beats = []
+    update_job = jobs.update_job
+    monkeypatch.setattr(jobs, "update_job", lambda job_id, **values: beats.append(values) or update_job(job_id, **values))
+    JOB_HANDLERS["silent"] = lambda report: time.sleep(0.3)
+    app.config["JOB_HEARTBEAT_INTERVAL"] = 0.05
+    try:
+        enqueue("silent")
+        assert run_job(claim_next("worker-1"))
+    finally:
+        JOB_HANDLERS.pop("silent", None)
+    # Heartbeat puri (solo engine, nessun altro campo) scritti mentre l'handler non riportava nulla
+    assert sum(1 for values in beats if set(values) == {"engine"}) >= 3
+
+
+def test_status_endpoint_reads_job(app, admin_client, fake_handler):
+    job = enqueue("fake", value=2)
+    data = admin_client.get(f"/admin/wtrl_import/status?job_id={job.id}").get_json()
+    assert data["status"] == "queued"
+    assert data["is_running"] is True
+
+
+def test_import_status_routes_require_login_and_hide_traceback(app, admin_client, fake_handler):
+    job = enqueue("fake", value=1, fail=True)
+    run_job(claim_next("worker-1"))
+    anonymous = app.test_client()
+    for route in ("status", "events", "progress"):
+        assert anonymous.get(f"/admin/wtrl_import/{route}?job_id={job.id}").status_code == 302
+
+    # Le richieste di test condividono l'app context della fixture: Flask-Login tiene l'utente in g
+    g.pop("_login_user", None)
+    db.session.expire_all()
+    data = admin_client.get(f"/admin/wtrl_import/status?job_id={job.id}").get_json()
+    assert data["status"] == "failed" and "error" not in data
+
+
+def test_local_import_route_enqueues_job(app, admin_client):
+    response = admin_client.get("/admin/imports/wtrl_local")
+
+    job = ImportJob.query.one()
+    assert (job.job_type, job.status) == ("load-teams", "queued")
+    assert response.status_code == 302 and f"job_id={job.id}" in response.headers["Location"]
+
+
+def test_progress_tracker_throttles_writes():
+    now = [0.0]
+    writes = []
+    tracker = ProgressTracker(sink=writes.append, min_interval=1.0, clock=lambda: now[0])
+    tracker.start(100)
+    for _ in range(50):
+        tracker.advance()
+        with tracker.phase("write"):
+            now[0] += 0.01
+    # 50 advance in mezzo secondo: una sola scrittura (la prima)
+    assert len(writes) == 1
+
+    now[0] += 1.0
+    tracker.advance()
+    tracker.error()
+    tracker.flush()
+    last = writes[-1]
+    assert last["items_done"] == 51 and last["items_total"] == 100 and last["progress"] == 51
+    assert last["error_count"] == 1
+    assert last["items_per_second"] > 0 and last["eta_seconds"] > 0
+    assert last["phase_timings"]["write"] == pytest.approx(0.5)
+
+
+def test_job_progress_is_stored_on_the_job(app):
+    def handler(report, items):
+        report.start(items)
+        for _ in range(items):
+            with report.phase("fetch"):
+                report.advance()
+        report.error()
+        return {"message": "ok"}
+
+    JOB_HANDLERS["counted"] = handler
+    try:
+        job = enqueue("counted", items=20)
+        assert run_job(claim_next("worker-1")) is True
+    finally:
+        JOB_HANDLERS.pop("counted", None)
+
+    db.session.expire_all()
+    data = db.session.get(ImportJob, job.id).to_dict()
+    assert data["items_done"] == 20 and data["items_total"] == 20
+    assert data["error_count"] == 1
+    assert "fetch" in data["phase_timings"]
+    assert data["eta_seconds"] is None
+
+
+def test_subscription_coalesces_deltas():
+    sub = Subscription(1)
+    sub.publish(diff({"progress": 10, "message": "a"}, {"progress": 20, "message": "a"}))
+    sub.publish({"progress": 30, "message": "b"})
+    assert sub.next_delta(timeout=0) == {"progress": 30, "message": "b"}
+    assert sub.next_delta(timeout=0) == {}
+
+
+def test_events_stream_for_finished_job(app, admin_client, fake_handler):
+    job = enqueue("fake", value=4)
+    run_job(claim_next("worker-1"))
+
+    resp = admin_client.get(f"/admin/wtrl_import/events?job_id={job.id}")
+    assert resp.mimetype == "text/event-stream"
+    body = resp.get_data(as_text=True)
+    assert "event: snapshot" in body and '"status": "done"' in body
+    assert body.rstrip().endswith("event: end\ndata: {}")
+
+
+def test_events_stream_hands_over_to_polling(app, admin_client, fake_handler):
+    job = enqueue("fake", value=4)
+    app.config["JOB_EVENTS_MAX_SECONDS"] = 0
+    body = admin_client.get(f"/admin/wtrl_import/events?job_id={job.id}").get_data(as_text=True)
+    assert body.rstrip().endswith("event: poll\ndata: {}")
+
+
+def test_enqueue_command_requires_season(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["jobs", "enqueue", "rankings"])
+    assert result.exit_code == 2 and "--season" in result.output
+    assert runner.invoke(args=["jobs", "enqueue", "rankings", "--season", "x"]).exit_code == 2
+    assert ImportJob.query.count() == 0
+
+
+def test_cli_rejects_unknown_job_and_keeps_offline_tools_apart(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["jobs", "enqueue", "does-not-exist"])
+    assert result.exit_code == 2 and "JOB_TYPE" in result.output
+
+    assert runner.invoke(args=["jobs", "load-teams"]).exit_code == 2
+    assert runner.invoke(args=["data", "load-teams", "--help"]).exit_code == 0
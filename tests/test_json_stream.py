@@ -0,0 +1,35 @@
+import io
+import json
+
+import pytest
+from newZRL.services.json_stream import iter_document, iter_items
+
+
+DOC = {
+    "meta": {"trc": 74016, "team": {"name": "Team INOX FIRE"}},
+    "permissions": {"edit": False},
+    "riders": [{"profileId": 1, "name": "Uno", "zftp": 3.17}, {"profileId": 22, "name": "Due €"}],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+def test_iter_document_streams_riders(chunk_size):
+    raw = json.dumps(DOC).encode("utf-8")
+    events = list(iter_document(io.BytesIO(raw), "riders", chunk_size=chunk_size))
+
+    assert events[0] == ("meta", DOC["meta"])
+    assert [value for key, value in events if key == "riders"] == DOC["riders"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+def test_iter_items_follows_path(chunk_size):
+    raw = json.dumps({"success": True, "payload": {"seasons": [1, 2], "competition": [{"value": 1}, 12.5e2]}})
+    items = list(iter_items(io.StringIO(raw), ("payload", "competition"), chunk_size=chunk_size))
+    assert items == [{"value": 1}, 1250.0]
+
+
+def test_iter_items_reports_missing_or_invalid_payload():
+    with pytest.raises(ValueError):
+        list(iter_items('{"success": false}', ("payload",)))
+    with pytest.raises(ValueError):
+        list(iter_items('{"payload": [{"id5": 1}, {"id5": ', ("payload",)))
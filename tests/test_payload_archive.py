@@ -0,0 +1,38 @@
+import json
+import os
+
+from newZRL.services.payload_archive import PayloadArchive
+
+
+def test_archive_dedupes_bodies_and_keeps_versions(tmp_path):
+    first = json.dumps({"payload": [1, 2, 3]}).encode()
+    second = json.dumps({"payload": [1, 2, 3, 4]}).encode()
+
+    with PayloadArchive(str(tmp_path)) as archive:
+        h1 = archive.put("results", "17/A/1", first)
+        assert archive.put("results", "17/A/1", first) == h1   # stesso contenuto: nessuna nuova versione
+        archive.put("league", "17/A/1", first)                 # stesso corpo su un altro endpoint
+        h2 = archive.put("results", "17/A/1", second)
+
+        versions = archive.versions("results", "17/A/1")
+        assert [v.hash for v in versions] == [h2, h1]
+        assert archive.latest("results", "17/A/1").hash == h2
+        assert archive.latest("results", "17/A/2") is None
+        assert archive.read(h1) == first
+        assert archive.keys("league") == ["17/A/1"]
+
+    # Un solo oggetto compresso per contenuto
+    objects = [f for _, _, files in os.walk(tmp_path / "objects") for f in files]
+    assert sorted(objects) == sorted([f"{h1}.json.gz", f"{h2}.json.gz"])
+
+
+def test_archive_streams_chunks(tmp_path):
+    body = json.dumps({"riders": list(range(1000))}).encode()
+    chunks = [body[i:i + 100] for i in range(0, len(body), 100)]
+
+    with PayloadArchive(str(tmp_path)) as archive:
+        digest = archive.put_stream("teams", "18/1", chunks)
+        assert archive.put("teams", "18/1", body) == digest
+        assert len(archive.versions("teams", "18/1")) == 1
+        with archive.open(digest) as f:
+            assert json.load(f)["riders"][-1] == 999
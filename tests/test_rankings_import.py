@@ -0,0 +1,327 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from newZRL import db
+from newZRL.models.team import Team
+from newZRL.models.wtrl_rider import WTRL_Rider
+from newZRL.models.race_results import RaceResultsTeam, RaceResultsRider, RoundStanding
+from newZRL.models.rankings_import_state import RankingsImportState
+from newZRL.services import rankings_import, wtrl_fetch
+from newZRL.services.http_cache import ResponseCache
+from newZRL.services.rankings_import import import_rankings
+from newZRL.services.wtrl_fetch import SegmentFetch, fetch_segments, fetch_wtrl_json
+from newZRL.services.wtrl_readiness import READY, PENDING, ReadinessPoller
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200, headers=None):
+        self._data = data
+        self.status_code = status_code
+        self.text = str(data)
+        self.content = json.dumps(data).encode("utf-8")
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+def results_payload():
+    return {"payload": [
+        {
+            "id5": 74016, "teamname": "Inox Alpha", "finp": 10, "pbp": 2, "lpoints": 12,
+            "falp": 0, "ftsp": 0, "p1": 3, "timeResult": "1:02:03",
+            "a": [
+                {"zid": 111, "name": "Rider Uno", "finrp": 5, "totrp": 5, "wkg": 3.5, "watts": 250},
+                {"zid": 222, "name": "Rider Due", "finrp": 4, "totrp": 4},
+            ],
+        },
+        {"id5": 74930, "teamname": "Inox Beta", "lpoints": 7, "p1": 5, "a": [{"zid": 333}]},
+    ]}
+
+
+def league_payload():
+    return {"payload": [{"d": "Inox Alpha", "n": 40}, {"d": "Inox Beta", "n": 21}]}
+
+
+def fake_fetcher(season, segments, **kwargs):
+    for race_number, class_id in segments:
+        fetch = SegmentFetch(race_number, class_id)
+        fetch.results = (True, FakeResponse(results_payload()))
+        fetch.league = (True, FakeResponse(league_payload()))
+        yield fetch
+
+
+def test_import_rankings_creates_results(app):
+    db.session.add(Team(trc=74016, name="Inox Alpha", competition_class="A", competition_season="17"))
+    db.session.commit()
+
+    summary = import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+
+    assert summary["errors"] == []
+    assert summary["team_results"] == 2
+    assert summary["rider_results"] == 3
+    assert RaceResultsTeam.query.count() == 2
+    assert RaceResultsRider.query.count() == 3
+    # placeholder per team e rider mancanti
+    assert db.session.get(Team, 74930) is not None
+    assert db.session.get(WTRL_Rider, "74930/333") is not None
+    standing = RoundStanding.query.filter_by(team_id=74016).one()
+    assert standing.total_points == 40
+
+
+def test_non_numeric_trc_costs_only_that_team(app):
+    db.session.add(Team(trc=74016, name="Inox Alpha", competition_class="A", competition_season="17"))
+    db.session.commit()
+
+    def bad_trc_fetcher(season, segments, **kwargs):
+        payload = results_payload()
+        payload["payload"][0]["id5"] = "INOX-A"        # trovato per nome
+        payload["payload"][1]["id5"] = "n/a"           # né TRC né nome noti
+        for race_number, class_id in segments:
+            fetch = SegmentFetch(race_number, class_id)
+            fetch.results = (True, FakeResponse(payload))
+            fetch.league = (True, FakeResponse(league_payload()))
+            yield fetch
+
+    summary = import_rankings(17, [1], ["A"], fetcher=bad_trc_fetcher)
+
+    assert summary["team_results"] == 1
+    assert [e for e in summary["errors"] if "TRC non valido" in e] and not [e for e in summary["errors"] if "Payload" in e]
+    assert RaceResultsTeam.query.one().team_id == 74016
+
+
+def test_import_rankings_closes_payload_archive(app, tmp_path, monkeypatch):
+    from newZRL.services.payload_archive import PayloadArchive
+
+    closed = []
+
+    class TrackedArchive(PayloadArchive):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    monkeypatch.setattr(rankings_import, "get_payload_archive", lambda app: TrackedArchive(str(tmp_path)))
+
+    import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+
+    assert closed == [True]
+
+
+def test_import_rankings_is_idempotent(app):
+    import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+    import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+
+    assert RaceResultsTeam.query.count() == 2
+    assert RaceResultsRider.query.count() == 3
+    assert RoundStanding.query.count() == 2
+
+
+def test_fetch_segments_pairs_results_and_league(monkeypatch):
+    calls = []
+
+    def fake_attempt(url, **kwargs):
+        calls.append(url)
+        return READY, FakeResponse({"payload": []})
+
+    monkeypatch.setattr(wtrl_fetch, "attempt_wtrl_json", fake_attempt)
+
+    segments = [(1, "A"), (1, "B"), (2, "A")]
+    fetched = list(fetch_segments("17", segments, max_workers=3, rate=100))
+
+    assert sorted((f.race_number, f.class_id) for f in fetched) == sorted(segments)
+    assert all(f.complete for f in fetched)
+    assert len(calls) == 6
+
+
+def test_fetch_segments_repolls_pending_endpoints(monkeypatch):
+    attempts = {}
+
+    def fake_attempt(url, **kwargs):
+        attempts[url] = attempts.get(url, 0) + 1
+        # Il segmento di classe B resta in 202 per due tentativi
+        if "/B/" in url and attempts[url] < 3:
+            return PENDING, FakeResponse(None, status_code=202)
+        return READY, FakeResponse({"payload": []})
+
+    monkeypatch.setattr(wtrl_fetch, "attempt_wtrl_json", fake_attempt)
+
+    fetched = list(fetch_segments("17", [(1, "A"), (1, "B")], max_workers=2, rate=100,
+                                  initial_delay=0.01, max_delay=0.02))
+
+    # Il segmento pronto arriva per primo, quello in 202 dopo i ripoll
+    assert [f.class_id for f in fetched] == ["A", "B"]
+    assert attempts[wtrl_fetch.results_url("17", "B", 1)] == 3
+    assert fetched[1].results[0] is True
+
+
+def test_fetch_segments_fails_pending_endpoints_after_timeout(monkeypatch):
+    monkeypatch.setattr(wtrl_fetch, "attempt_wtrl_json",
+                        lambda url, **kwargs: (PENDING, FakeResponse(None, status_code=202)))
+
+    fetched = list(fetch_segments("17", [(1, "A")], rate=100, initial_delay=5, max_delay=5, timeout=0.2))
+
+    assert len(fetched) == 1
+    assert fetched[0].results == (False, None) and fetched[0].league == (False, None)
+
+
+def test_poller_delivers_failure_when_callback_raises():
+    outcomes = []
+    finished = threading.Event()
+
+    def on_done(tag, outcome):
+        outcomes.append(outcome)
+        if outcome[0]:
+            raise RuntimeError("archivio non scrivibile")
+        finished.set()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        poller = ReadinessPoller(executor, lambda url: (READY, FakeResponse({})), on_done).start()
+        poller.add("https://example.invalid/a", "a")
+        assert finished.wait(2)
+        poller.stop()
+
+    assert [ok for ok, _ in outcomes] == [True, False]
+
+
+def test_import_rankings_updates_changed_rows(app):
+    import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+
+    def updated_fetcher(season, segments, **kwargs):
+        for fetch in fake_fetcher(season, segments):
+            data = results_payload()
+            data["payload"][0]["lpoints"] = 99
+            data["payload"][0]["a"][0]["watts"] = 300
+            fetch.results = (True, FakeResponse(data))
+            yield fetch
+
+    import_rankings(17, [1], ["A"], fetcher=updated_fetcher)
+
+    rrt = RaceResultsTeam.query.filter_by(team_id=74016).one()
+    assert rrt.totp == 99
+    assert RaceResultsRider.query.filter_by(rider_id="74016/111").one().watts == 300
+    assert RaceResultsTeam.query.count() == 2
+
+
+def test_fetch_wtrl_json_uses_conditional_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    sent_headers = []
+
+    class FakeSession:
+        def get(self, url, headers=None, **kwargs):
+            sent_headers.append(headers)
+            if headers.get("If-None-Match") == '"v1"':
+                return FakeResponse(None, status_code=304)
+            return FakeResponse(league_payload(), headers={"ETag": '"v1"'})
+
+    url = "https://example.test/league/17/A/1"
+    ok, first = fetch_wtrl_json(url, session=FakeSession(), cache=cache)
+    ok_again, second = fetch_wtrl_json(url, session=FakeSession(), cache=cache)
+
+    assert ok and ok_again
+    assert second.from_cache
+    assert second.json() == league_payload()
+    assert second.content_hash == first.content_hash
+    assert "If-None-Match" not in sent_headers[0]
+    assert sent_headers[1]["If-None-Match"] == '"v1"'
+
+
+def test_response_cache_restores_missing_body(app, tmp_path):
+    from newZRL.services.http_cache import get_response_cache
+
+    app.config.update(WTRL_HTTP_CACHE_ENABLED=True, WTRL_HTTP_CACHE_DIR=str(tmp_path))
+    cache = get_response_cache(app)
+    assert get_response_cache(app) is cache
+
+    url = "https://example.test/results/17/A/1"
+    cache.store(url, FakeResponse(league_payload()))
+    os.remove(cache._paths(url)[1])
+    cache.store(url, FakeResponse(league_payload()))
+
+    assert cache.cached_response(url).json() == league_payload()
+
+
+def test_import_rankings_skips_unchanged_segments(app, tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    monkeypatch.setattr(rankings_import, "get_response_cache", lambda app: cache)
+
+    def caching_fetcher(season, segments, cache=None, **kwargs):
+        for fetch in fake_fetcher(season, segments):
+            urls = (wtrl_fetch.results_url(season, fetch.class_id, fetch.race_number),
+                    wtrl_fetch.league_url(season, fetch.class_id, fetch.race_number))
+            for url, (ok, response) in zip(urls, (fetch.results, fetch.league)):
+                response.content_hash = cache.store(url, response)
+            yield fetch
+
+    first = import_rankings(17, [1], ["A"], fetcher=caching_fetcher)
+    second = import_rankings(17, [1], ["A"], fetcher=caching_fetcher)
+    forced = import_rankings(17, [1], ["A"], fetcher=caching_fetcher, force=True)
+
+    assert first["segments"] == 1 and first["unchanged"] == 0
+    assert second["segments"] == 0 and second["unchanged"] == 1
+    assert forced["segments"] == 1
+
+
+def test_refresh_only_fetches_open_segments(app):
+    requested = []
+
+    def recording_fetcher(season, segments, **kwargs):
+        requested.append(list(segments))
+        yield from fake_fetcher(season, segments)
+
+    import_rankings(17, [1, 2], ["A"], fetcher=recording_fetcher)
+    # Il round 1 è definitivo e non cambiato di recente
+    state = RankingsImportState.query.filter_by(season=17, class_id="A", race=1).one()
+    state.is_final = True
+    state.changed_at = datetime.utcnow() - timedelta(days=10)
+    db.session.commit()
+
+    summary = import_rankings(17, [1, 2], ["A"], fetcher=recording_fetcher, refresh=True)
+
+    assert requested[-1] == [(2, "A")]
+    assert summary["skipped"] == 1
+    assert summary["unchanged"] == 1
+
+
+def test_unchanged_payload_marks_segment_final(app):
+    app.config["WTRL_RESULTS_FINAL_AFTER_UNCHANGED"] = 2
+    for _ in range(3):
+        import_rankings(17, [1], ["A"], fetcher=fake_fetcher)
+
+    state = RankingsImportState.query.filter_by(season=17, class_id="A", race=1).one()
+    assert state.unchanged_fetches == 2
+    assert state.is_final is True
+    assert state.payload_hash is not None
+
+
+def test_failing_team_costs_only_itself(app, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+    upsert = rankings_import.upsert
+
+    def failing_upsert(model, rows, *args):
+        if model is RaceResultsTeam and any(row["team_id"] == 74930 for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("team non valido"))
+        return upsert(model, rows, *args)
+
+    monkeypatch.setattr(rankings_import, "upsert", failing_upsert)
+
+    def fetcher(season, segments, **kwargs):
+        for fetch in fake_fetcher(season, segments):
+            if fetch.race_number == 2:
+                fetch.results = (True, FakeResponse("{not json"))
+            yield fetch
+
+    app.config["WTRL_RANKINGS_COMMIT_BATCH"] = 5
+    summary = import_rankings(17, [1, 2, 3], ["A"], fetcher=fetcher)
+
+    # Il team non valido e il segmento con JSON rotto non annullano il resto del blocco
+    assert summary["segments"] == 2
+    assert summary["team_results"] == 2
+    assert {row.race for row in RaceResultsTeam.query.filter_by(team_id=74016)} == {1, 3}
+    assert RaceResultsTeam.query.filter_by(team_id=74930).count() == 0
+    assert any("TRC 74930" in error for error in summary["errors"])
+    # Segmento incompleto: il watermark non registra il payload, verrà reimportato
+    assert RankingsImportState.query.filter_by(season=17, race=1).one().payload_hash is None
@@ -0,0 +1,42 @@
+from newZRL.bench.benchmark import run_benchmark
+from newZRL.bench.fixtures import Recording, build_recording
+from newZRL.bench.replay_server import ReplayServer
+from newZRL.services.wtrl_fetch import fetch_wtrl_json
+
+
+def test_replay_server_serves_pending_then_ready():
+    recording = Recording(18)
+    recording.add("results", "/zrl/results/18/A/1", {"payload": [{"id5": 1}]}, pending=2)
+
+    with ReplayServer(recording) as server:
+        ok, response = fetch_wtrl_json(f"{server.base_url}/zrl/results/18/A/1",
+                                       initial_delay=0.01, max_delay=0.02)
+        missing = fetch_wtrl_json(f"{server.base_url}/zrl/results/18/A/2")
+
+    assert ok
+    assert response.json() == {"payload": [{"id5": 1}]}
+    assert server.requests[("/zrl/results/18/A/1", 202)] == 2
+    assert missing[0] is False
+
+
+def test_recording_round_trip(tmp_path):
+    recording = build_recording(races=1)
+    recording.save(str(tmp_path))
+    loaded = Recording.load(str(tmp_path))
+
+    assert loaded.season == recording.season
+    assert len(loaded.endpoints) == len(recording.endpoints)
+    assert {e["kind"] for e in loaded.endpoints} == {"team", "teams_list", "schedule", "results", "league"}
+
+
+def test_benchmark_runs_importers_against_replay():
+    results = run_benchmark(build_recording(races=1), importers=("schedule", "rankings", "rankings-rerun"),
+                            trace_memory=False)
+    by_name = {m.name: m for m in results}
+
+    assert all(m.error is None for m in results)
+    assert by_name["schedule"].rows > 0
+    assert by_name["rankings"].rows > 0
+    assert by_name["rankings"].statements > 0
+    # Secondo passaggio: payload invariati, nessuna riga nuova
+    assert by_name["rankings-rerun"].rows == 0
@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from newZRL.models.race import Race
+from newZRL.models.round import Round
+from newZRL.models.season import Season
+from newZRL.services.schedule_import import import_wtrl_schedule_data_to_db, parse_schedule
+
+
+def schedule_payload():
+    return [
+        {"roundNumber": 1, "race": 101, "subgroup_label": "A", "eventDate": "2025-09-16T18:00:00Z",
+         "courseName": "Watopia Flat", "lapDistanceInMeters": 12500, "duration": 2},
+        {"roundNumber": 1, "race": 101, "subgroup_label": "B", "eventDate": "2025-09-16T18:00:00Z",
+         "courseName": "Watopia Flat"},
+        {"roundNumber": 2, "race": 201, "subgroup_label": "A", "eventDate": "2025-10-14T18:00:00Z",
+         "courseName": "Makuri"},
+        # senza external_id: conta solo per le date
+        {"roundNumber": 2, "subgroup_label": "A", "eventDate": "2025-10-21T18:00:00Z"},
+    ]
+
+
+def test_parse_schedule_builds_records_once():
+    races, round_dates = parse_schedule(schedule_payload())
+
+    assert [(r.round_number, r.external_id, r.row["category"]) for r in races] == [
+        (1, "101", "A"), (1, "101", "B"), (2, "201", "A")]
+    assert races[0].row["distance_km"] == 12.5
+    assert len(round_dates[2]) == 2
+
+
+def test_import_schedule_is_idempotent_and_updates_changed_races(app):
+    first = import_wtrl_schedule_data_to_db("17", schedule_payload())
+    assert first == {"rounds": 2, "races_new": 3, "races_updated": 0, "races_unchanged": 0}
+
+    payload = schedule_payload()
+    payload[2]["courseName"] = "Makuri Islands"
+    second = import_wtrl_schedule_data_to_db("17", payload)
+
+    assert second == {"rounds": 2, "races_new": 0, "races_updated": 1, "races_unchanged": 2}
+    assert Race.query.count() == 3
+    assert Race.query.filter_by(external_id="201").one().name == "Makuri Islands"
+    round_2 = Round.query.filter_by(round_number=2).one()
+    assert str(round_2.end_date) == "2025-10-21"
+    assert str(Season.query.one().start_date) == "2025-09-16"
+
+
+def test_race_calendar_answers_next_race_and_rebuilds_after_import(app):
+    from types import SimpleNamespace
+    from newZRL.services.race_calendar import TUESDAY, get_race_calendar
+
+    # Gare future: il calendario tiene solo quelle da oggi in poi
+    tuesday = date.today() + timedelta(days=(TUESDAY - date.today().weekday()) % 7 + 7)
+    payload = schedule_payload()
+    payload[0]["eventDate"] = payload[1]["eventDate"] = tuesday.isoformat()
+    payload[2]["eventDate"] = (tuesday + timedelta(days=2)).isoformat()
+    payload[3]["eventDate"] = (tuesday + timedelta(days=7)).isoformat()
+    import_wtrl_schedule_data_to_db("17", payload)
+    calendar = get_race_calendar()
+
+    assert calendar.next_race_date() == tuesday
+    assert calendar.next_race("B", on_or_after=tuesday + timedelta(days=1)) is None
+    assert calendar.next_race_for_team(SimpleNamespace(category="A1"), on_or_after=tuesday + timedelta(days=1)).name == "Makuri"
+    assert calendar.next_race(weekday=TUESDAY, on_or_after=tuesday + timedelta(days=1)) is None
+    assert get_race_calendar() is calendar
+
+    payload[1]["eventDate"] = (tuesday + timedelta(days=14)).isoformat()
+    import_wtrl_schedule_data_to_db("17", payload)
+
+    rebuilt = get_race_calendar()
+    assert rebuilt is not calendar
+    assert rebuilt.next_race_date("B") == tuesday + timedelta(days=14)
+
+
+def test_race_calendar_keeps_zrl_races_of_the_current_week(app):
+    from newZRL import db
+    from newZRL.services.race_calendar import TUESDAY, load_race_calendar
+
+    tuesday = date.today() + timedelta(days=(TUESDAY - date.today().weekday()) % 7)
+    for name, day in (("Club Series", tuesday), ("ZRL Season 17", tuesday + timedelta(days=7))):
+        season = Season(name=name, start_date=day, end_date=day)
+        season.rounds.append(Round(round_number=1, races=[Race(name=f"{name} race", race_date=day)]))
+        db.session.add(season)
+    db.session.commit()
+    calendar = load_race_calendar()
+
+    # Il martedì corrente ha solo una gara non ZRL: niente salto alla settimana dopo
+    assert [race.name for race in calendar.races_on(tuesday)] == ["Club Series race"]
+    assert calendar.races_on(tuesday, zrl_only=True) == []
+    assert calendar.next_race(weekday=TUESDAY, zrl_only=True).season == "ZRL Season 17"
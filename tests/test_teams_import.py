@@ -0,0 +1,142 @@
+import json
+
+from newZRL import db
+from newZRL.bench.fixtures import Recording, load_team_seeds, synth_teams_list
+from newZRL.bench.replay_server import ReplayServer
+from newZRL.models.team import Team
+from newZRL.models.team_index_entry import TeamIndexEntry
+from newZRL.models.wtrl_rider import WTRL_Rider
+from newZRL.services.payload_archive import PayloadArchive
+from newZRL.services.teams_import import import_teams
+
+
+def _recording(trcs):
+    seeds = load_team_seeds()
+    recording = Recording(18)
+    for trc in trcs:
+        recording.add("team", f"/zrl/18/teams/{trc}", seeds[trc])
+    return recording, seeds
+
+
+def test_import_teams_fetches_in_parallel(app, tmp_path):
+    recording, seeds = _recording([74016, 74930, 75144])
+    progress = []
+
+    with ReplayServer(recording) as server:
+        app.config.update(WTRL_API_BASE_URL=server.base_url, WTRL_ARCHIVE_ENABLED=True,
+                          WTRL_ARCHIVE_DIR=str(tmp_path), WTRL_FETCH_WORKERS=3, WTRL_REQUESTS_PER_SECOND=100,
+                          WTRL_TEAMS_JSON_ENABLED=True, WTRL_TEAMS_JSON_DIR=str(tmp_path / "wtrl_json"))
+        summary = import_teams(18, report=lambda p, m: progress.append(p),
+                               trc_list=["74016", "74930", "75144", "99999", "abc"])
+
+    assert summary["teams"] == 3
+    assert summary["riders"] == sum(len(seeds[t]["riders"]) for t in (74016, 74930, 75144))
+    assert db.session.get(Team, 74016).name == seeds[74016]["meta"]["team"]["name"]
+    assert WTRL_Rider.query.filter_by(team_trc=74930).count() == len(seeds[74930]["riders"])
+    # Il TRC non registrato (404) viene saltato, l'avanzamento arriva al 100%
+    assert db.session.get(Team, 99999) is None
+    assert progress[-1] == 100
+    # Il payload resta nell'archivio compresso
+    with PayloadArchive(str(tmp_path)) as archive:
+        latest = archive.latest("teams", "18/74016")
+        assert json.loads(archive.read(latest.hash)) == seeds[74016]
+    # ...e in chiaro per team_bulk_load
+    assert sorted(p.name for p in (tmp_path / "wtrl_json").iterdir()) == [
+        "team_74016.json", "team_74930.json", "team_75144.json"]
+    assert json.loads((tmp_path / "wtrl_json" / "team_74930.json").read_text()) == seeds[74930]
+
+
+def test_import_teams_skips_unchanged_payloads(app, tmp_path):
+    recording, seeds = _recording([74016, 74930])
+
+    with ReplayServer(recording) as server:
+        app.config.update(WTRL_API_BASE_URL=server.base_url)
+        first = import_teams(18, trc_list=["74016", "74930"])
+        before = {r.id: r.updated_at for r in WTRL_Rider.query}
+        db.session.remove()
+
+        # Secondo giro: il team 74930 è identico, in 74016 cambia un solo rider
+        seeds[74016]["riders"][0]["zftpw"] = 999
+        recording.endpoints = [e for e in recording.endpoints if e["path"] != "/zrl/18/teams/74016"]
+        recording.add("team", "/zrl/18/teams/74016", seeds[74016])
+        second = import_teams(18, trc_list=["74016", "74930"])
+
+    assert first["teams_new"] == 2
+    assert first["riders_new"] == len(seeds[74016]["riders"]) + len(seeds[74930]["riders"])
+    assert second["teams_unchanged"] == 1 and second["teams_changed"] == 1
+    assert second["riders_changed"] == 1
+    assert second["riders_unchanged"] == first["riders_new"] - 1
+
+    changed_id = f"74016/{seeds[74016]['riders'][0]['profileId']}"
+    riders = {r.id: r for r in WTRL_Rider.query}
+    assert riders[changed_id].zftpw == 999
+    assert riders[changed_id].updated_at > before[changed_id]
+    assert all(riders[i].updated_at == ts for i, ts in before.items() if i != changed_id)
+
+
+def test_import_teams_discovers_trcs_from_index(app):
+    recording, seeds = _recording([74016, 74930])
+    recording.add("teams_list", "/zrl/18/teams/", synth_teams_list([seeds[74016], seeds[74930]]))
+
+    with ReplayServer(recording) as server:
+        app.config.update(WTRL_API_BASE_URL=server.base_url, WTRL_TEAMS_ALL_SEASON=True)
+        first = import_teams(18)
+        # Indice invariato: i team vengono comunque riletti, ma i payload identici non si scrivono
+        second = import_teams(18)
+
+        # In 74930 cambia solo la rosa (l'indice non lo vede), 74016 sparisce dalla lista
+        seeds[74930]["riders"][0]["zftpw"] = 999
+        recording.endpoints = [e for e in recording.endpoints
+                               if e["kind"] != "teams_list" and e["path"] != "/zrl/18/teams/74930"]
+        recording.add("team", "/zrl/18/teams/74930", seeds[74930])
+        recording.add("teams_list", "/zrl/18/teams/", synth_teams_list([seeds[74930]]))
+        server.reset()
+        third = import_teams(18)
+        fetched = {path for path, _ in server.requests if path.startswith("/zrl/18/teams/7")}
+
+    assert first["teams"] == 2 and first["index"]["new"] == 2
+    assert second["teams_unchanged"] == 2 and second["riders_changed"] == 0
+    assert third["index"]["removed"] == 1 and third["riders_changed"] == 1
+    assert fetched == {"/zrl/18/teams/74930"}
+    assert TeamIndexEntry.query.filter_by(season=18, trc=74016).one().removed_at is not None
+
+
+def test_import_teams_defaults_to_club_trcs(app, tmp_path):
+    recording, seeds = _recording([74016, 74930])
+    recording.add("teams_list", "/zrl/18/teams/", synth_teams_list([seeds[74016], seeds[74930]]))
+    club_file = tmp_path / "team_trc_list.txt"
+    club_file.write_text("74930\n")
+
+    with ReplayServer(recording) as server:
+        app.config.update(WTRL_API_BASE_URL=server.base_url, WTRL_CLUB_TRC_FILE=str(club_file))
+        summary = import_teams(18)
+
+    # L'indice registra tutta la stagione, l'import resta sui team del club
+    assert summary["index"]["new"] == 2 and summary["teams"] == 1
+    assert [t.trc for t in Team.query] == [74930]
+
+
+def test_bulk_load_team_dir_loads_and_cleans_departed_riders(app, tmp_path):
+    from newZRL.services.team_bulk_load import bulk_load_team_dir
+
+    seeds = load_team_seeds()
+    for trc in (74016, 74930):
+        (tmp_path / f"team_{trc}.json").write_text(json.dumps(seeds[trc]), encoding="utf-8")
+    (tmp_path / "team_broken.json").write_text("{not json", encoding="utf-8")
+
+    summary = bulk_load_team_dir(tmp_path, workers=2)
+
+    assert summary["files"] == 3 and len(summary["errors"]) == 1
+    assert summary["teams"] == 2
+    assert WTRL_Rider.query.count() == summary["riders"] > 0
+    assert summary["files_per_second"] and summary["rows_per_second"]
+
+    # Un rider uscito dal team viene eliminato al caricamento successivo
+    data = seeds[74016]
+    departed = data["riders"].pop()
+    (tmp_path / "team_74016.json").write_text(json.dumps(data), encoding="utf-8")
+    second = bulk_load_team_dir(tmp_path, workers=1)
+
+    assert second["departed_deleted"] == 1
+    assert WTRL_Rider.query.filter_by(team_trc=74016, profile_id=departed["profileId"]).count() == 0
+    assert WTRL_Rider.query.count() == summary["riders"] - 1
@@ -0,0 +1,73 @@
+import copy
+
+from newZRL import db
+
+from newZRL.models.wtrl import WTRLCompetition, WTRLDivision, WTRLLeague, WTRLRace
+from newZRL.services.wtrl_structure import STRUCTURE_FILE, sync_wtrl_structure
+
+
+def structure():
+    def division(code, races):
+        return {"value": code, "text": code,
+                "races": [{"value": n, "text": f"Race {n}", "format": "TTT"} for n in races]}
+
+    return {"payload": {"competition": [
+        {"value": "20", "text": "Open Regular", "leagues": [
+            {"value": 120, "text": "Cherry", "divisions": [division("A1", [1, 2]), division("B1", [1, 2])]},
+            {"value": 160, "text": "Pink", "divisions": [division("A1", [1, 2])]},
+        ]},
+        # league 160 condivisa con la competition 20
+        {"value": "21", "text": "Women", "leagues": [
+            {"value": 160, "text": "Pink", "divisions": [division("C1", [1])]},
+        ]},
+    ]}}
+
+
+def test_sync_structure_is_idempotent(app):
+    first = sync_wtrl_structure(STRUCTURE_FILE)
+    assert first["races"]["insert"] == WTRLRace.query.count() > 0
+    assert first["divisions"]["insert"] == WTRLDivision.query.count()
+
+    second = sync_wtrl_structure(STRUCTURE_FILE)
+    assert all(changes == {"insert": 0, "update": 0, "delete": 0} for changes in second.values())
+
+
+def test_sync_structure_applies_only_the_diff(app):
+    data = structure()
+    sync_wtrl_structure(data)
+    assert db.session.get(WTRLLeague, 160).competition_id == "20"
+    assert WTRLDivision.query.count() == 4
+
+    changed = copy.deepcopy(data)
+    comp = changed["payload"]["competition"][0]
+    comp["leagues"][0]["text"] = "Cherry Blossom"
+    comp["leagues"][0]["divisions"].pop()                     # B1 e le sue race
+    comp["leagues"][1]["divisions"][0]["races"].append({"value": 3, "text": "Race 3", "format": "PTS"})
+    del changed["payload"]["competition"][1]                  # Women e la division C1
+
+    counts = sync_wtrl_structure(changed)
+
+    assert counts["competitions"] == {"insert": 0, "update": 0, "delete": 1}
+    assert counts["leagues"] == {"insert": 0, "update": 1, "delete": 0}
+    assert counts["divisions"] == {"insert": 0, "update": 0, "delete": 2}
+    assert counts["races"] == {"insert": 1, "update": 0, "delete": 3}
+    assert db.session.get(WTRLLeague, 120).name == "Cherry Blossom"
+    assert {d.code for d in WTRLDivision.query.all()} == {"A1"}
+    assert WTRLRace.query.count() == 5
+
+
+def test_sync_structure_uses_database_division_ids(app):
+    data = structure()
+    sync_wtrl_structure(data)
+    # Un altro sync ha aggiunto una division nel frattempo
+    db.session.add(WTRLDivision(code="D1", league_id=120))
+    db.session.commit()
+
+    data["payload"]["competition"][0]["leagues"][0]["divisions"].append(
+        {"value": "E1", "text": "E1", "races": [{"value": 1, "text": "Race 1", "format": "TTT"}]})
+    counts = sync_wtrl_structure(data, prune=False)
+
+    assert counts["divisions"]["insert"] == 1
+    e1 = WTRLDivision.query.filter_by(league_id=120, code="E1").one()
+    assert [race.race_number for race in e1.races] == [1]
+    assert WTRLDivision.query.filter_by(code="D1").count() == 1
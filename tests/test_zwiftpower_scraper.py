@@ -0,0 +1,83 @@
+import csv
+
+from newZRL.bench.fixtures import Recording
+from newZRL.bench.replay_server import ReplayServer
+from newZRL.models.rider import Rider
+from newZRL.services import zwiftpower_scraper
+from newZRL.services.zwiftpower_parser import parse_profile_page, parse_team_page
+
+PROFILE_HTML = """
+<html><body>
+<table>
+  <tr><td>Race Ranking</td><td>{rank} pts (1,234th)</td></tr>
+  <tr><td>Category</td><td>B</td></tr>
+  <tr><td>Zwift Racing Score</td><td>512</td></tr>
+  <tr><td>Country</td><td>Italy</td></tr>
+  <tr><td>zFTP</td><td>{ftp}w</td></tr>
+  <tr><td>Weight</td><td>71,5 kg</td></tr>
+</table>
+<div class="profile_power_block big">12.1 wkg 870 watts</div>
+<div class="profile_power_block">7.2 wkg 515 watts</div>
+<div class="profile_power_block">4.6 wkg 330 watts</div>
+<div class="profile_power_block">3.9 wkg 280 watts</div>
+</body></html>
+"""
+
+
+def profile_recording(profiles):
+    recording = Recording(season=None)
+    for zwift_id, body in profiles.items():
+        name = f"bodies/profile_{zwift_id}.html"
+        recording.bodies[name] = body.encode("utf-8")
+        recording.endpoints.append({"kind": "profile", "path": "/profile.php", "query": {"z": zwift_id},
+                                    "responses": [{"status": 200, "body": name}]})
+    return recording
+
+
+def test_parse_profile_page_reads_fields_and_power_blocks():
+    profile = parse_profile_page(PROFILE_HTML.format(rank="310.5", ftp=265))
+    assert profile["race_ranking"] == 310.5 and profile["race_ranking_pos"].startswith("310.5 pts")
+    assert (profile["category"], profile["country"], profile["zftp"], profile["weight"]) == ("B", "Italy", 265, 71.5)
+    assert (profile["wkg_15sec"], profile["wkg_20min"], profile["watt_5min"]) == (12.1, 3.9, 330)
+    assert profile["team"] is None
+
+
+def test_scrape_club_fetches_profiles_concurrently(app, tmp_path, monkeypatch):
+    recording = profile_recording({
+        1: PROFILE_HTML.format(rank="310.5", ftp=265),
+        2: PROFILE_HTML.format(rank="402.0", ftp=240),
+    })
+    members = [
+        {"zwift_power_id": 1, "name": "Uno", "country": "it", "ftp": ["250", 0], "ce_category": 20},
+        {"zwift_power_id": 2, "name": "Due", "country": "it", "ftp": ["230", 0]},
+        {"zwift_power_id": 3, "name": "Tre", "country": "it", "ftp": ["200", 0], "ce_category": 30},
+    ]
+    with ReplayServer(recording) as server:
+        monkeypatch.setattr(zwiftpower_scraper, "PROFILE_URL", f"{server.base_url}/profile.php?z={{zwift_id}}")
+        summary = zwiftpower_scraper.scrape_club(77, members=members, workers=3, rate=100, export_dir=tmp_path)
+
+    # Il profilo 3 non è registrato (404): il rider resta con i dati della lista
+    assert (summary["members"], summary["profiles"], len(summary["errors"])) == (3, 2, 1)
+    assert summary["new"] == 3
+    riders = {r.profile_id: r for r in Rider.query.filter_by(zp_team_id=77)}
+    assert (riders[1].ftp, riders[1].weight, riders[1].category) == (265, 71.5, "B")
+    assert riders[2].category == "B"  # dalla pagina profilo, l'API non aveva la divisione
+    assert (riders[3].ftp, riders[3].category) == (200, "C")
+
+    with open(summary["csv"], newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == ["Uno", "Due", "Tre"] and rows[0]["wkg_20min"] == "3.9"
+
+
+def test_saved_pages_parse_and_benchmark():
+    from newZRL.bench.parsers import load_pages, run_benchmark
+
+    pages = load_pages()
+    team = parse_team_page(pages["team"])
+    assert len(team) == 60 and team[0]["zwift_power_id"] == 100000 and team[0]["watt_15sec"]
+    profile = parse_profile_page(pages["profile"])
+    assert (profile["zpoints"], profile["zftp"], profile["team"], profile["watt_20min"]) == (1204, 271, "INOX Team", 287)
+
+    results = run_benchmark(pages, parsers=("lxml",), iterations=2)
+    assert [(r["page"], r["error"]) for r in results] == [("team", None), ("profile", None)]
+    assert all(r["pages_per_s"] > 0 and r["alloc_kb_per_page"] > 0 for r in results)
@@ -0,0 +1,33 @@
+from newZRL import db
+from newZRL.models.rider import Rider
+from newZRL.services.zwiftpower_sync import sync_members
+
+
+def member(zwid, name, **extra):
+    return {"zwift_power_id": zwid, "name": name, "country": "it", "weight": ["72.5", 0],
+            "ftp": ["260", 0], "ce_category": 20, "races": 12, "zp_rank": "150.2", **extra}
+
+
+def test_sync_members_inserts_updates_and_deactivates(app):
+    # Rider già presente (es. da un altro import) che entra nel club
+    db.session.add(Rider(name="Old Name", profile_id=3))
+    db.session.commit()
+
+    first = sync_members([member(1, "Uno"), member(2, "Due"), member(3, "Tre"), {"name": "senza zwid"}], team_id=77)
+    assert first == {"new": 2, "updated": 1, "unchanged": 0, "deactivated": 0, "skipped": 1}
+    uno = Rider.query.filter_by(profile_id=1).one()
+    assert (uno.category, uno.weight, uno.ftp, uno.zp_team_id, uno.is_active) == ("B", 72.5, 260, 77, True)
+
+    second = sync_members([member(1, "Uno"), member(3, "Tre", ftp=["270", 0])], team_id=77)
+    assert second == {"new": 0, "updated": 1, "unchanged": 1, "deactivated": 1, "skipped": 0}
+    assert Rider.query.filter_by(profile_id=2).one().is_active is False
+    assert Rider.query.filter_by(profile_id=3).one().ftp == 270
+
+    # Un altro club non tocca i rider del primo
+    sync_members([member(9, "Nove")], team_id=88)
+    assert Rider.query.filter_by(zp_team_id=77, is_active=True).count() == 2
+
+    # Il rider rientrato nel feed torna attivo
+    third = sync_members([member(1, "Uno"), member(2, "Due"), member(3, "Tre", ftp=["270", 0])], team_id=77)
+    assert third["updated"] == 1 and third["deactivated"] == 0
+    assert Rider.query.filter_by(profile_id=2).one().is_active is True